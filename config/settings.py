@@ -15,6 +15,13 @@ LOGS_DIR = BASE_DIR / "logs"
 # Chroma configuration
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "salud_femenina_knowledge")
+
+# Parámetros del índice HNSW (solo aplican al crear la colección, salvo search_ef)
+CHROMA_HNSW_SPACE = os.getenv("CHROMA_HNSW_SPACE", "l2")
+CHROMA_HNSW_M = int(os.getenv("CHROMA_HNSW_M", 16))
+CHROMA_HNSW_CONSTRUCTION_EF = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", 100))
+CHROMA_HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", 10))
 
 # Mistral OCR configuration (opcional)
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
@@ -23,8 +30,139 @@ MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "localhost")
 OLLAMA_PORT = int(os.getenv("OLLAMA_PORT", 11434))
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "salud-femenina")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 120))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", 10))
+# Timeout adaptativo por llamada: percentil de la latencia observada × multiplicador,
+# acotado entre OLLAMA_TIMEOUT_MIN y OLLAMA_TIMEOUT (que se usa hasta tener muestras)
+OLLAMA_TIMEOUT_ADAPTIVE = os.getenv("OLLAMA_TIMEOUT_ADAPTIVE", "true").lower() in ("1", "true", "yes")
+OLLAMA_TIMEOUT_MIN = float(os.getenv("OLLAMA_TIMEOUT_MIN", 15))
+OLLAMA_TIMEOUT_PERCENTILE = float(os.getenv("OLLAMA_TIMEOUT_PERCENTILE", 99))
+OLLAMA_TIMEOUT_MULTIPLIER = float(os.getenv("OLLAMA_TIMEOUT_MULTIPLIER", 2.0))
+OLLAMA_TIMEOUT_MIN_SAMPLES = int(os.getenv("OLLAMA_TIMEOUT_MIN_SAMPLES", 8))
+
+# Varios servidores Ollama: OLLAMA_BACKENDS="http://gpu1:11434,http://gpu2:11434"
+OLLAMA_BACKENDS = [
+    url.strip() if "://" in url else f"http://{url.strip()}"
+    for url in os.getenv("OLLAMA_BACKENDS", f"{OLLAMA_HOST}:{OLLAMA_PORT}").split(",")
+    if url.strip()
+]
+# Enrutamiento: "least_in_flight" o "lowest_latency"
+OLLAMA_ROUTING = os.getenv("OLLAMA_ROUTING", "least_in_flight")
+OLLAMA_BACKEND_MAX_IN_FLIGHT = int(os.getenv("OLLAMA_BACKEND_MAX_IN_FLIGHT", 4))
+# Un backend se expulsa tras N fallos seguidos y se readmite cuando vuelve a responder
+OLLAMA_BACKEND_EJECT_AFTER = int(os.getenv("OLLAMA_BACKEND_EJECT_AFTER", 3))
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", 15))
+
+# Pool de conexiones HTTP hacia Ollama
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", 16))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", 8))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", 60))
+
+# Precarga del modelo y keep_alive durante las ejecuciones masivas
+OLLAMA_PRELOAD = os.getenv("OLLAMA_PRELOAD", "true").lower() in ("1", "true", "yes")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# keep_alive con el que se devuelve el modelo al terminar la ejecución ("5m" es el de Ollama, "0" lo descarga ya)
+OLLAMA_IDLE_KEEP_ALIVE = os.getenv("OLLAMA_IDLE_KEEP_ALIVE", "5m")
+
+# Ventana de contexto fija para toda la ejecución (cambiarla entre solicitudes recarga el modelo)
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", 4096))
+
+# Generación concurrente
+# Por defecto, la capacidad total del pool de backends
+GENERATION_MAX_IN_FLIGHT = int(os.getenv("GENERATION_MAX_IN_FLIGHT", OLLAMA_BACKEND_MAX_IN_FLIGHT * len(OLLAMA_BACKENDS)))
+
+# Concurrencia adaptativa (AIMD): el límite en vuelo arranca en GENERATION_AIMD_INITIAL,
+# sube de uno en uno mientras la latencia es sana y se multiplica por GENERATION_AIMD_BACKOFF
+# ante fallos o ante GENERATION_AIMD_SUSTAINED llamadas seguidas más lentas que
+# GENERATION_AIMD_TOLERANCE × la latencia mediana; nunca pasa de GENERATION_MAX_IN_FLIGHT
+GENERATION_ADAPTIVE_CONCURRENCY = os.getenv("GENERATION_ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+GENERATION_AIMD_MIN = int(os.getenv("GENERATION_AIMD_MIN", 1))
+GENERATION_AIMD_INITIAL = int(os.getenv("GENERATION_AIMD_INITIAL", 2))
+GENERATION_AIMD_TOLERANCE = float(os.getenv("GENERATION_AIMD_TOLERANCE", 1.5))
+GENERATION_AIMD_SUSTAINED = int(os.getenv("GENERATION_AIMD_SUSTAINED", 3))
+GENERATION_AIMD_BACKOFF = float(os.getenv("GENERATION_AIMD_BACKOFF", 0.5))
+
+# Ejecutar los tipos de contenido de un segmento seguidos (reutiliza el prefijo del prompt en Ollama)
+GENERATION_SEGMENT_AFFINITY = os.getenv("GENERATION_SEGMENT_AFFINITY", "true").lower() in ("1", "true", "yes")
+
+# Planificación por prioridad (prioridad del tipo de contenido en RecommendedContentTypes):
+# por debajo de SKIP no se genera, por debajo de DEFER se deja para el final
+GENERATION_SKIP_PRIORITY = float(os.getenv("GENERATION_SKIP_PRIORITY", 0.0))
+GENERATION_DEFER_PRIORITY = float(os.getenv("GENERATION_DEFER_PRIORITY", 0.5))
+# Presupuesto de tiempo de la ejecución en segundos (0 = sin límite)
+GENERATION_TIME_BUDGET = float(os.getenv("GENERATION_TIME_BUDGET", 0))
+# Hora límite de la ejecución ("06:30"; vacío = sin límite); se combina con el presupuesto
+GENERATION_DEADLINE = os.getenv("GENERATION_DEADLINE", "")
+
+# Reintentos (backoff exponencial con jitter) e interruptor de circuito para Ollama
+OLLAMA_RETRY_MAX_TRIES = int(os.getenv("OLLAMA_RETRY_MAX_TRIES", 4))
+OLLAMA_RETRY_MAX_TIME = float(os.getenv("OLLAMA_RETRY_MAX_TIME", 300))
+OLLAMA_BREAKER_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_FAILURE_THRESHOLD", 5))
+OLLAMA_BREAKER_RESET_SECONDS = float(os.getenv("OLLAMA_BREAKER_RESET_SECONDS", 30))
+OLLAMA_BREAKER_MAX_PAUSE = float(os.getenv("OLLAMA_BREAKER_MAX_PAUSE", 900))
+# Pasadas extra sobre la cola de reintentos al final de la ejecución
+GENERATION_RETRY_PASSES = int(os.getenv("GENERATION_RETRY_PASSES", 1))
+
+# Streaming: límite de salida aplicado en el cliente para cortar generaciones desbocadas
+GENERATION_STREAMING = os.getenv("GENERATION_STREAMING", "false").lower() in ("1", "true", "yes")
+OLLAMA_STREAM_MAX_CHARS = int(os.getenv("OLLAMA_STREAM_MAX_CHARS", 6000))
+
+# Generación por lotes: varios tipos de contenido por llamada con salida JSON validada
+GENERATION_BATCHED = os.getenv("GENERATION_BATCHED", "false").lower() in ("1", "true", "yes")
+# Tope de num_predict sumado de un lote
+GENERATION_BATCH_MAX_PREDICT = int(os.getenv("GENERATION_BATCH_MAX_PREDICT", 2048))
+
+# Generación vía /api/chat: pautas generales en un mensaje de sistema y solo el
+# material del segmento en el turno de usuaria. Con OLLAMA_CHAT_SYSTEM_IN_MODELFILE
+# las pautas están en el SYSTEM de OLLAMA_CHAT_MODEL (scripts/build_chat_modelfile.py).
+# La plantilla inserta el SYSTEM en cada solicitud: no se evalúan menos tokens de
+# prompt, solo se envían menos bytes por solicitud
+GENERATION_CHAT_API = os.getenv("GENERATION_CHAT_API", "false").lower() in ("1", "true", "yes")
+OLLAMA_CHAT_MODEL = os.getenv("OLLAMA_CHAT_MODEL", OLLAMA_MODEL)
+OLLAMA_CHAT_SYSTEM_IN_MODELFILE = os.getenv("OLLAMA_CHAT_SYSTEM_IN_MODELFILE", "false").lower() in ("1", "true", "yes")
+
+# Deduplicación de prompts equivalentes entre segmentos (una llamada por grupo)
+GENERATION_DEDUP = os.getenv("GENERATION_DEDUP", "true").lower() in ("1", "true", "yes")
+
+# Caché persistente de generaciones
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+GENERATION_CACHE_PATH = Path(os.getenv("GENERATION_CACHE_PATH", DATA_DIR / "cache" / "generation_cache.sqlite"))
+MODELFILE_PATH = BASE_DIR / "maurallm.modelfile"
+
+# Diario JSONL de generación (fsync cada N piezas)
+JOURNAL_FSYNC_EVERY = int(os.getenv("JOURNAL_FSYNC_EVERY", 10))
+
+# Cola de trabajo distribuida (SQLite): workers en varios nodos, cada uno junto a su
+# Ollama, reclaman pares con lease y lo renuevan con heartbeats. En un sistema de
+# archivos de red, WORK_QUEUE_WAL=false
+WORK_QUEUE_PATH = Path(os.getenv("WORK_QUEUE_PATH", DATA_DIR / "queue" / "generation_queue.sqlite"))
+WORK_QUEUE_WAL = os.getenv("WORK_QUEUE_WAL", "true").lower() in ("1", "true", "yes")
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", 120))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", 3))
+WORK_QUEUE_POLL_SECONDS = float(os.getenv("WORK_QUEUE_POLL_SECONDS", 5))
 
 # Processing configuration
 MAX_CHUNK_SIZE = 400
 MIN_CHUNK_SIZE = 100
-EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
\ No newline at end of file
+EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Retrieval configuration
+INDEX_DIR = DATA_DIR / "indexes"
+BM25_INDEX_PATH = Path(os.getenv("BM25_INDEX_PATH", INDEX_DIR / "bm25_index.json.gz"))
+MATERIALIZED_CONTEXT_PATH = Path(os.getenv("MATERIALIZED_CONTEXT_PATH", INDEX_DIR / "materialized_context.sqlite"))
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", 0.5))  # Peso de la búsqueda vectorial frente a BM25
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", 20))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 5))
+
+# Reranking con cross-encoder (opcional, CPU)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 5))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 250))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 8))
+
+# Empaquetado de contexto (MMR + presupuesto de tokens)
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))
+CONTEXT_OVERLAP_THRESHOLD = float(os.getenv("CONTEXT_OVERLAP_THRESHOLD", 0.6))
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.getenv("DEFAULT_CONTEXT_TOKEN_BUDGET", 800))
@@ -0,0 +1,160 @@
+# content_generator/adaptive_concurrency.py
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional
+
+from content_generator.generation_metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class AIMDConcurrencyLimit:
+    """
+    Límite de solicitudes en vuelo con control AIMD (aumento aditivo, reducción
+    multiplicativa), como la ventana de congestión de TCP.
+
+    Cada vez que se completan `limit` solicitudes sanas seguidas, el límite sube
+    en uno. Una solicitud fallida (timeout, 5xx, circuito abierto) lo multiplica
+    por backoff, y también `sustained` solicitudes seguidas más lentas que
+    tolerance × la latencia base de su clave (p. ej. por tipo de contenido):
+    una sola llamada lenta es ruido, una racha es sobrecarga. La base es la
+    menor mediana de las últimas `window` latencias que se ha visto, para que
+    no suba a la par que la carga; si la racha llega con el límite ya en el
+    mínimo, la lentitud no es culpa de la concurrencia y la base se recalcula
+    con la mediana actual. Tras una
+    reducción se ignoran las señales de las solicitudes que ya estaban en vuelo,
+    que se despacharon con el límite anterior. Las respuestas más rápidas que
+    ignore_below (caché, pieza de un lote ya generado) no dicen nada de la carga
+    de Ollama y no cuentan
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        initial: Optional[int] = None,
+        tolerance: float = 1.5,
+        sustained: int = 3,
+        backoff: float = 0.5,
+        min_samples: int = 20,
+        window: int = 100,
+        ignore_below: float = 0.05
+    ):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = min(max(initial or self.minimum, self.minimum), self.maximum)
+        self.tolerance = tolerance
+        self.sustained = max(1, sustained)
+        self.backoff = backoff
+        self.min_samples = max(1, min_samples)
+        self.window = window
+        self.ignore_below = ignore_below
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._healthy_streak = 0
+        self._slow_streak = 0
+        self._ignore_remaining = 0
+        self._latencies: Dict[Hashable, Deque[float]] = {}
+        self._baselines: Dict[Hashable, float] = {}
+        self._start = time.monotonic()
+        self._changed_at = self._start
+        self._limit_seconds = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.peak_in_flight = 0
+        self.timeline: List[Dict[str, Any]] = [{"t": 0.0, "limit": self.limit, "reason": "initial"}]
+
+    def acquire(self):
+        """Espera hasta que haya hueco bajo el límite actual"""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+
+    def release(self, key: Hashable, seconds: float, ok: bool):
+        """Libera el hueco y ajusta el límite con el resultado de la solicitud"""
+        with self._condition:
+            self._in_flight -= 1
+            if ok and seconds < self.ignore_below:
+                self._condition.notify_all()
+                return
+            if self._ignore_remaining > 0:
+                self._ignore_remaining -= 1
+                if ok:
+                    self._record(key, seconds)
+            elif not ok:
+                self._decrease("failure")
+            elif self._is_slow(key, seconds):
+                self._record(key, seconds)
+                self._healthy_streak = 0
+                self._slow_streak += 1
+                if self._slow_streak >= self.sustained:
+                    if self.limit == self.minimum:
+                        self._rebase(key)
+                    self._decrease("latency")
+            else:
+                self._record(key, seconds)
+                self._slow_streak = 0
+                self._healthy_streak += 1
+                if self._healthy_streak >= self.limit and self.limit < self.maximum:
+                    self._set_limit(self.limit + 1, "healthy")
+                    self.increases += 1
+                    self._healthy_streak = 0
+            self._condition.notify_all()
+
+    def _record(self, key: Hashable, seconds: float):
+        samples = self._latencies.setdefault(key, deque(maxlen=self.window))
+        samples.append(seconds)
+        if len(samples) >= self.min_samples:
+            median = percentile(list(samples), 50)
+            self._baselines[key] = min(self._baselines.get(key, median), median)
+
+    def _rebase(self, key: Hashable):
+        median = percentile(list(self._latencies[key]), 50)
+        logger.info(f"Concurrencia adaptativa: latencia base de {key} {self._baselines[key]:.2f}s → {median:.2f}s")
+        self._baselines[key] = median
+
+    def _is_slow(self, key: Hashable, seconds: float) -> bool:
+        baseline = self._baselines.get(key)
+        return baseline is not None and seconds > baseline * self.tolerance
+
+    def _decrease(self, reason: str):
+        self._healthy_streak = 0
+        self._slow_streak = 0
+        # Lo que sigue en vuelo se despachó con el límite anterior
+        self._ignore_remaining = self._in_flight
+        new_limit = max(self.minimum, int(self.limit * self.backoff))
+        if new_limit < self.limit:
+            logger.info(f"Concurrencia adaptativa: {self.limit} → {new_limit} en vuelo ({reason})")
+            self._set_limit(new_limit, reason)
+            self.decreases += 1
+
+    def _set_limit(self, limit: int, reason: str):
+        now = time.monotonic()
+        self._limit_seconds += self.limit * (now - self._changed_at)
+        self._changed_at = now
+        self.limit = limit
+        self.timeline.append({"t": round(now - self._start, 3), "limit": limit, "reason": reason})
+
+    def summary(self) -> Dict[str, Any]:
+        """Límite final, medio ponderado por tiempo, cambios y evolución del límite"""
+        with self._condition:
+            now = time.monotonic()
+            elapsed = now - self._start
+            limit_seconds = self._limit_seconds + self.limit * (now - self._changed_at)
+            return {
+                "initial": self.timeline[0]["limit"],
+                "final": self.limit,
+                "minimum": self.minimum,
+                "maximum": self.maximum,
+                "mean": round(limit_seconds / elapsed, 2) if elapsed > 0 else float(self.limit),
+                "peak_in_flight": self.peak_in_flight,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "timeline": list(self.timeline)
+            }
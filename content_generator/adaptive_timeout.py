@@ -0,0 +1,110 @@
+# content_generator/adaptive_timeout.py
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional
+
+from content_generator.generation_metrics import percentile
+
+
+class AdaptiveTimeout:
+    """
+    Timeout por llamada derivado de la latencia observada.
+
+    Mientras no hay min_samples de una clave (p. ej. un tipo de contenido) se usan
+    las latencias de todas las claves, y sin ellas el timeout por defecto; después,
+    el percentil indicado de las últimas `window` latencias multiplicado por
+    `multiplier`, acotado entre minimum y el timeout por defecto. Una llamada que
+    tarda más que eso casi seguro está atascada.
+
+    Las llamadas que agotan el timeout no tienen latencia, solo una cota inferior:
+    se registran como muestra censurada con el valor del timeout y además ensanchan
+    el timeout de la clave (× multiplier) hasta que min_samples llamadas terminen
+    bien, para que un timeout demasiado ajustado no se perpetúe
+    """
+
+    # Clave interna con las latencias de todas las llamadas
+    ALL = "*"
+
+    def __init__(
+        self,
+        default: float,
+        minimum: float = 15.0,
+        multiplier: float = 2.0,
+        pct: float = 99.0,
+        min_samples: int = 8,
+        window: int = 200
+    ):
+        self.default = default
+        self.minimum = min(minimum, default)
+        self.multiplier = multiplier
+        self.pct = pct
+        self.min_samples = max(1, min_samples)
+        self.window = window
+        self._latencies: Dict[Hashable, Deque[float]] = {}
+        # Por clave: timeout mínimo tras un timeout y llamadas correctas que faltan para retirarlo
+        self._widened: Dict[Hashable, float] = {}
+        self._widened_remaining: Dict[Hashable, int] = {}
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, seconds: float):
+        """Registra la latencia de una llamada completada"""
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+            self._latencies.setdefault(self.ALL, deque(maxlen=self.window)).append(seconds)
+            if key in self._widened:
+                self._widened_remaining[key] -= 1
+                if self._widened_remaining[key] <= 0:
+                    del self._widened[key], self._widened_remaining[key]
+
+    def record_timeout(self, key: Hashable, timeout: float):
+        """Registra una llamada que agotó su timeout (latencia real >= timeout) y ensancha el de la clave"""
+        with self._lock:
+            self.timeouts += 1
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(timeout)
+            self._latencies.setdefault(self.ALL, deque(maxlen=self.window)).append(timeout)
+            self._widened[key] = min(max(timeout * self.multiplier, self._widened.get(key, 0.0)), self.default)
+            self._widened_remaining[key] = self.min_samples
+
+    def _samples(self, key: Hashable) -> list:
+        with self._lock:
+            samples = list(self._latencies.get(key, ()))
+            if len(samples) < self.min_samples:
+                samples = list(self._latencies.get(self.ALL, ()))
+            return samples
+
+    def timeout(self, key: Hashable, remaining: Optional[float] = None) -> float:
+        """Timeout de la próxima llamada; con remaining no excede el tiempo que queda de ejecución"""
+        samples = self._samples(key)
+        if len(samples) < self.min_samples:
+            value = self.default
+        else:
+            value = min(max(percentile(samples, self.pct) * self.multiplier, self.minimum), self.default)
+        with self._lock:
+            value = max(value, self._widened.get(key, 0.0))
+        if remaining is not None:
+            value = min(value, max(remaining, 1.0))
+        return value
+
+    def expected(self, key: Hashable) -> Optional[float]:
+        """Latencia mediana observada (None sin muestras suficientes)"""
+        samples = self._samples(key)
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, 50)
+
+    def summary(self) -> Dict[str, Any]:
+        """Por clave: muestras propias, percentiles usados y timeout resultante"""
+        summary = {}
+        with self._lock:
+            counts = {key: len(samples) for key, samples in self._latencies.items()}
+        for key, count in counts.items():
+            samples = self._samples(key)
+            summary[str(key)] = {
+                "samples": count,
+                "p50_s": round(percentile(samples, 50), 3),
+                f"p{self.pct:g}_s": round(percentile(samples, self.pct), 3),
+                "timeout_s": round(self.timeout(key), 1)
+            }
+        return summary
@@ -0,0 +1,201 @@
+# content_generator/backend_pool.py
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Peso de la última observación en la media móvil de latencia
+LATENCY_EWMA_ALPHA = 0.3
+
+
+class OllamaBackend:
+    """Un servidor Ollama del pool con su contabilidad de carga y salud"""
+
+    def __init__(self, client, max_in_flight: int):
+        self.client = client
+        self.url = client.base_url
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self.healthy = True
+        self.latency_ewma: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.consecutive_failures = 0
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.in_flight < self.max_in_flight
+
+    def record_latency(self, seconds: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "latency_ewma_s": round(self.latency_ewma, 3) if self.latency_ewma is not None else None
+        }
+
+
+class BackendPool:
+    """
+    Reparte las solicitudes entre varios servidores Ollama.
+
+    Respeta un límite de solicitudes simultáneas por backend, elige el de menos
+    solicitudes en vuelo o el de menor latencia, expulsa los que fallan seguido y
+    los readmite cuando la comprobación de salud vuelve a responder.
+    Todos los métodos se ejecutan en el event loop del cliente
+    """
+
+    def __init__(
+        self,
+        clients: List[Any],
+        routing: str = "least_in_flight",
+        max_in_flight: int = 4,
+        eject_after: int = 3,
+        health_interval: float = 15.0,
+        unavailable_error: Callable[[str], Exception] = RuntimeError
+    ):
+        if routing not in ("least_in_flight", "lowest_latency"):
+            raise ValueError(f"Enrutamiento desconocido: {routing}")
+        self.backends = [OllamaBackend(client, max_in_flight) for client in clients]
+        self.routing = routing
+        self.eject_after = max(1, eject_after)
+        self.health_interval = health_interval
+        self.unavailable_error = unavailable_error
+        self._affinity: Dict[str, OllamaBackend] = {}
+        self._condition: Optional[asyncio.Condition] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def capacity(self) -> int:
+        return sum(backend.max_in_flight for backend in self.backends)
+
+    def healthy_backends(self) -> List[OllamaBackend]:
+        return [backend for backend in self.backends if backend.healthy]
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        if self._health_task is None and self.health_interval > 0:
+            self._health_task = asyncio.ensure_future(self._health_loop())
+        return self._condition
+
+    def _pick(self, candidates: List[OllamaBackend]) -> OllamaBackend:
+        if self.routing == "lowest_latency":
+            # Latencia esperada: un backend sin medir se prueba primero
+            return min(candidates, key=lambda b: ((b.latency_ewma or 0.0) * (b.in_flight + 1), b.in_flight))
+        return min(candidates, key=lambda b: (b.in_flight / b.max_in_flight, b.latency_ewma or 0.0))
+
+    async def acquire(self, affinity: Optional[str] = None) -> OllamaBackend:
+        """
+        Reserva un hueco en un backend; espera si todos los sanos están llenos.
+        Con affinity, las solicitudes de la misma clave vuelven al mismo backend mientras tenga hueco
+        """
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                if not self.healthy_backends():
+                    raise self.unavailable_error("Ningún backend de Ollama disponible")
+
+                pinned = self._affinity.get(affinity) if affinity else None
+                if pinned is not None and pinned.available:
+                    backend = pinned
+                else:
+                    candidates = [backend for backend in self.backends if backend.available]
+                    if not candidates:
+                        await condition.wait()
+                        continue
+                    backend = self._pick(candidates)
+                    if affinity:
+                        self._affinity[affinity] = backend
+
+                backend.in_flight += 1
+                backend.requests += 1
+                return backend
+
+    async def release(self, backend: OllamaBackend, elapsed: Optional[float] = None, failed: bool = False):
+        """Libera el hueco; un fallo pasajero cuenta para la expulsión"""
+        condition = self._get_condition()
+        async with condition:
+            backend.in_flight -= 1
+            if failed:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.healthy and backend.consecutive_failures >= self.eject_after:
+                    self._eject(backend)
+            else:
+                backend.consecutive_failures = 0
+                if elapsed is not None:
+                    backend.record_latency(elapsed)
+            condition.notify_all()
+
+    async def call(
+        self,
+        operation: Callable[[Any], Awaitable[T]],
+        affinity: Optional[str] = None,
+        is_transient: Callable[[Exception], bool] = lambda e: True
+    ) -> T:
+        """Ejecuta operation(client) en el backend elegido"""
+        backend = await self.acquire(affinity)
+        start = time.perf_counter()
+        try:
+            result = await operation(backend.client)
+        except Exception as e:
+            await self.release(backend, failed=is_transient(e))
+            raise
+        except BaseException:
+            await self.release(backend)
+            raise
+        await self.release(backend, elapsed=time.perf_counter() - start)
+        return result
+
+    async def check_health(self) -> bool:
+        """Sondea todos los backends, expulsa o readmite según respondan; True si alguno está sano"""
+        results = await asyncio.gather(*(backend.client.test_connection() for backend in self.backends))
+        condition = self._get_condition()
+        async with condition:
+            for backend, ok in zip(self.backends, results):
+                if ok and not backend.healthy:
+                    backend.healthy = True
+                    backend.consecutive_failures = 0
+                    logger.info(f"✓ Backend readmitido: {backend.url}")
+                elif not ok and backend.healthy:
+                    self._eject(backend)
+            condition.notify_all()
+        return any(results)
+
+    def _eject(self, backend: OllamaBackend):
+        backend.healthy = False
+        backend.ejections += 1
+        self._affinity = {key: pinned for key, pinned in self._affinity.items() if pinned is not backend}
+        logger.warning(f"Backend expulsado del pool: {backend.url}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"Error en la comprobación de salud: {e}")
+
+    async def aclose(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(*(backend.client.aclose() for backend in self.backends))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [backend.summary() for backend in self.backends]
@@ -0,0 +1,74 @@
+# content_generator/batched_generation.py
+
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+from jsonschema import Draft202012Validator
+
+logger = logging.getLogger(__name__)
+
+# Longitud mínima de una pieza para considerarla válida
+MIN_PIECE_CHARS = 40
+
+
+def plan_batches(content_types: List[str], num_predict: Dict[str, int], max_predict: int) -> List[List[str]]:
+    """
+    Agrupa tipos de contenido en lotes cuya salida total (num_predict) cabe en max_predict.
+    Se conserva el orden recibido; un tipo que por sí solo excede el límite va en un lote propio
+    """
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_predict = 0
+    for content_type in content_types:
+        predict = num_predict.get(content_type, 0)
+        if current and current_predict + predict > max_predict:
+            batches.append(current)
+            current, current_predict = [], 0
+        current.append(content_type)
+        current_predict += predict
+    if current:
+        batches.append(current)
+    return batches
+
+
+def batch_schema(content_types: List[str]) -> Dict[str, Any]:
+    """Esquema JSON del objeto que devuelve una llamada por lotes (también se envía como format a Ollama)"""
+    return {
+        "type": "object",
+        "properties": {
+            content_type: {"type": "string", "minLength": MIN_PIECE_CHARS}
+            for content_type in content_types
+        },
+        "required": list(content_types),
+        "additionalProperties": False
+    }
+
+
+def parse_batch_response(text: str, content_types: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Valida la respuesta contra el esquema pieza por pieza.
+    Devuelve las piezas válidas y los tipos de contenido que hay que generar por separado
+    """
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("Respuesta por lotes no es JSON válido")
+        return {}, list(content_types)
+    if not isinstance(data, dict):
+        return {}, list(content_types)
+
+    schema = batch_schema(content_types)
+    valid: Dict[str, str] = {}
+    invalid: List[str] = []
+    for content_type in content_types:
+        validator = Draft202012Validator(schema["properties"][content_type])
+        value = data.get(content_type)
+        if content_type in data and validator.is_valid(value):
+            valid[content_type] = value.strip()
+        else:
+            invalid.append(content_type)
+
+    if invalid:
+        logger.warning(f"Piezas inválidas en la respuesta por lotes: {', '.join(invalid)}")
+    return valid, invalid
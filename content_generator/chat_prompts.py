@@ -0,0 +1,35 @@
+# content_generator/chat_prompts.py
+
+from typing import Dict, List, Optional
+
+# Pautas comunes a todas las generaciones: viajan una sola vez como mensaje de
+# sistema (o en el SYSTEM de un Modelfile) y no se repiten en cada turno de usuaria
+CHAT_SYSTEM_PROMPT = """Eres una experta en salud femenina y bienestar menstrual. Tu tarea es generar contenido personalizado y empático para mujeres en diferentes fases de su ciclo menstrual.
+
+En cada solicitud recibirás el perfil de un segmento de usuarias, sus requisitos, el contexto médico relevante y las instrucciones de un tipo de contenido.
+
+REQUISITOS GENERALES:
+- RESPETA ESTRICTAMENTE los límites de longitud especificados para cada tipo de contenido
+- Incluye consejos prácticos y validación emocional
+- NO hagas diagnósticos médicos
+- Usa lenguaje empático y comprensivo
+- Basa el contenido en la información médica proporcionada
+- Dirige el contenido directamente a la usuaria usando "tú" y "tu"
+"""
+
+
+def build_chat_messages(user_content: str, system: Optional[str] = CHAT_SYSTEM_PROMPT) -> List[Dict[str, str]]:
+    """Mensajes para /api/chat; sin system, el modelo usa el SYSTEM de su Modelfile"""
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": user_content})
+    return messages
+
+
+def build_system_modelfile(base_model: str, system: str = CHAT_SYSTEM_PROMPT) -> str:
+    """
+    Modelfile derivado de base_model con las pautas como SYSTEM; hereda la
+    plantilla de chat y los parámetros del modelo base
+    """
+    return f'FROM {base_model}\nSYSTEM """{system}"""\n'
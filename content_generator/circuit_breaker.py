@@ -0,0 +1,123 @@
+# content_generator/circuit_breaker.py
+
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """El circuito sigue abierto después de la pausa máxima"""
+
+
+class CircuitBreaker:
+    """
+    Interruptor de circuito para Ollama.
+
+    Tras failure_threshold fallos consecutivos el circuito se abre y todas las
+    llamadas esperan (el pipeline queda en pausa). Cada reset_seconds se ejecuta
+    una sonda ligera; si responde, el circuito se cierra y las llamadas continúan
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        max_pause_seconds: float = 900.0,
+        probe: Optional[Callable[[], bool]] = None
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.max_pause_seconds = max_pause_seconds
+        self.probe = probe
+        self.state = self.CLOSED
+        self.opened_count = 0
+        self.paused_seconds = 0.0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_since = 0.0
+        self._probing = False
+        self._condition = threading.Condition()
+
+    def before_call(self):
+        """
+        Bloquea mientras el circuito está abierto; lanza CircuitOpenError si se agota la pausa.
+        El límite es del circuito, no de cada llamada: agotada la pausa desde que se abrió,
+        las llamadas fallan de inmediato (salvo la que sondea, una vez por reset_seconds)
+        """
+        with self._condition:
+            if self.state == self.CLOSED:
+                return
+            deadline = self._open_since + self.max_pause_seconds
+
+            while self.state == self.OPEN:
+                now = time.monotonic()
+                if now >= deadline and (self._probing or now - self._opened_at < self.reset_seconds):
+                    raise CircuitOpenError(f"Ollama no disponible tras {self.max_pause_seconds:.0f}s de pausa")
+
+                # Un solo hilo sondea; el resto espera a que cambie el estado
+                if not self._probing and now - self._opened_at >= self.reset_seconds:
+                    self._probing = True
+                    self._condition.release()
+                    try:
+                        healthy = self._run_probe()
+                    finally:
+                        self._condition.acquire()
+                        self._probing = False
+                    if healthy:
+                        self._close()
+                    else:
+                        self._opened_at = time.monotonic()
+                        if self._opened_at >= deadline:
+                            raise CircuitOpenError(f"Ollama no disponible tras {self.max_pause_seconds:.0f}s de pausa")
+                        logger.warning(f"Ollama sigue sin responder; nuevo intento en {self.reset_seconds:.0f}s")
+                    continue
+
+                remaining = self.reset_seconds - (now - self._opened_at)
+                self._condition.wait(timeout=max(min(remaining, deadline - now), 0.05))
+
+    def record_success(self):
+        with self._condition:
+            self._failures = 0
+            if self.state == self.OPEN:
+                self._close()
+
+    def record_failure(self):
+        with self._condition:
+            self._failures += 1
+            if self.state == self.CLOSED and self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._open_since = time.monotonic()
+                self.opened_count += 1
+                logger.error(
+                    f"Circuito abierto tras {self._failures} fallos consecutivos: "
+                    f"pipeline en pausa, sondeo cada {self.reset_seconds:.0f}s"
+                )
+
+    def _close(self):
+        self.paused_seconds += time.monotonic() - self._open_since
+        self.state = self.CLOSED
+        self._failures = 0
+        logger.info("✓ Ollama responde de nuevo: circuito cerrado, se reanuda el pipeline")
+        self._condition.notify_all()
+
+    def _run_probe(self) -> bool:
+        if self.probe is None:
+            return True
+        try:
+            return bool(self.probe())
+        except Exception:
+            return False
+
+    def summary(self):
+        with self._condition:
+            return {
+                "state": self.state,
+                "opened_count": self.opened_count,
+                "paused_seconds": round(self.paused_seconds, 1)
+            }
@@ -0,0 +1,99 @@
+# content_generator/generation_cache.py
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """sha256 de un archivo local (None si no existe)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return "sha256:" + hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def generation_cache_key(model: str, modelfile_digest: Optional[str], prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Clave direccionada por contenido de una generación"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "modelfile_digest": modelfile_digest,
+            "prompt": prompt,
+            "options": options or {}
+        },
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Caché persistente (SQLite) de generaciones: si el prompt, el modelo y las
+    opciones no cambian, se reutiliza la respuesta sin llamar a Ollama
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                generation_seconds REAL NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve el contenido cacheado y contabiliza el acierto o fallo"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT content, generation_seconds FROM generations WHERE key = ?", (key,)).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.seconds_saved += row[1]
+        return row[0]
+
+    def put(self, key: str, model: str, content: str, generation_seconds: float):
+        """Guarda una generación exitosa"""
+        if not content:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generations (key, model, content, generation_seconds, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, generation_seconds, time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        """Tasa de aciertos y tiempo de cómputo ahorrado en esta ejecución"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 1)
+            }
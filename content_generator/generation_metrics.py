@@ -0,0 +1,112 @@
+# content_generator/generation_metrics.py
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+# Duraciones que Ollama reporta en nanosegundos
+DURATION_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+
+
+def eval_stats(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Contadores de evaluación de una respuesta de Ollama, con duraciones en segundos"""
+    stats: Dict[str, Any] = {
+        "prompt_eval_count": response.get("prompt_eval_count", 0),
+        "eval_count": response.get("eval_count", 0)
+    }
+    for name in DURATION_FIELDS:
+        stats[name.replace("_duration", "_seconds")] = round(response.get(name, 0) / 1e9, 4)
+
+    stats["tokens_per_second"] = (
+        round(stats["eval_count"] / stats["eval_seconds"], 2) if stats["eval_seconds"] else None
+    )
+    stats["prompt_tokens_per_second"] = (
+        round(stats["prompt_eval_count"] / stats["prompt_eval_seconds"], 2) if stats["prompt_eval_seconds"] else None
+    )
+    return stats
+
+
+def summarize_generation_metrics(metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Agrega las métricas por pieza: tokens de prompt y de salida, tokens/s,
+    tiempo de carga del modelo y percentiles de latencia.
+    Las llamadas sin contadores (stream cortado por el cliente) cuentan en la
+    latencia pero no en los agregados de tokens y tiempos de evaluación
+    """
+    generated = [m for m in metrics if not m.get("cache_hit")]
+    latencies = [m["latency_seconds"] for m in generated if m.get("latency_seconds") is not None]
+    measured = [m for m in generated if m.get("eval_count") is not None]
+    eval_tokens = sum(m.get("eval_count") or 0 for m in measured)
+    eval_seconds = sum(m.get("eval_seconds") or 0.0 for m in measured)
+    prompt_tokens = sum(m.get("prompt_eval_count") or 0 for m in measured)
+    prompt_seconds = sum(m.get("prompt_eval_seconds") or 0.0 for m in measured)
+
+    return {
+        "pieces": len(metrics),
+        "cache_hits": len(metrics) - len(generated),
+        "without_counters": len(generated) - len(measured),
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": eval_tokens,
+        "tokens_per_second": round(eval_tokens / eval_seconds, 2) if eval_seconds else None,
+        "prompt_tokens_per_second": round(prompt_tokens / prompt_seconds, 2) if prompt_seconds else None,
+        "prompt_eval_seconds": round(prompt_seconds, 2),
+        "eval_seconds": round(eval_seconds, 2),
+        "load_seconds": round(sum(m.get("load_seconds") or 0.0 for m in measured), 2),
+        "latency_p50_s": round(percentile(latencies, 50), 3) if latencies else None,
+        "latency_p95_s": round(percentile(latencies, 95), 3) if latencies else None,
+        "latency_p99_s": round(percentile(latencies, 99), 3) if latencies else None
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por interpolación lineal (0 si no hay valores)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+@dataclass
+class GenerationMetrics:
+    """Métricas de una solicitud de generación"""
+    started_at: float = field(default_factory=time.perf_counter)
+    ttft_seconds: Optional[float] = None
+    total_seconds: Optional[float] = None
+    inter_token_latencies: List[float] = field(default_factory=list)
+    output_chunks: int = 0
+    stop_reason: Optional[str] = None
+    # Contadores de Ollama del último fragmento (solo si el stream terminó en el servidor)
+    eval_stats: Optional[Dict[str, Any]] = None
+    _last_token_at: Optional[float] = field(default=None, repr=False)
+
+    def record_token(self):
+        """Registra la llegada de un fragmento del stream"""
+        now = time.perf_counter()
+        if self.ttft_seconds is None:
+            self.ttft_seconds = now - self.started_at
+        elif self._last_token_at is not None:
+            self.inter_token_latencies.append(now - self._last_token_at)
+        self._last_token_at = now
+        self.output_chunks += 1
+
+    def finish(self, stop_reason: Optional[str] = None):
+        self.total_seconds = time.perf_counter() - self.started_at
+        self.stop_reason = stop_reason or self.stop_reason
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumen serializable"""
+        return {
+            "ttft_ms": round(self.ttft_seconds * 1000, 1) if self.ttft_seconds is not None else None,
+            "total_ms": round(self.total_seconds * 1000, 1) if self.total_seconds is not None else None,
+            "inter_token_ms_mean": round(sum(self.inter_token_latencies) / len(self.inter_token_latencies) * 1000, 2)
+            if self.inter_token_latencies else None,
+            "inter_token_ms_p95": round(percentile(self.inter_token_latencies, 95) * 1000, 2)
+            if self.inter_token_latencies else None,
+            "output_chunks": self.output_chunks,
+            "stop_reason": self.stop_reason,
+            "eval_stats": self.eval_stats
+        }
@@ -0,0 +1,69 @@
+# content_generator/generation_options.py
+
+import math
+from typing import Any, Dict, List, Optional
+
+# Longitud máxima (palabras) que piden las instrucciones de cada tipo de contenido
+OUTPUT_WORD_LIMITS = {
+    "lesson_3min": 500,
+    "whats_happening": 90,
+    "nutrition_guide": 450,
+    "cycle_day_info": 350,
+    "hormone_levels": 450,
+    "stress_levels": 450
+}
+
+# Tokens por palabra en español con el tokenizador de Mistral, y margen para cerrar la idea
+TOKENS_PER_WORD = 1.6
+OUTPUT_HEADROOM = 1.15
+
+# Temperatura base: más baja en los tipos factuales (días, niveles hormonales)
+BASE_TEMPERATURES = {
+    "lesson_3min": 0.7,
+    "whats_happening": 0.6,
+    "nutrition_guide": 0.5,
+    "cycle_day_info": 0.3,
+    "hormone_levels": 0.4,
+    "stress_levels": 0.5
+}
+
+# Con urgencia alta el contenido debe ser más contenido y predecible
+URGENCY_TEMPERATURE_SHIFT = {
+    "muy_alta": -0.2,
+    "alta": -0.1,
+    "moderada": 0.0,
+    "baja": 0.1
+}
+
+# Si el modelo empieza a repetir el prompt o a abrir otra sección, se corta
+STOP_SEQUENCES = ["[INST]", "[/INST]", "SEGMENTO:", "REQUISITOS OBLIGATORIOS", "INSTRUCCIONES ESPECÍFICAS"]
+
+
+def max_output_words(content_type: str, rules: Dict[str, Any]) -> int:
+    """Palabras máximas: el límite del tipo de contenido acotado por max_length del segmento"""
+    limit = OUTPUT_WORD_LIMITS.get(content_type, rules.get("max_length", 600))
+    return min(limit, rules.get("max_length", limit))
+
+
+def build_generation_options(
+    content_type: str,
+    rules: Dict[str, Any],
+    num_ctx: int,
+    stop: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Opciones de Ollama para un par (segmento, tipo de contenido) a partir de
+    content_generation_rules: num_predict acota la duración de la generación.
+
+    num_ctx es el mismo en toda la ejecución: cambiarlo entre solicitudes obliga
+    a Ollama a recargar el modelo
+    """
+    words = max_output_words(content_type, rules)
+    temperature = BASE_TEMPERATURES.get(content_type, 0.6) + URGENCY_TEMPERATURE_SHIFT.get(rules.get("urgency"), 0.0)
+
+    return {
+        "num_predict": math.ceil(words * TOKENS_PER_WORD * OUTPUT_HEADROOM),
+        "num_ctx": num_ctx,
+        "temperature": round(min(max(temperature, 0.1), 1.0), 2),
+        "stop": list(stop if stop is not None else STOP_SEQUENCES)
+    }
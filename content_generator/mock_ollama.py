@@ -0,0 +1,486 @@
+# content_generator/mock_ollama.py
+"""
+Servidor local que imita la API de Ollama (/api/generate, /api/chat, /api/tags, /api/ps)
+para medir el pipeline de generación sin modelo: latencia y velocidad de tokens
+configurables, inyección de errores y salidas deterministas por prompt.
+
+    python -m content_generator.mock_ollama --port 11434 --tokens-per-second 40
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from retrieval.context_packer import estimate_tokens
+from config.settings import OLLAMA_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Vocabulario de las respuestas simuladas
+MOCK_VOCABULARY = (
+    "el ciclo menstrual tiene fases folicular ovulatoria lútea y menstrual durante cada fase "
+    "los niveles de estrógeno y progesterona cambian y eso influye en la energía el ánimo "
+    "el sueño y el apetito una alimentación rica en hierro magnesio y omega tres ayuda "
+    "a sostener la energía respirar despacio caminar y descansar reduce el estrés "
+    "escucha a tu cuerpo y registra cómo te sientes cada día"
+).split()
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+@dataclass
+class MockOllamaConfig:
+    """Comportamiento del servidor simulado (tiempos en segundos)"""
+    model: str = OLLAMA_MODEL
+    latency: str = "fixed"
+    latency_mean: float = 0.05
+    latency_spread: float = 0.0
+    prompt_tokens_per_second: float = 2000.0
+    tokens_per_second: float = 200.0
+    default_num_predict: int = 200
+    load_seconds: float = 0.0
+    num_parallel: int = 4
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 0
+    # SYSTEM del Modelfile del modelo simulado: la plantilla lo inserta en cada
+    # solicitud que no trae su propio mensaje de sistema
+    system: Optional[str] = None
+
+
+class MockOllamaState:
+    """Modelo residente, RNG de latencias y errores y contadores de la ejecución"""
+
+    def __init__(self, config: MockOllamaConfig):
+        self.config = config
+        self.slots = threading.BoundedSemaphore(max(1, config.num_parallel))
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.loaded_until: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+
+    def sample_latency(self) -> float:
+        """Latencia fija de cada solicitud (red, scheduling) según la distribución configurada"""
+        config = self.config
+        with self._lock:
+            if config.latency == "uniform":
+                value = self._rng.uniform(config.latency_mean - config.latency_spread, config.latency_mean + config.latency_spread)
+            elif config.latency == "lognormal" and config.latency_mean > 0:
+                # latency_spread es la desviación típica del logaritmo; la media se conserva
+                sigma = config.latency_spread
+                value = self._rng.lognormvariate(math.log(config.latency_mean) - sigma ** 2 / 2, sigma)
+            else:
+                value = config.latency_mean
+        return max(0.0, value)
+
+    def inject_error(self) -> bool:
+        with self._lock:
+            failed = self.config.error_rate > 0 and self._rng.random() < self.config.error_rate
+            self.requests += 1
+            if failed:
+                self.errors += 1
+            return failed
+
+    def load_model(self, keep_alive: Any) -> float:
+        """Segundos de carga (0 si ya está residente); renueva la permanencia en memoria"""
+        now = time.time()
+        with self._lock:
+            cold = self.loaded_until is None or self.loaded_until < now
+            self.loaded_until = now + _keep_alive_seconds(keep_alive)
+        if cold and self.config.load_seconds:
+            time.sleep(self.config.load_seconds)
+        return self.config.load_seconds if cold else 0.0
+
+    def enter(self):
+        """Ocupa un hueco de ejecución; como Ollama, las solicitudes de más esperan en cola"""
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        self.slots.acquire()
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+        self.slots.release()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "peak_in_flight": self.peak_in_flight,
+            "peak_queued": self.peak_queued
+        }
+
+
+def _keep_alive_seconds(keep_alive: Any) -> float:
+    """keep_alive de Ollama ("30m", "1h", "10s", segundos o negativo = indefinido) en segundos"""
+    if keep_alive is None:
+        return 300.0
+    if isinstance(keep_alive, (int, float)):
+        return float("inf") if keep_alive < 0 else float(keep_alive)
+    units = {"s": 1, "m": 60, "h": 3600}
+    text = str(keep_alive).strip()
+    try:
+        if text[-1:] in units:
+            value = float(text[:-1]) * units[text[-1]]
+        else:
+            value = float(text)
+    except ValueError:
+        return 300.0
+    return float("inf") if value < 0 else value
+
+
+def mock_tokens(prompt: str, count: int, seed: int = 0) -> List[str]:
+    """Tokens deterministas: el mismo prompt (y semilla) produce siempre el mismo texto"""
+    digest = hashlib.sha256(f"{seed}:{prompt}".encode("utf-8")).digest()
+    rng = random.Random(int.from_bytes(digest[:8], "big"))
+    words = [rng.choice(MOCK_VOCABULARY) for _ in range(count)]
+    if words:
+        words[0] = words[0].capitalize()
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def mock_structured_output(prompt: str, schema: Any, count: int, seed: int = 0) -> str:
+    """Salida con format: un objeto JSON con un texto por propiedad del esquema"""
+    if not isinstance(schema, dict) or not schema.get("properties"):
+        return json.dumps({"response": "".join(mock_tokens(prompt, count, seed))}, ensure_ascii=False)
+    properties = list(schema["properties"])
+    per_property = max(1, count // len(properties))
+    return json.dumps(
+        {name: "".join(mock_tokens(f"{prompt}:{name}", per_property, seed)) for name in properties},
+        ensure_ascii=False
+    )
+
+
+def _chat_prompt(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"{message.get('role', 'user')}: {message.get('content', '')}" for message in messages)
+
+
+def modelfile_system(modelfile: str) -> Optional[str]:
+    """Texto de la instrucción SYSTEM de un Modelfile (None si no tiene)"""
+    match = re.search(r'^SYSTEM\s+"""(.*?)"""', modelfile, re.MULTILINE | re.DOTALL)
+    if match:
+        return match.group(1)
+    match = re.search(r"^SYSTEM\s+(.+)$", modelfile, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+
+def render_template(request: Dict[str, Any], chat: bool, default_system: Optional[str] = None) -> str:
+    """
+    Texto que evalúa el modelo según la plantilla [INST] de maurallm.modelfile: el
+    sistema (el de la solicitud o, si no hay, el SYSTEM del Modelfile) va dentro del
+    último [INST] en cada solicitud
+    """
+    if chat:
+        messages = request.get("messages") or []
+        system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system") or default_system
+        turns = [m for m in messages if m.get("role") != "system"]
+    else:
+        system = request.get("system") or default_system
+        turns = [{"role": "user", "content": request.get("prompt") or ""}]
+
+    parts = []
+    last_user = max((i for i, m in enumerate(turns) if m.get("role") == "user"), default=-1)
+    for i, message in enumerate(turns):
+        if message.get("role") == "user":
+            prefix = f"{system}\n\n" if system and i == last_user else ""
+            parts.append(f"[INST] {prefix}{message.get('content', '')}[/INST]")
+        else:
+            parts.append(f"{message.get('content', '')}</s>")
+    return "".join(parts)
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOllama/1.0"
+    # Cabeceras y cuerpo van en escrituras separadas: sin esto Nagle añade ~40 ms por respuesta
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> MockOllamaState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            return {}
+
+    def do_GET(self):
+        config = self.state.config
+        if self.path == "/api/tags":
+            digest = hashlib.sha256(f"{config.model}:{config.seed}".encode("utf-8")).hexdigest()
+            return self._send_json(200, {"models": [{
+                "name": f"{config.model}:latest",
+                "model": f"{config.model}:latest",
+                "digest": digest,
+                "size": 0
+            }]})
+        if self.path == "/api/ps":
+            loaded_until = self.state.loaded_until
+            models = []
+            if loaded_until is not None and loaded_until >= time.time():
+                expires = (
+                    datetime.max.replace(tzinfo=timezone.utc) if math.isinf(loaded_until)
+                    else datetime.fromtimestamp(loaded_until, tz=timezone.utc)
+                )
+                models.append({"name": f"{config.model}:latest", "model": f"{config.model}:latest",
+                               "expires_at": expires.isoformat()})
+            return self._send_json(200, {"models": models})
+        if self.path in ("/", "/api/version"):
+            return self._send_json(200, {"version": "mock"})
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            return self._send_json(404, {"error": "not found"})
+        request = self._read_json()
+        chat = self.path == "/api/chat"
+        prompt = _chat_prompt(request.get("messages") or []) if chat else request.get("prompt")
+
+        if self.state.inject_error():
+            return self._send_json(self.state.config.error_status, {"error": "error inyectado por el servidor simulado"})
+
+        self.state.enter()
+        try:
+            load_seconds = self.state.load_model(request.get("keep_alive"))
+            if not prompt:
+                # Solicitud sin prompt: solo carga el modelo
+                return self._send_json(200, self._final(request, chat, "", load_seconds, 0, 0, 0.0, 0.0, "load"))
+            self._generate(request, chat, prompt, load_seconds)
+        finally:
+            self.state.leave()
+
+    def _generate(self, request: Dict[str, Any], chat: bool, prompt: str, load_seconds: float):
+        config = self.state.config
+        options = request.get("options") or {}
+        num_predict = options.get("num_predict") or config.default_num_predict
+        if num_predict < 0:
+            num_predict = config.default_num_predict
+
+        prompt_tokens = estimate_tokens(render_template(request, chat, config.system))
+        prompt_seconds = prompt_tokens / config.prompt_tokens_per_second if config.prompt_tokens_per_second else 0.0
+        time.sleep(self.state.sample_latency() + prompt_seconds)
+
+        response_format = request.get("format")
+        if response_format is not None:
+            tokens = [mock_structured_output(prompt, response_format, num_predict, config.seed)]
+        else:
+            tokens = mock_tokens(prompt, num_predict, config.seed)
+        token_seconds = 1 / config.tokens_per_second if config.tokens_per_second else 0.0
+        eval_seconds = num_predict * token_seconds
+
+        if not request.get("stream", True):
+            time.sleep(eval_seconds)
+            text = "".join(tokens)
+            return self._send_json(200, self._final(
+                request, chat, text, load_seconds, prompt_tokens, num_predict, prompt_seconds, eval_seconds, "length"
+            ))
+
+        # Streaming NDJSON con codificación chunked, un token por línea
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # El stream dura lo mismo que eval_seconds aunque haya menos fragmentos que tokens
+        # (con format el JSON sale en un solo fragmento tras todo el tiempo de evaluación)
+        chunk_seconds = eval_seconds / len(tokens) if tokens else 0.0
+        try:
+            for token in tokens:
+                time.sleep(chunk_seconds)
+                self._write_chunk(self._chunk(request, chat, token))
+            self._write_chunk(self._final(
+                request, chat, "", load_seconds, prompt_tokens, num_predict, prompt_seconds, eval_seconds, "length"
+            ))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente cerró el stream (condición de parada): se aborta la generación
+            self.close_connection = True
+
+    def _write_chunk(self, data: Dict[str, Any]):
+        line = json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, request: Dict[str, Any], chat: bool, text: str) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "model": request.get("model", self.state.config.model),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": False
+        }
+        if chat:
+            data["message"] = {"role": "assistant", "content": text}
+        else:
+            data["response"] = text
+        return data
+
+    def _final(
+        self,
+        request: Dict[str, Any],
+        chat: bool,
+        text: str,
+        load_seconds: float,
+        prompt_tokens: int,
+        eval_count: int,
+        prompt_seconds: float,
+        eval_seconds: float,
+        done_reason: str
+    ) -> Dict[str, Any]:
+        data = self._chunk(request, chat, text)
+        data.update({
+            "done": True,
+            "done_reason": done_reason,
+            "total_duration": int((load_seconds + prompt_seconds + eval_seconds) * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": int(eval_seconds * 1e9)
+        })
+        return data
+
+
+class MockOllamaServer:
+    """
+    Servidor simulado en un hilo en segundo plano; port=0 elige un puerto libre.
+
+        with MockOllamaServer(MockOllamaConfig(tokens_per_second=100)) as server:
+            client = OllamaClient(server.url)
+    """
+
+    def __init__(self, config: Optional[MockOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockOllamaConfig()
+        if self.config.latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia desconocida: {self.config.latency}")
+        self.state = MockOllamaState(self.config)
+        self._httpd = ThreadingHTTPServer((host, port), MockOllamaHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"Ollama simulado escuchando en {self.url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def serve_forever(self):
+        logger.info(f"Ollama simulado escuchando en {self.url}")
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"config": asdict(self.config), **self.state.summary()}
+
+    def __enter__(self) -> "MockOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Opciones de MockOllamaConfig para la línea de comandos (servidor y benchmark)"""
+    defaults = MockOllamaConfig()
+    parser.add_argument("--mock-model", default=defaults.model, help="Nombre del modelo que anuncia /api/tags")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default=defaults.latency,
+                        help="Distribución de la latencia fija por solicitud")
+    parser.add_argument("--latency-mean", type=float, default=defaults.latency_mean)
+    parser.add_argument("--latency-spread", type=float, default=defaults.latency_spread,
+                        help="Semiancho (uniform) o sigma del logaritmo (lognormal)")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=defaults.prompt_tokens_per_second)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--default-num-predict", type=int, default=defaults.default_num_predict)
+    parser.add_argument("--load-seconds", type=float, default=defaults.load_seconds,
+                        help="Tiempo de carga del modelo en frío")
+    parser.add_argument("--num-parallel", type=int, default=defaults.num_parallel,
+                        help="Solicitudes atendidas a la vez (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--modelfile", default=None,
+                        help="Modelfile del modelo simulado; su SYSTEM cuenta en los tokens de cada prompt")
+
+
+def config_from_args(args: argparse.Namespace) -> MockOllamaConfig:
+    return MockOllamaConfig(
+        model=args.mock_model,
+        latency=args.latency,
+        latency_mean=args.latency_mean,
+        latency_spread=args.latency_spread,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        tokens_per_second=args.tokens_per_second,
+        default_num_predict=args.default_num_predict,
+        load_seconds=args.load_seconds,
+        num_parallel=args.num_parallel,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+        system=modelfile_system(Path(args.modelfile).read_text(encoding="utf-8")) if args.modelfile else None
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Ollama simulado para pruebas y benchmarks locales")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    server = MockOllamaServer(config_from_args(args), host=args.host, port=args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Servidor detenido: {server.state.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,757 @@
 # content_generator/ollama_client.py
-import requests
+import json
+import time
+import queue
+import asyncio
 import logging
-from typing import Optional
-from config.settings import OLLAMA_HOST, OLLAMA_PORT
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import backoff
+
+from content_generator.generation_metrics import GenerationMetrics, eval_stats
+from content_generator.circuit_breaker import CircuitBreaker, CircuitOpenError
+from content_generator.backend_pool import BackendPool
+
+from config.settings import (
+    OLLAMA_HOST, OLLAMA_PORT, OLLAMA_MODEL,
+    OLLAMA_BACKENDS, OLLAMA_ROUTING, OLLAMA_BACKEND_MAX_IN_FLIGHT,
+    OLLAMA_BACKEND_EJECT_AFTER, OLLAMA_HEALTH_INTERVAL,
+    OLLAMA_TIMEOUT, OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_MAX_CONNECTIONS, OLLAMA_MAX_KEEPALIVE, OLLAMA_KEEPALIVE_EXPIRY,
+    OLLAMA_RETRY_MAX_TRIES, OLLAMA_RETRY_MAX_TIME,
+    OLLAMA_BREAKER_FAILURE_THRESHOLD, OLLAMA_BREAKER_RESET_SECONDS, OLLAMA_BREAKER_MAX_PAUSE
+)
 
 logger = logging.getLogger(__name__)
 
-class OllamaClient:
+
+# Códigos HTTP que indican un problema pasajero del servidor
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class OllamaError(Exception):
+    """Error devuelto por Ollama o al comunicarse con él"""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retryable: bool = False,
+        timed_out: bool = False
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        # La respuesta no llegó dentro del timeout de lectura (la generación tardaba más)
+        self.timed_out = timed_out
+
+
+def _status_error(status_code: int) -> OllamaError:
+    return OllamaError(
+        f"Error en Ollama: {status_code}",
+        status_code=status_code,
+        retryable=status_code in RETRYABLE_STATUS_CODES
+    )
+
+
+def _transport_error(error: httpx.HTTPError) -> OllamaError:
+    # Timeouts y fallos de conexión (p. ej. Ollama reiniciándose) son reintentables
+    return OllamaError(
+        f"Error comunicándose con Ollama: {error!r}",
+        retryable=isinstance(error, httpx.TransportError),
+        timed_out=isinstance(error, httpx.ReadTimeout)
+    )
+
+
+async def _timed(request: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Añade a la respuesta request_seconds: la duración de la solicitud HTTP, sin colas ni reintentos"""
+    start = time.perf_counter()
+    result = await request
+    result["request_seconds"] = time.perf_counter() - start
+    return result
+
+
+def _is_transient(error: BaseException) -> bool:
+    return isinstance(error, OllamaError) and error.retryable
+
+
+class AsyncOllamaClient:
     """
-    Cliente para comunicarse con Ollama
+    Cliente asíncrono de Ollama sobre un pool de conexiones httpx con keep-alive
     """
-    
-    def __init__(self):
-        self.base_url = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}"
-    
-    def generate_content(self, prompt: str, model: str = "salud-femenina") -> Optional[str]:
-        """
-        Genera contenido usando Ollama
-        """
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=120
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: float = OLLAMA_TIMEOUT,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+        max_connections: int = OLLAMA_MAX_CONNECTIONS,
+        max_keepalive: int = OLLAMA_MAX_KEEPALIVE,
+        keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY
+    ):
+        self.base_url = base_url or f"http://{OLLAMA_HOST}:{OLLAMA_PORT}"
+        # keep_alive enviado con cada solicitud (p. ej. "30m" durante una ejecución masiva)
+        self.keep_alive: Optional[str] = None
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self._timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "").strip()
-            else:
-                logger.error(f"Error en Ollama: {response.status_code}")
-                return ""
-                
-        except Exception as e:
-            logger.error(f"Error comunicándose con Ollama: {e}")
+        )
+
+    def _timeout(self, read_timeout: float) -> httpx.Timeout:
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+
+    def _payload(
+        self,
+        prompt: Optional[str],
+        model: str,
+        stream: bool,
+        options: Optional[Dict[str, Any]],
+        response_format: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        if prompt is None:
+            # /api/chat: los mensajes los añade quien llama
+            del payload["prompt"]
+        if options:
+            payload["options"] = options
+        if response_format is not None:
+            # "json" o un esquema JSON (salida estructurada)
+            payload["format"] = response_format
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+        response_format: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera contenido y devuelve la respuesta completa de Ollama.
+        Lanza OllamaError si la solicitud falla
+        """
+        try:
+            response = await self._http.post(
+                "/api/generate",
+                json=self._payload(prompt, model, False, options, response_format),
+                timeout=self._timeout(timeout or self.timeout)
+            )
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+
+        if response.status_code != 200:
+            raise _status_error(response.status_code)
+
+        return response.json()
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = OLLAMA_MODEL,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+        response_format: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera a partir de una conversación (/api/chat) y devuelve la respuesta completa;
+        la plantilla del Modelfile coloca el mensaje de sistema. Lanza OllamaError si falla
+        """
+        payload = self._payload(None, model, False, options, response_format)
+        payload["messages"] = messages
+        try:
+            response = await self._http.post(
+                "/api/chat",
+                json=payload,
+                timeout=self._timeout(timeout or self.timeout)
+            )
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+
+        if response.status_code != 200:
+            raise _status_error(response.status_code)
+
+        return response.json()
+
+    async def generate_content(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Genera contenido usando Ollama; devuelve "" si falla
+        """
+        try:
+            result = await self.generate(prompt, model=model, timeout=timeout, options=options)
+            return result.get("response", "").strip()
+        except OllamaError as e:
+            logger.error(str(e))
             return ""
-    
-    def test_connection(self) -> bool:
+
+    async def stream_generate(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        max_output_chars: Optional[int] = None,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        metrics: Optional[GenerationMetrics] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Genera en modo streaming y produce el texto incrementalmente.
+
+        Las condiciones de parada (stop y max_output_chars) se aplican en el cliente:
+        al cumplirse se cierra el stream, lo que aborta la generación en Ollama.
+        El texto se retiene lo justo para no emitir el inicio de una secuencia de parada
+        """
+        metrics = metrics if metrics is not None else GenerationMetrics()
+        stop = [sequence for sequence in (stop or []) if sequence]
+        holdback = max((len(sequence) for sequence in stop), default=1) - 1
+
+        text = ""
+        emitted = 0
+        stop_reason = None
+
+        try:
+            async with self._http.stream(
+                "POST",
+                "/api/generate",
+                json=self._payload(prompt, model, True, options),
+                timeout=self._timeout(timeout or self.timeout)
+            ) as response:
+                if response.status_code != 200:
+                    raise _status_error(response.status_code)
+
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        # Línea NDJSON cortada o corrupta: transitorio, se reintenta como un error de red
+                        raise OllamaError(f"Respuesta de streaming inválida: {e}", retryable=True) from e
+                    if data.get("error"):
+                        raise OllamaError(f"Error en Ollama: {data['error']}")
+
+                    token = data.get("response", "")
+                    if token:
+                        metrics.record_token()
+                        text += token
+
+                    stops = [pos for pos in (text.find(sequence, emitted) for sequence in stop) if pos >= 0]
+                    if stops:
+                        end = min(stops)
+                        stop_reason = "stop"
+                    elif data.get("done"):
+                        end = len(text)
+                        stop_reason = data.get("done_reason", "done")
+                        metrics.eval_stats = eval_stats(data)
+                    else:
+                        end = max(len(text) - holdback, emitted)
+
+                    if max_output_chars is not None and end > max_output_chars:
+                        end = max_output_chars
+                        stop_reason = "max_length"
+
+                    if end > emitted:
+                        yield text[emitted:end]
+                        emitted = end
+
+                    if stop_reason:
+                        break
+
+                # Stream cerrado sin "done": emitir lo retenido
+                if not stop_reason and emitted < len(text):
+                    yield text[emitted:]
+                    stop_reason = "incomplete"
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+        finally:
+            metrics.finish(stop_reason)
+
+    async def test_connection(self) -> bool:
         """
         Prueba la conexión con Ollama
         """
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            response = await self._http.get("/api/tags", timeout=self._timeout(10))
             return response.status_code == 200
-        except:
-            return False
\ No newline at end of file
+        except httpx.HTTPError:
+            return False
+
+    async def preload(
+        self,
+        model: str = OLLAMA_MODEL,
+        keep_alive: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Carga el modelo en memoria sin generar (solicitud sin prompt).
+        Las opciones deben coincidir con las de la ejecución (num_ctx) o Ollama volverá a cargarlo
+        """
+        payload: Dict[str, Any] = {"model": model}
+        if options:
+            payload["options"] = options
+        keep_alive = keep_alive if keep_alive is not None else self.keep_alive
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        try:
+            response = await self._http.post("/api/generate", json=payload)
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+
+        if response.status_code != 200:
+            raise _status_error(response.status_code)
+
+        return response.json()
+
+    async def running_models(self) -> List[Dict[str, Any]]:
+        """
+        Modelos residentes en memoria según /api/ps
+        """
+        try:
+            response = await self._http.get("/api/ps", timeout=self._timeout(10))
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+
+        if response.status_code != 200:
+            raise _status_error(response.status_code)
+
+        return response.json().get("models", [])
+
+    async def model_digest(self, model: str = OLLAMA_MODEL) -> Optional[str]:
+        """
+        Digest del modelo instalado según /api/tags; cambia al reconstruir el Modelfile
+        """
+        try:
+            response = await self._http.get("/api/tags", timeout=self._timeout(10))
+        except httpx.HTTPError:
+            return None
+        if response.status_code != 200:
+            return None
+
+        names = {model, f"{model}:latest"}
+        for entry in response.json().get("models", []):
+            if entry.get("name") in names or entry.get("model") in names:
+                return entry.get("digest")
+        return None
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class OllamaClient:
+    """
+    Cliente para comunicarse con Ollama.
+
+    Envoltorio síncrono de AsyncOllamaClient: las corrutinas se ejecutan en un
+    event loop propio en segundo plano, de modo que varios hilos comparten el
+    mismo pool de conexiones. Con varios backends (OLLAMA_BACKENDS), cada
+    solicitud se enruta a través de un BackendPool.
+
+    Las generaciones se reintentan con backoff exponencial y jitter si el error es
+    pasajero, y pasan por un interruptor de circuito que pausa a todos los hilos
+    mientras Ollama no responde
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        base_urls: Optional[List[str]] = None,
+        routing: str = OLLAMA_ROUTING,
+        backend_max_in_flight: int = OLLAMA_BACKEND_MAX_IN_FLIGHT,
+        max_tries: int = OLLAMA_RETRY_MAX_TRIES,
+        max_retry_time: float = OLLAMA_RETRY_MAX_TIME,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        **client_options
+    ):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ollama-client", daemon=True)
+        self._thread.start()
+
+        urls = base_urls or ([base_url] if base_url else OLLAMA_BACKENDS)
+        self.pool = BackendPool(
+            [AsyncOllamaClient(base_url=url, **client_options) for url in urls],
+            routing=routing,
+            max_in_flight=backend_max_in_flight,
+            eject_after=OLLAMA_BACKEND_EJECT_AFTER,
+            health_interval=OLLAMA_HEALTH_INTERVAL,
+            unavailable_error=lambda message: OllamaError(message, retryable=True)
+        )
+        self.base_url = urls[0]
+        self.max_tries = max(1, max_tries)
+        self.max_retry_time = max_retry_time
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(
+            failure_threshold=OLLAMA_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=OLLAMA_BREAKER_RESET_SECONDS,
+            max_pause_seconds=OLLAMA_BREAKER_MAX_PAUSE,
+            probe=self.test_connection
+        )
+
+    def _run(self, coroutine, timeout: Optional[float] = None):
+        """Ejecuta una corrutina en el loop del cliente; cancela la solicitud si se interrumpe la espera"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def _call_with_retries(self, call: Callable[[], Any]) -> Any:
+        """
+        Ejecuta una llamada a Ollama a través del interruptor de circuito,
+        reintentando los errores pasajeros con backoff exponencial y jitter
+        """
+        timed_out = False
+
+        def on_backoff(details):
+            with self._retries_lock:
+                self.retries += 1
+            logger.warning(
+                f"Reintento {details['tries']}/{self.max_tries} en {details['wait']:.1f}s: {details['exception']}"
+            )
+
+        @backoff.on_exception(
+            backoff.expo,
+            OllamaError,
+            max_tries=self.max_tries,
+            max_time=self.max_retry_time,
+            jitter=backoff.full_jitter,
+            giveup=lambda e: not e.retryable,
+            on_backoff=on_backoff,
+            logger=None
+        )
+        def attempt():
+            nonlocal timed_out
+            try:
+                self.circuit_breaker.before_call()
+            except CircuitOpenError as e:
+                raise OllamaError(str(e)) from e
+            try:
+                result = call()
+            except OllamaError as e:
+                timed_out = timed_out or e.timed_out
+                if e.retryable:
+                    self.circuit_breaker.record_failure()
+                raise
+            self.circuit_breaker.record_success()
+            return result
+
+        try:
+            return attempt()
+        except OllamaError as e:
+            # El último intento puede fallar por otra causa (backend expulsado) tras agotar el timeout
+            e.timed_out = e.timed_out or timed_out
+            raise
+
+    def generate(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+        affinity: Optional[str] = None,
+        response_format: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera contenido y devuelve la respuesta completa de Ollama, más request_seconds (lanza OllamaError).
+        affinity enruta las solicitudes con la misma clave al mismo backend;
+        response_format ("json" o un esquema) activa la salida estructurada
+        """
+        return self._call_with_retries(
+            lambda: self._run(self.pool.call(
+                lambda client: _timed(client.generate(
+                    prompt, model=model, timeout=timeout, options=options, response_format=response_format
+                )),
+                affinity=affinity,
+                is_transient=_is_transient
+            ))
+        )
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = OLLAMA_MODEL,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+        affinity: Optional[str] = None,
+        response_format: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Versión /api/chat de generate: el texto generado está en message.content.
+        Mismos reintentos, interruptor de circuito y enrutamiento entre backends
+        """
+        return self._call_with_retries(
+            lambda: self._run(self.pool.call(
+                lambda client: _timed(client.chat(
+                    messages, model=model, timeout=timeout, options=options, response_format=response_format
+                )),
+                affinity=affinity,
+                is_transient=_is_transient
+            ))
+        )
+
+    def generate_content(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+        affinity: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Genera contenido usando Ollama; devuelve "" si falla tras los reintentos
+        """
+        try:
+            return self.generate(
+                prompt, model=model, timeout=timeout, options=options, affinity=affinity
+            ).get("response", "").strip()
+        except OllamaError as e:
+            logger.error(str(e))
+            return ""
+
+    def stream_content(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        max_output_chars: Optional[int] = None,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        metrics: Optional[GenerationMetrics] = None,
+        options: Optional[Dict[str, Any]] = None,
+        affinity: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Versión síncrona de stream_generate: itera los fragmentos a medida que llegan.
+        Si el consumidor deja de iterar, la solicitud se cancela
+        """
+        chunks: "queue.Queue" = queue.Queue()
+        finished = object()
+
+        async def pump():
+            backend = None
+            elapsed = None
+            failed = False
+            start = time.perf_counter()
+            try:
+                backend = await self.pool.acquire(affinity)
+                if metrics is not None:
+                    # TTFT y duración cuentan desde que hay backend, no desde que se encoló la solicitud
+                    metrics.started_at = time.perf_counter()
+                stream = backend.client.stream_generate(
+                    prompt, model=model, max_output_chars=max_output_chars,
+                    stop=stop, timeout=timeout, metrics=metrics, options=options
+                )
+                try:
+                    async for chunk in stream:
+                        chunks.put(chunk)
+                finally:
+                    # Cierra la respuesta HTTP también si se cancela (el consumidor dejó de iterar)
+                    await stream.aclose()
+                elapsed = time.perf_counter() - start
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failed = _is_transient(e)
+                chunks.put(e)
+            finally:
+                if backend is not None:
+                    await self.pool.release(backend, elapsed=elapsed, failed=failed)
+                chunks.put(finished)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item = chunks.get()
+                if item is finished:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def generate_streaming(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        max_output_chars: Optional[int] = None,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+        affinity: Optional[str] = None
+    ) -> Tuple[str, GenerationMetrics]:
+        """
+        Genera consumiendo el stream completo; devuelve el texto y sus métricas
+        (lanza OllamaError). Un stream fallido se reintenta desde el principio
+        """
+        def consume():
+            metrics = GenerationMetrics()
+            text = "".join(self.stream_content(
+                prompt, model=model, max_output_chars=max_output_chars,
+                stop=stop, timeout=timeout, metrics=metrics, options=options, affinity=affinity
+            ))
+            return text.strip(), metrics
+
+        return self._call_with_retries(consume)
+
+    def test_connection(self) -> bool:
+        """
+        Prueba la conexión con Ollama; con varios backends, expulsa o readmite
+        según respondan y devuelve True si alguno está disponible
+        """
+        try:
+            return self._run(self.pool.check_health())
+        except Exception:
+            return False
+
+    def model_digest(self, model: str = OLLAMA_MODEL) -> Optional[str]:
+        """
+        Digest del modelo instalado en Ollama
+        """
+        backends = self.pool.healthy_backends() or self.pool.backends
+        return self._run(backends[0].client.model_digest(model))
+
+    @property
+    def keep_alive(self) -> Optional[str]:
+        return self.pool.backends[0].client.keep_alive
+
+    @keep_alive.setter
+    def keep_alive(self, value: Optional[str]):
+        for backend in self.pool.backends:
+            backend.client.keep_alive = value
+
+    def is_ready(self, model: str = OLLAMA_MODEL) -> bool:
+        """
+        Comprobación de disponibilidad: a diferencia de test_connection, verifica
+        en /api/ps que el modelo esté cargado en memoria en todos los backends sanos
+        """
+        backends = self.pool.healthy_backends()
+        if not backends:
+            return False
+        return all(self._backend_has_model(backend, model) for backend in backends)
+
+    def _backend_has_model(self, backend, model: str) -> bool:
+        try:
+            running = self._run(backend.client.running_models())
+        except Exception:
+            return False
+
+        names = {model, f"{model}:latest"}
+        return any(entry.get("name") in names or entry.get("model") in names for entry in running)
+
+    def warm_up(
+        self,
+        model: str = OLLAMA_MODEL,
+        keep_alive: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Precarga el modelo y mide el arranque en frío por separado de la latencia de generación.
+        Si se indica keep_alive, se mantiene en las solicitudes siguientes
+        """
+        if keep_alive is not None:
+            self.keep_alive = keep_alive
+
+        backends = self.pool.healthy_backends()
+        if not backends:
+            raise OllamaError("Ningún backend de Ollama disponible", retryable=True)
+        already_loaded = {backend.url: self._backend_has_model(backend, model) for backend in backends}
+
+        async def preload(backend):
+            start = time.perf_counter()
+            result = await backend.client.preload(model, keep_alive=keep_alive, options=options)
+            return time.perf_counter() - start, result.get("load_duration")
+
+        async def preload_all():
+            # Los backends cargan el modelo en paralelo
+            return await asyncio.gather(*(preload(backend) for backend in backends))
+
+        timings = self._call_with_retries(lambda: self._run(preload_all()))
+
+        per_backend = [
+            {
+                "url": backend.url,
+                "already_loaded": already_loaded[backend.url],
+                "cold_start_seconds": round(cold_start, 2),
+                "load_seconds": round(load_duration / 1e9, 2) if load_duration else None
+            }
+            for backend, (cold_start, load_duration) in zip(backends, timings)
+        ]
+        load_times = [entry["load_seconds"] for entry in per_backend if entry["load_seconds"] is not None]
+        return {
+            "model": model,
+            "already_loaded": all(already_loaded.values()),
+            "cold_start_seconds": max(entry["cold_start_seconds"] for entry in per_backend),
+            "load_seconds": max(load_times) if load_times else None,
+            "keep_alive": self.keep_alive,
+            "ready": self.is_ready(model),
+            "backends": per_backend
+        }
+
+    def release_model(
+        self,
+        model: str = OLLAMA_MODEL,
+        keep_alive: str = "5m",
+        options: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Deja de enviar el keep_alive de la ejecución y lo sustituye en el servidor:
+        Ollama conserva el último keep_alive recibido, así que sin esta solicitud el
+        modelo seguiría residente todo el keep_alive largo. Devuelve los backends avisados
+        """
+        self.keep_alive = None
+
+        async def release(backend):
+            await backend.client.preload(model, keep_alive=keep_alive, options=options)
+
+        released = 0
+        for backend in self.pool.healthy_backends():
+            try:
+                self._run(release(backend))
+                released += 1
+            except OllamaError as e:
+                logger.warning(f"No se pudo liberar {model} en {backend.url}: {e}")
+        return released
+
+    def pool_summary(self) -> List[Dict[str, Any]]:
+        """Solicitudes, fallos, expulsiones y latencia por backend"""
+        return self.pool.summary()
+
+    def close(self):
+        """Cierra el pool de conexiones y detiene el loop"""
+        if self._loop.is_closed():
+            return
+        self._run(self.pool.aclose())
+        # Cerrar los generadores asíncronos pendientes (streams abandonados) antes de parar el loop
+        self._run(self._loop.shutdown_asyncgens())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,10 +1,10 @@
 # python-scripts/content_generator/segment_content_generator.py
 
 import chromadb
-import requests
 import logging
 from typing import Dict, Optional
-from config.settings import OLLAMA_HOST, OLLAMA_PORT, OLLAMA_MODEL
+from config.settings import OLLAMA_MODEL, CHROMA_COLLECTION
+from content_generator.ollama_client import OllamaClient
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +13,13 @@ class SegmentContentGenerator:
     Genera contenido personalizado para cada segmento usando Chroma DB y Ollama
     """
     
-    def __init__(self, chroma_host: str = "localhost", chroma_port: int = 8000):
+    def __init__(self, chroma_host: str = "localhost", chroma_port: int = 8000, ollama_client: Optional[OllamaClient] = None):
         self.chroma_client = chromadb.HttpClient(host=chroma_host, port=chroma_port)
-        self.ollama_url = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}"
+        self.ollama_client = ollama_client or OllamaClient()
         
         # Obtener colección de Chroma
         try:
-            self.collection = self.chroma_client.get_collection("salud_femenina_knowledge")
+            self.collection = self.chroma_client.get_collection(CHROMA_COLLECTION)
             logger.info("✓ Conectado a Chroma DB")
         except:
             logger.error("No se pudo conectar a Chroma DB")
@@ -124,24 +124,4 @@ class SegmentContentGenerator:
         """
         Genera contenido usando Ollama
         """
-        try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": OLLAMA_MODEL,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "").strip()
-            else:
-                logger.error(f"Error en Ollama: {response.status_code}")
-                return ""
-                
-        except Exception as e:
-            logger.error(f"Error comunicándose con Ollama: {e}")
-            return ""
\ No newline at end of file
+        return self.ollama_client.generate_content(prompt, model=OLLAMA_MODEL)
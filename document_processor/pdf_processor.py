@@ -20,6 +20,10 @@ import re
 # Cliente de Chroma
 import chromadb
 
+from config.settings import CHROMA_COLLECTION, BM25_INDEX_PATH
+from retrieval.bm25_index import SpanishBM25Index
+from retrieval.hnsw import hnsw_collection_metadata
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,9 +43,12 @@ class ContentChunk:
     embedding: Optional[List[float]] = None
 
 class MedicalDocumentProcessor:
-    def __init__(self, chroma_host: str = "localhost", chroma_port: int = 8000, mistral_api_key: str = None):
+    def __init__(self, chroma_host: str = "localhost", chroma_port: int = 8000, mistral_api_key: str = None,
+                 hnsw_params: Optional[Dict] = None):
         """
         Inicializa el procesador de documentos médicos
+        
+        hnsw_params acepta space, m, construction_ef y search_ef para crear la colección
         """
         logger.info("Inicializando MedicalDocumentProcessor...")
         
@@ -65,7 +72,11 @@ class MedicalDocumentProcessor:
             self.segment_patterns = self._initialize_segment_patterns()
             
             # Crear colección en Chroma si no existe
-            self._setup_chroma_collection()
+            self._setup_chroma_collection(hnsw_params)
+            
+            # Índice invertido BM25 local (complementa la búsqueda vectorial)
+            self.bm25_index = SpanishBM25Index.load_or_create(BM25_INDEX_PATH)
+            logger.info(f"✓ Índice BM25 cargado ({len(self.bm25_index)} chunks)")
             
             logger.info("✓ MedicalDocumentProcessor inicializado completamente")
             
@@ -120,21 +131,33 @@ class MedicalDocumentProcessor:
             }
         }
     
-    def _setup_chroma_collection(self):
+    def _setup_chroma_collection(self, hnsw_params: Optional[Dict] = None):
         """
         Configura la colección en Chroma para almacenar el conocimiento médico
         """
+        hnsw_metadata = hnsw_collection_metadata(**(hnsw_params or {}))
+        
         try:
             # Intentar obtener la colección existente
-            self.collection = self.chroma_client.get_collection("salud_femenina_knowledge")
+            self.collection = self.chroma_client.get_collection(CHROMA_COLLECTION)
             logger.info("✓ Colección existente recuperada")
         except:
             # Crear nueva colección si no existe
             self.collection = self.chroma_client.create_collection(
-                name="salud_femenina_knowledge",
-                metadata={"description": "Base de conocimientos sobre salud femenina y ciclo menstrual"}
+                name=CHROMA_COLLECTION,
+                metadata={
+                    "description": "Base de conocimientos sobre salud femenina y ciclo menstrual",
+                    **hnsw_metadata
+                }
             )
-            logger.info("✓ Nueva colección creada")
+            logger.info(f"✓ Nueva colección creada ({hnsw_metadata})")
+            return
+        
+        # Los parámetros HNSW son fijos tras la creación: avisar si no coinciden
+        current = self.collection.metadata or {}
+        mismatched = {key: value for key, value in hnsw_metadata.items() if key in current and current[key] != value}
+        if mismatched:
+            logger.warning(f"La colección existente usa otros parámetros HNSW: {current} (solicitados: {mismatched})")
     
     def process_document(self, pdf_path: str) -> List[ContentChunk]:
         """
@@ -510,6 +533,11 @@ class MedicalDocumentProcessor:
                 )
                 
                 logger.info(f"✓ {len(valid_chunks)} chunks guardados en Chroma")
+                
+                # Indexar los mismos chunks en BM25 y persistir el índice
+                added = self.bm25_index.add_documents(ids, docs)
+                if added:
+                    self.bm25_index.save(BM25_INDEX_PATH)
             else:
                 logger.warning("No hay chunks válidos para guardar")
                 
@@ -3,6 +3,8 @@
 import json
 from pathlib import Path
 
+from segment_processor.expanded_segments import CONTEXT_TOKEN_BUDGETS
+
 def generate_120_segments():
     """
     Genera 120 segmentos expandidos basados en la estructura existente
@@ -187,7 +189,8 @@ def generate_120_segments():
                                 "tone": presentation_style["tone"],
                                 "urgency": presentation_style["urgency"],
                                 "language": presentation_style["language"],
-                                "structure": presentation_style["structure"]
+                                "structure": presentation_style["structure"],
+                                "context_token_budget": dict(CONTEXT_TOKEN_BUDGETS)
                             }
                         }
                     }
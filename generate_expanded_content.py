@@ -4,16 +4,21 @@ import os
 import sys
 import json
 import time
+import socket
+import argparse
 from pathlib import Path
 import logging
+from datetime import datetime, timedelta
 from typing import Dict, List, Any
 
 # Agregar el directorio actual al path
 sys.path.append(str(Path(__file__).parent))
 
-from segment_processor.expanded_content_generator import ExpandedContentGenerator
+from segment_processor.expanded_content_generator import ExpandedContentGenerator, enqueue_queue_run
 from segment_processor.expanded_segments import ExpandedSegmentDatabase
-from config.settings import CHROMA_HOST, CHROMA_PORT
+from segment_processor.work_queue import GenerationWorkQueue
+from config.settings import CHROMA_HOST, CHROMA_PORT, GENERATION_MAX_IN_FLIGHT, GENERATION_TIME_BUDGET, GENERATION_BATCHED, GENERATION_DEDUP, GENERATION_DEADLINE, GENERATION_CHAT_API
+from config.settings import WORK_QUEUE_PATH, WORK_QUEUE_WAL, WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_POLL_SECONDS
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +31,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def generate_expanded_content():
+def seconds_until(clock: str) -> float:
+    """Segundos hasta la próxima vez que el reloj marque clock ("HH:MM")"""
+    now = datetime.now()
+    target = datetime.combine(now.date(), datetime.strptime(clock, "%H:%M").time())
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+def clock_time(value: str) -> str:
+    """Tipo de argparse para --deadline: "HH:MM" (o vacío, sin hora límite)"""
+    if value:
+        try:
+            datetime.strptime(value, "%H:%M")
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"hora no válida: {value!r} (formato HH:MM)")
+    return value
+
+def run_time_budget(time_budget: float, deadline: str = "") -> float:
+    """Presupuesto efectivo: el menor entre time_budget y el tiempo hasta la hora límite (0 = sin límite)"""
+    limits = [limit for limit in (time_budget, seconds_until(deadline) if deadline else 0) if limit]
+    return min(limits) if limits else 0
+
+def generate_expanded_content(
+    max_in_flight: int = GENERATION_MAX_IN_FLIGHT,
+    force_regenerate: bool = False,
+    resume_journal: str = None,
+    time_budget: float = GENERATION_TIME_BUDGET,
+    batched: bool = GENERATION_BATCHED,
+    dedup: bool = GENERATION_DEDUP,
+    chat_api: bool = GENERATION_CHAT_API
+):
     """
     Genera contenido para todos los segmentos expandidos
     """
@@ -36,7 +71,9 @@ def generate_expanded_content():
         # Inicializar generador
         generator = ExpandedContentGenerator(
             chroma_host=CHROMA_HOST,
-            chroma_port=CHROMA_PORT
+            chroma_port=CHROMA_PORT,
+            force_regenerate=force_regenerate,
+            chat_api=chat_api
         )
         
         # Mostrar información de segmentos disponibles
@@ -48,12 +85,30 @@ def generate_expanded_content():
             logger.info(f"  - {segment_id}: {segment.name} ({segment.category})")
         
         # Generar contenido para todos los segmentos
-        result = generator.generate_content_for_all_expanded_segments()
+        result = generator.generate_content_for_all_expanded_segments(
+            max_in_flight=max_in_flight,
+            resume_journal=resume_journal,
+            time_budget=time_budget,
+            batched=batched,
+            dedup=dedup
+        )
         
         if result["success"]:
             logger.info("=== GENERACIÓN COMPLETADA EXITOSAMENTE ===")
             logger.info(f"Total de contenido generado: {result['total_content']}")
             logger.info(f"Archivo exportado: {result['export_path']}")
+            logger.info(f"Diario de generación: {result['journal_path']}")
+            logger.info(
+                f"Planificación: {result['deferred']} piezas diferidas, "
+                f"{result['skipped_low_priority']} omitidas por prioridad baja"
+            )
+            if result["not_started"]:
+                logger.warning(
+                    f"Sin iniciar por el límite de tiempo: {result['not_started']} "
+                    f"(en la cola de reintentos {result['retry_queue_path']})"
+                )
+            if result["resumed"]:
+                logger.info(f"Piezas recuperadas del diario: {result['resumed']}")
             
             # Mostrar estadísticas
             stats = result["statistics"]
@@ -76,6 +131,81 @@ def generate_expanded_content():
             for content_type, count in stats['by_content_type'].items():
                 logger.info(f"  - {content_type}: {count}")
             
+            generation = stats["generation"]["run"]
+            logger.info("=== MÉTRICAS DE OLLAMA ===")
+            logger.info(f"Tokens de prompt: {generation['prompt_tokens']} ({generation['prompt_tokens_per_second']} tokens/s)")
+            logger.info(f"Tokens generados: {generation['output_tokens']} ({generation['tokens_per_second']} tokens/s)")
+            if generation["without_counters"]:
+                logger.info(f"Piezas sin contadores de Ollama (stream cortado): {generation['without_counters']}")
+            logger.info(f"Carga del modelo: {generation['load_seconds']}s")
+            logger.info(
+                f"Latencia p50/p95/p99: {generation['latency_p50_s']}s / "
+                f"{generation['latency_p95_s']}s / {generation['latency_p99_s']}s"
+            )
+            for content_type, metrics in stats["generation"]["by_content_type"].items():
+                logger.info(
+                    f"  - {content_type}: {metrics['tokens_per_second']} tokens/s, "
+                    f"{metrics['prompt_tokens']} tokens de prompt, p95 {metrics['latency_p95_s']}s"
+                )
+            
+            if result["timeouts"]:
+                logger.info("Timeouts adaptativos por llamada:")
+                for key, timeout in result["timeouts"].items():
+                    logger.info(f"  - {key}: {timeout['timeout_s']}s (p50 {timeout['p50_s']}s, {timeout['samples']} muestras)")
+            
+            throughput = result["throughput"]
+            logger.info("=== RENDIMIENTO ===")
+            logger.info(f"Solicitudes/min: {throughput['requests_per_minute']:.1f}")
+            logger.info(f"Tokens/s: {throughput['tokens_per_second']:.1f}")
+            
+            if result["concurrency"]:
+                concurrency = result["concurrency"]
+                logger.info("=== CONCURRENCIA ADAPTATIVA ===")
+                logger.info(
+                    f"En vuelo: {concurrency['initial']} → {concurrency['final']} "
+                    f"(media {concurrency['mean']}, techo {concurrency['maximum']})"
+                )
+                logger.info(f"Aumentos: {concurrency['increases']}, reducciones: {concurrency['decreases']}")
+                logger.info(f"Métricas de la ejecución: {result['metrics_path']}")
+            
+            if result["warmup"]:
+                warmup = result["warmup"]
+                logger.info("=== ARRANQUE DEL MODELO ===")
+                logger.info(f"Ya cargado: {'sí' if warmup['already_loaded'] else 'no'}")
+                logger.info(f"Arranque en frío: {warmup['cold_start_seconds']}s (carga del modelo: {warmup['load_seconds']}s)")
+                logger.info(f"keep_alive: {warmup['keep_alive']}")
+            
+            resilience = result["resilience"]
+            breaker = resilience["circuit_breaker"]
+            logger.info("=== RESILIENCIA ===")
+            logger.info(f"Reintentos: {resilience['retries']}")
+            logger.info(f"Aperturas del circuito: {breaker['opened_count']} ({breaker['paused_seconds']}s en pausa)")
+            for backend in result["backends"]:
+                logger.info(
+                    f"Backend {backend['url']}: {backend['requests']} solicitudes, {backend['failures']} fallos, "
+                    f"{backend['ejections']} expulsiones, latencia media {backend['latency_ewma_s']}s"
+                )
+            if result["failed"]:
+                logger.warning(f"Piezas pendientes: {result['failed']} (cola de reintentos: {result['retry_queue_path']})")
+            
+            if result["dedup"]:
+                dedup = result["dedup"]
+                logger.info("=== DEDUPLICACIÓN DE PROMPTS ===")
+                logger.info(f"Tareas: {dedup['tasks']} en {dedup['groups']} grupos")
+                logger.info(f"Llamadas al LLM ahorradas: {dedup['calls_saved']}")
+            
+            if result["batching"]:
+                batching = result["batching"]
+                logger.info("=== GENERACIÓN POR LOTES ===")
+                logger.info(f"Lotes: {batching['batches']}, piezas válidas: {batching['pieces']}")
+                logger.info(f"Respaldos individuales: {batching['fallbacks']}")
+            
+            if result["cache"]:
+                cache = result["cache"]
+                logger.info("=== CACHÉ DE GENERACIÓN ===")
+                logger.info(f"Aciertos: {cache['hits']} / {cache['hits'] + cache['misses']} ({cache['hit_rate']:.0%})")
+                logger.info(f"Tiempo de cómputo ahorrado (estimado): {cache['seconds_saved']}s")
+            
         else:
             logger.error("=== ERROR EN LA GENERACIÓN ===")
             logger.error(f"Error: {result['error']}")
@@ -87,7 +217,174 @@ def generate_expanded_content():
         logger.error(f"Error en generación de contenido expandido: {e}")
         return False
 
-def generate_content_for_specific_segment(segment_id: str, content_types: List[str] = None):
+def regenerate_changed_content(
+    export_path: str = None,
+    max_in_flight: int = GENERATION_MAX_IN_FLIGHT,
+    time_budget: float = GENERATION_TIME_BUDGET,
+    batched: bool = GENERATION_BATCHED,
+    dedup: bool = GENERATION_DEDUP,
+    chat_api: bool = GENERATION_CHAT_API,
+    dry_run: bool = False
+):
+    """
+    Regenera solo los pares cuya huella cambió y actualiza la última exportación
+    """
+    try:
+        logger.info("=== REGENERACIÓN POR CAMBIOS ===")
+        
+        generator = ExpandedContentGenerator(
+            chroma_host=CHROMA_HOST,
+            chroma_port=CHROMA_PORT,
+            chat_api=chat_api
+        )
+        result = generator.regenerate_changed(
+            previous_export=export_path,
+            max_in_flight=max_in_flight,
+            time_budget=time_budget,
+            batched=batched,
+            dedup=dedup,
+            dry_run=dry_run
+        )
+        
+        if not result["success"]:
+            logger.error(f"Error: {result['error']}")
+            return False
+        
+        logger.info(f"Exportación: {result['export_path']}")
+        logger.info(
+            f"Pares con cambios: {result['changed']}, sin cambios: {result['unchanged']}, "
+            f"eliminados: {result['removed']}"
+        )
+        for part, count in result["reasons"].items():
+            logger.info(f"  - {part}: {count}")
+        
+        if result["dry_run"]:
+            for segment_id, content_type in result["pairs"]:
+                logger.info(f"  • {segment_id} - {content_type}")
+            logger.info("Simulación: no se regeneró nada")
+        elif "regenerated" in result:
+            logger.info(f"Piezas regeneradas: {result['regenerated']}")
+            if result["not_regenerated"]:
+                logger.warning(
+                    f"Sin regenerar: {result['not_regenerated']} (conservan la pieza anterior "
+                    f"y se reintentan en la próxima regeneración)"
+                )
+            logger.info(f"Total en la exportación: {result['total_content']}")
+        else:
+            logger.info("Nada que regenerar: la exportación está al día")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error en regeneración por cambios: {e}")
+        return False
+
+def enqueue_generation_run(queue_path: str = None, run_id: str = None):
+    """
+    Encola una ejecución masiva en la cola de trabajo distribuida
+    """
+    try:
+        queue = GenerationWorkQueue(Path(queue_path) if queue_path else WORK_QUEUE_PATH, wal=WORK_QUEUE_WAL)
+        result = enqueue_queue_run(queue, ExpandedSegmentDatabase(), run_id=run_id)
+        
+        print(f"✅ Ejecución {result['run_id']} encolada: {result['total']} tareas")
+        print(f"   Cola: {queue.db_path}")
+        print(f"   Workers: python generate_expanded_content.py --action worker --run-id {result['run_id']}")
+        print(f"   Progreso: python generate_expanded_content.py --action watch --run-id {result['run_id']}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error encolando la ejecución: {e}")
+        return False
+
+def run_generation_worker(
+    queue_path: str = None,
+    run_id: str = None,
+    worker_id: str = None,
+    max_in_flight: int = GENERATION_MAX_IN_FLIGHT,
+    batched: bool = GENERATION_BATCHED,
+    chat_api: bool = GENERATION_CHAT_API,
+    lease_seconds: float = WORK_QUEUE_LEASE_SECONDS
+):
+    """
+    Atiende una ejecución de la cola con el Ollama local hasta que no queden tareas
+    """
+    try:
+        queue = GenerationWorkQueue(Path(queue_path) if queue_path else WORK_QUEUE_PATH, wal=WORK_QUEUE_WAL)
+        run_id = run_id or queue.latest_run()
+        if not run_id:
+            logger.error("La cola no tiene ejecuciones: encola una con --action enqueue")
+            return False
+        
+        generator = ExpandedContentGenerator(chroma_host=CHROMA_HOST, chroma_port=CHROMA_PORT, chat_api=chat_api)
+        result = generator.run_queue_worker(
+            queue,
+            run_id,
+            worker_id or f"{socket.gethostname()}-{os.getpid()}",
+            max_in_flight=max_in_flight,
+            batched=batched,
+            lease_seconds=lease_seconds
+        )
+        
+        logger.info("=== WORKER FINALIZADO ===")
+        logger.info(f"Piezas generadas por {result['worker']}: {result['generated']}")
+        if result["failed_attempts"]:
+            logger.warning(f"Intentos fallidos (devueltos a la cola): {result['failed_attempts']}")
+        progress = result["progress"]
+        logger.info(f"Ejecución {run_id}: {progress['done']}/{progress['total']} hechas, {progress['failed']} fallidas")
+        if result["export_path"]:
+            logger.info(f"Archivo exportado: {result['export_path']}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error en el worker de la cola: {e}")
+        return False
+
+def watch_generation_run(queue_path: str = None, run_id: str = None, interval: float = WORK_QUEUE_POLL_SECONDS, export: bool = False):
+    """
+    Muestra el progreso de una ejecución de la cola hasta que termina
+    """
+    try:
+        queue = GenerationWorkQueue(Path(queue_path) if queue_path else WORK_QUEUE_PATH, wal=WORK_QUEUE_WAL)
+        run_id = run_id or queue.latest_run()
+        if not run_id:
+            print("❌ La cola no tiene ejecuciones")
+            return False
+        
+        print(f"\n=== EJECUCIÓN {run_id} ({queue.db_path}) ===\n")
+        while True:
+            progress = queue.progress(run_id)
+            if not progress:
+                print(f"❌ La ejecución {run_id} no existe")
+                return False
+            print(
+                f"📊 {progress['done']}/{progress['total']} hechas, {progress['leased']} en curso, "
+                f"{progress['pending']} pendientes, {progress['failed']} fallidas "
+                f"- {progress['pieces_per_minute']} piezas/min"
+            )
+            for worker, counts in sorted(progress["workers"].items()):
+                print(f"  • {worker}: {counts.get('done', 0)} hechas, {counts.get('leased', 0)} en curso")
+            if progress["expired_leases"]:
+                print(f"  ⚠️  {progress['expired_leases']} leases vencidos (se reasignan en el próximo reclamo)")
+            if progress["finished"] or export:
+                break
+            time.sleep(interval)
+        
+        export_path = Path("data/exports") / f"expanded_content_{run_id}.json"
+        if export or not progress["exported"]:
+            # Con --export, lo generado hasta ahora aunque la ejecución siga en curso
+            if queue.compact(run_id, export_path, force=export) is None:
+                return False
+        print(f"✅ Exportación: {export_path}")
+        return True
+        
+    except KeyboardInterrupt:
+        return True
+    except Exception as e:
+        logger.error(f"Error mostrando el progreso de la cola: {e}")
+        return False
+
+def generate_content_for_specific_segment(segment_id: str, content_types: List[str] = None, force_regenerate: bool = False):
     """
     Genera contenido para un segmento específico
     """
@@ -97,7 +394,8 @@ def generate_content_for_specific_segment(segment_id: str, content_types: List[s
         # Inicializar generador
         generator = ExpandedContentGenerator(
             chroma_host=CHROMA_HOST,
-            chroma_port=CHROMA_PORT
+            chroma_port=CHROMA_PORT,
+            force_regenerate=force_regenerate
         )
         
         # Obtener segmento
@@ -217,24 +515,84 @@ def save_segments_database():
         logger.error(f"Error guardando base de datos: {e}")
 
 if __name__ == "__main__":
-    import argparse
-    
     parser = argparse.ArgumentParser(description="Generador de contenido expandido para segmentos")
-    parser.add_argument("--action", choices=["all", "segment", "list", "save"], default="all",
+    parser.add_argument("--action", choices=["all", "regenerate", "enqueue", "worker", "watch", "segment", "list", "save"], default="all",
                        help="Acción a realizar")
     parser.add_argument("--segment-id", help="ID del segmento para generar contenido específico")
     parser.add_argument("--content-types", nargs="+", 
                        help="Tipos de contenido a generar")
+    parser.add_argument("--max-in-flight", type=int, default=GENERATION_MAX_IN_FLIGHT,
+                       help="Máximo de solicitudes simultáneas a Ollama")
+    parser.add_argument("--force-regenerate", action="store_true",
+                       help="Ignora la caché de generación y vuelve a llamar a Ollama")
+    parser.add_argument("--resume", metavar="JOURNAL",
+                       help="Reanuda una ejecución interrumpida a partir de su diario JSONL")
+    parser.add_argument("--time-budget", type=float, default=GENERATION_TIME_BUDGET,
+                       help="Segundos disponibles; al agotarse no se inician más piezas (0 = sin límite)")
+    parser.add_argument("--deadline", metavar="HH:MM", type=clock_time, default=GENERATION_DEADLINE,
+                       help="Hora límite de la ejecución; lo que no terminaría antes queda en la cola de reintentos")
+    parser.add_argument("--batched", action="store_true", default=GENERATION_BATCHED,
+                       help="Pide varios tipos de contenido por llamada con salida JSON")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false", default=GENERATION_DEDUP,
+                       help="Genera cada segmento aunque su prompt sea equivalente al de otro")
+    parser.add_argument("--chat", dest="chat_api", action="store_true", default=GENERATION_CHAT_API,
+                       help="Usa /api/chat con las pautas generales en el mensaje de sistema")
+    parser.add_argument("--export", metavar="PATH",
+                       help="Exportación a actualizar con --action regenerate (por defecto, la más reciente)")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="Con --action regenerate, solo muestra los pares que cambiaron")
+    parser.add_argument("--queue", metavar="PATH",
+                       help="Base SQLite de la cola de trabajo (enqueue, worker, watch)")
+    parser.add_argument("--run-id", help="Ejecución de la cola (por defecto, la más reciente)")
+    parser.add_argument("--worker-id", help="Identificador del worker (por defecto, host-pid)")
+    parser.add_argument("--lease-seconds", type=float, default=WORK_QUEUE_LEASE_SECONDS,
+                       help="Duración del lease de las tareas reclamadas por el worker")
+    parser.add_argument("--interval", type=float, default=WORK_QUEUE_POLL_SECONDS,
+                       help="Segundos entre actualizaciones con --action watch")
+    parser.add_argument("--export-now", action="store_true",
+                       help="Con --action watch, exporta lo generado hasta ahora sin esperar al final")
     
     args = parser.parse_args()
     
     if args.action == "all":
-        generate_expanded_content()
+        generate_expanded_content(
+            max_in_flight=args.max_in_flight,
+            force_regenerate=args.force_regenerate,
+            resume_journal=args.resume,
+            time_budget=run_time_budget(args.time_budget, args.deadline),
+            batched=args.batched,
+            dedup=args.dedup,
+            chat_api=args.chat_api
+        )
+    elif args.action == "regenerate":
+        regenerate_changed_content(
+            export_path=args.export,
+            max_in_flight=args.max_in_flight,
+            time_budget=run_time_budget(args.time_budget, args.deadline),
+            batched=args.batched,
+            dedup=args.dedup,
+            chat_api=args.chat_api,
+            dry_run=args.dry_run
+        )
+    elif args.action == "enqueue":
+        enqueue_generation_run(queue_path=args.queue, run_id=args.run_id)
+    elif args.action == "worker":
+        run_generation_worker(
+            queue_path=args.queue,
+            run_id=args.run_id,
+            worker_id=args.worker_id,
+            max_in_flight=args.max_in_flight,
+            batched=args.batched,
+            chat_api=args.chat_api,
+            lease_seconds=args.lease_seconds
+        )
+    elif args.action == "watch":
+        watch_generation_run(queue_path=args.queue, run_id=args.run_id, interval=args.interval, export=args.export_now)
     elif args.action == "segment":
         if not args.segment_id:
             print("Error: --segment-id es requerido para la acción 'segment'")
             sys.exit(1)
-        generate_content_for_specific_segment(args.segment_id, args.content_types)
+        generate_content_for_specific_segment(args.segment_id, args.content_types, force_regenerate=args.force_regenerate)
     elif args.action == "list":
         list_available_segments()
     elif args.action == "save":
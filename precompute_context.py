@@ -0,0 +1,96 @@
+# precompute_context.py
+
+import sys
+from pathlib import Path
+import logging
+from typing import List, Optional, Set
+
+# Agregar el directorio actual al path
+sys.path.append(str(Path(__file__).parent))
+
+from segment_processor.expanded_content_generator import ExpandedContentGenerator
+from segment_processor.expanded_segments import CONTENT_TYPES
+from retrieval.bm25_index import normalize_spanish
+
+logger = logging.getLogger(__name__)
+
+
+def _terms_of_chunks(generator: ExpandedContentGenerator, chunk_ids: List[str]) -> Set[str]:
+    """Términos normalizados de los chunks nuevos"""
+    if not chunk_ids or not generator.collection:
+        return set()
+
+    fetched = generator.collection.get(ids=list(chunk_ids), include=["documents"])
+    terms = set()
+    for document in fetched["documents"]:
+        terms.update(normalize_spanish(document))
+    return terms
+
+
+def refresh_materialized_context(new_chunk_ids: Optional[List[str]] = None, full: bool = False) -> dict:
+    """
+    Resuelve la recuperación para cada par (segmento, tipo de contenido) y la guarda
+    en la tabla materializada.
+
+    Solo recalcula los pares sin materializar, con consulta modificada o cuya consulta
+    comparte términos con los chunks nuevos. Los chunks que solo coincidan por
+    similitud vectorial no se detectan así: usar full=True tras ingestas grandes.
+    """
+    generator = ExpandedContentGenerator()
+    try:
+        return _refresh(generator, new_chunk_ids, full)
+    finally:
+        generator.close()
+
+
+def _refresh(generator: ExpandedContentGenerator, new_chunk_ids: Optional[List[str]], full: bool) -> dict:
+    if not generator.collection:
+        logger.error("Chroma DB no disponible; no se puede materializar el contexto")
+        return {"success": False, "error": "Chroma DB no disponible"}
+
+    table = generator.context_table
+    existing = table.fingerprints()
+    new_terms = _terms_of_chunks(generator, new_chunk_ids or [])
+
+    recomputed = 0
+    skipped = 0
+
+    for segment_id, segment in generator.segment_db.get_all_segments().items():
+        for content_type in CONTENT_TYPES:
+            query_terms = generator._build_query_terms(segment, content_type)
+            fingerprint = generator._get_query_fingerprint(segment, content_type)
+
+            affected = (
+                full
+                or existing.get((segment_id, content_type)) != fingerprint
+                or bool(new_terms & set(normalize_spanish(" ".join(query_terms))))
+            )
+            if not affected:
+                skipped += 1
+                continue
+
+            packed = generator._retrieve_context(segment, content_type)
+            table.put(segment_id, content_type, fingerprint, query_terms, packed)
+            recomputed += 1
+            logger.info(f"✓ Contexto materializado: {segment_id} - {content_type} ({len(packed.chunk_ids)} chunks, {packed.tokens} tokens)")
+
+    logger.info(f"Contexto materializado: {recomputed} pares recalculados, {skipped} sin cambios")
+    return {"success": True, "recomputed": recomputed, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Precalcula el contexto RAG por (segmento, tipo de contenido)")
+    parser.add_argument("--full", action="store_true",
+                       help="Recalcula todos los pares aunque no estén afectados")
+    parser.add_argument("--chunk-ids", nargs="+",
+                       help="IDs de chunks nuevos para recalcular solo los pares afectados")
+
+    args = parser.parse_args()
+    refresh_materialized_context(new_chunk_ids=args.chunk_ids, full=args.full)
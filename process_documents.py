@@ -10,6 +10,7 @@ from typing import List
 sys.path.append(str(Path(__file__).parent))
 
 from document_processor.pdf_processor import MedicalDocumentProcessor
+from precompute_context import refresh_materialized_context
 from config.settings import CHROMA_HOST, CHROMA_PORT, MISTRAL_API_KEY
 
 # Configurar logging
@@ -45,12 +46,15 @@ def process_pdfs_in_folder(pdf_folder: str):
         
         logger.info(f"Procesando {len(pdf_files)} PDFs...")
         
+        new_chunk_ids = []
+        
         for pdf_file in pdf_files:
             try:
                 logger.info(f"Procesando: {pdf_file.name}")
                 
                 # Procesar documento
                 chunks = processor.process_document(str(pdf_file))
+                new_chunk_ids.extend(chunk.chunk_id for chunk in chunks)
                 
                 logger.info(f"✓ {pdf_file.name}: {len(chunks)} chunks procesados")
                 
@@ -64,6 +68,10 @@ def process_pdfs_in_folder(pdf_folder: str):
         
         logger.info("✓ Procesamiento completado")
         
+        # Actualizar el contexto materializado de los pares afectados
+        if new_chunk_ids:
+            refresh_materialized_context(new_chunk_ids=new_chunk_ids)
+        
     except Exception as e:
         logger.error(f"Error en procesamiento: {e}")
         raise
@@ -0,0 +1,184 @@
+# retrieval/bm25_index.py
+
+import gzip
+import json
+import math
+import re
+import unicodedata
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Palabras vacías frecuentes en español (se eliminan antes de indexar)
+SPANISH_STOPWORDS = {
+    "a", "al", "algo", "ante", "antes", "como", "con", "contra", "cual", "cuando",
+    "de", "del", "desde", "donde", "durante", "e", "el", "ella", "ellas", "ellos",
+    "en", "entre", "era", "es", "esa", "ese", "eso", "esta", "este", "esto", "fue",
+    "ha", "han", "hay", "la", "las", "le", "les", "lo", "los", "mas", "me", "mi",
+    "muy", "ni", "no", "o", "os", "para", "pero", "por", "porque", "que", "se",
+    "sea", "ser", "si", "sin", "sobre", "son", "su", "sus", "tambien", "te", "tiene",
+    "tu", "tus", "u", "un", "una", "uno", "unos", "unas", "y", "ya", "yo"
+}
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def strip_accents(text: str) -> str:
+    """Elimina acentos preservando la ñ"""
+    text = text.replace("ñ", "\0").replace("Ñ", "\1")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+    return stripped.replace("\0", "ñ").replace("\1", "Ñ")
+
+
+def light_stem(token: str) -> str:
+    """
+    Stemming ligero para español: unifica singular y plural
+    (hormonas -> hormona, niveles -> nivel) sin tocar siglas cortas como FSH o LH
+    """
+    if len(token) > 4 and token.endswith("es") and token[-3] not in "aeiou":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and token[-2] in "aeiou":
+        return token[:-1]
+    return token
+
+
+def normalize_spanish(text: str) -> List[str]:
+    """
+    Normaliza texto médico en español a términos indexables.
+
+    Incluye unigramas y bigramas de términos consecutivos para que expresiones
+    como "cuerpo lúteo" coincidan como frase y no solo por palabras sueltas.
+    """
+    text = strip_accents(text.lower())
+    words = [light_stem(w) for w in TOKEN_PATTERN.findall(text) if w not in SPANISH_STOPWORDS]
+    words = [w for w in words if not w.isdigit() or len(w) > 1]
+    bigrams = [f"{a}_{b}" for a, b in zip(words, words[1:])]
+    return words + bigrams
+
+
+class SpanishBM25Index:
+    """
+    Índice invertido BM25 local sobre el texto de los chunks
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_lengths: List[int] = []
+        # término -> lista de (índice de documento, frecuencia)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._id_to_index: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._id_to_index
+
+    def add_documents(self, doc_ids: Iterable[str], texts: Iterable[str]) -> int:
+        """Agrega documentos al índice; ignora IDs ya indexados. Retorna cuántos se agregaron"""
+        added = 0
+        for doc_id, text in zip(doc_ids, texts):
+            if doc_id in self._id_to_index:
+                continue
+
+            terms = normalize_spanish(text)
+            index = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_lengths.append(len(terms))
+            self._id_to_index[doc_id] = index
+            self._total_length += len(terms)
+
+            for term, freq in Counter(terms).items():
+                self.postings.setdefault(term, []).append((index, freq))
+            added += 1
+
+        return added
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Busca los documentos con mayor score BM25 para la consulta"""
+        if not self.doc_ids:
+            return []
+
+        total_docs = len(self.doc_ids)
+        avg_length = self._total_length / total_docs if total_docs else 0.0
+        scores: Dict[int, float] = {}
+
+        for term in set(normalize_spanish(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+
+            idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for index, freq in docs:
+                length_norm = 1 - self.b + self.b * (self.doc_lengths[index] / avg_length if avg_length else 0.0)
+                scores[index] = scores.get(index, 0.0) + idf * (freq * (self.k1 + 1)) / (freq + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.doc_ids[index], score) for index, score in ranked]
+
+    def save(self, path: Path):
+        """
+        Guarda el índice en formato compacto: JSON comprimido con gzip y
+        postings aplanados como [doc, tf, doc, tf, ...]
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {
+            "version": self.FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": {
+                term: [value for pair in docs for value in pair]
+                for term, docs in self.postings.items()
+            }
+        }
+
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        tmp_path.replace(path)
+
+        logger.info(f"✓ Índice BM25 guardado: {len(self.doc_ids)} documentos, {len(self.postings)} términos")
+
+    @classmethod
+    def load(cls, path: Path) -> "SpanishBM25Index":
+        """Carga un índice guardado con save()"""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != cls.FORMAT_VERSION:
+            raise ValueError(f"Versión de índice BM25 no soportada: {data.get('version')}")
+
+        index = cls(k1=data["k1"], b=data["b"])
+        index.doc_ids = data["doc_ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {
+            term: list(zip(flat[0::2], flat[1::2]))
+            for term, flat in data["postings"].items()
+        }
+        index._id_to_index = {doc_id: i for i, doc_id in enumerate(index.doc_ids)}
+        index._total_length = sum(index.doc_lengths)
+        return index
+
+    @classmethod
+    def load_or_create(cls, path: Path) -> "SpanishBM25Index":
+        """Carga el índice si existe; si no, crea uno vacío"""
+        path = Path(path)
+        if path.exists():
+            try:
+                return cls.load(path)
+            except Exception as e:
+                logger.error(f"Error cargando índice BM25 desde {path}: {e}")
+        return cls()
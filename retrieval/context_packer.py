@@ -0,0 +1,138 @@
+# retrieval/context_packer.py
+
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set
+
+from retrieval.bm25_index import normalize_spanish
+from retrieval.hybrid_retriever import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima tokens de un texto para modelos tipo Mistral: palabras largas en
+    español suelen dividirse en varios sub-tokens
+    """
+    return sum(1 + len(piece) // 6 for piece in WORD_PATTERN.findall(text))
+
+
+def _shingles(text: str, size: int = 5) -> Set[str]:
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class PackedContext:
+    """Contexto empaquetado listo para el prompt"""
+    text: str
+    chunk_ids: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+
+class ContextPacker:
+    """
+    Selecciona pasajes por relevancia marginal máxima (MMR) hasta llenar un
+    presupuesto de tokens, descartando pasajes que se solapan
+    """
+
+    def __init__(
+        self,
+        mmr_lambda: float = 0.7,
+        overlap_threshold: float = 0.6,
+        min_passage_tokens: int = 40,
+        token_counter: Optional[Callable[[str], int]] = None
+    ):
+        self.mmr_lambda = mmr_lambda
+        self.overlap_threshold = overlap_threshold
+        self.min_passage_tokens = min_passage_tokens
+        self.count_tokens = token_counter or estimate_tokens
+
+    def pack(self, chunks: List[RetrievedChunk], token_budget: int, max_passages: Optional[int] = None) -> PackedContext:
+        """Empaqueta los chunks (ya ordenados por relevancia) dentro del presupuesto"""
+        candidates = self._remove_overlaps(chunks)
+        if not candidates:
+            return PackedContext(text="")
+
+        relevance = self._relevance(candidates)
+        terms = [set(normalize_spanish(chunk.content)) for chunk in candidates]
+
+        selected: List[int] = []
+        parts: List[str] = []
+        used_tokens = 0
+        remaining = list(range(len(candidates)))
+
+        while remaining and (max_passages is None or len(selected) < max_passages):
+            best = max(remaining, key=lambda i: self._mmr_score(i, selected, relevance, terms))
+            remaining.remove(best)
+
+            passage = candidates[best].content
+            passage_tokens = self.count_tokens(passage)
+            available = token_budget - used_tokens
+
+            if passage_tokens > available:
+                if available < self.min_passage_tokens:
+                    break
+                passage = self._truncate(passage, available)
+                passage_tokens = self.count_tokens(passage)
+                if not passage:
+                    continue
+
+            selected.append(best)
+            parts.append(passage)
+            used_tokens += passage_tokens
+
+        return PackedContext(
+            text="\n\n".join(parts),
+            chunk_ids=[candidates[i].chunk_id for i in selected],
+            tokens=used_tokens
+        )
+
+    def _mmr_score(self, index: int, selected: List[int], relevance: List[float], terms: List[Set[str]]) -> float:
+        redundancy = max((_jaccard(terms[index], terms[j]) for j in selected), default=0.0)
+        return self.mmr_lambda * relevance[index] - (1 - self.mmr_lambda) * redundancy
+
+    def _relevance(self, chunks: List[RetrievedChunk]) -> List[float]:
+        """Relevancia normalizada a [0, 1]; usa el score del reranker si existe"""
+        raw = [chunk.rerank_score if chunk.rerank_score is not None else chunk.score for chunk in chunks]
+        low, high = min(raw), max(raw)
+        if high == low:
+            return [1.0] * len(raw)
+        return [(value - low) / (high - low) for value in raw]
+
+    def _remove_overlaps(self, chunks: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        """Descarta pasajes casi duplicados de otros con mayor ranking"""
+        kept: List[RetrievedChunk] = []
+        kept_shingles: List[Set[str]] = []
+        for chunk in chunks:
+            shingles = _shingles(chunk.content)
+            if any(_jaccard(shingles, other) >= self.overlap_threshold for other in kept_shingles):
+                continue
+            kept.append(chunk)
+            kept_shingles.append(shingles)
+        return kept
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Recorta un pasaje en límite de oración para que quepa en max_tokens"""
+        result = []
+        used = 0
+        for sentence in SENTENCE_END.split(text):
+            sentence_tokens = self.count_tokens(sentence)
+            if used + sentence_tokens > max_tokens:
+                break
+            result.append(sentence)
+            used += sentence_tokens
+        return " ".join(result)
@@ -0,0 +1,153 @@
+# retrieval/hnsw.py
+
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from config.settings import (
+    CHROMA_HNSW_SPACE, CHROMA_HNSW_M, CHROMA_HNSW_CONSTRUCTION_EF, CHROMA_HNSW_SEARCH_EF
+)
+
+logger = logging.getLogger(__name__)
+
+
+def hnsw_collection_metadata(
+    space: str = CHROMA_HNSW_SPACE,
+    m: int = CHROMA_HNSW_M,
+    construction_ef: int = CHROMA_HNSW_CONSTRUCTION_EF,
+    search_ef: int = CHROMA_HNSW_SEARCH_EF
+) -> Dict:
+    """Metadata de Chroma con los parámetros del índice HNSW"""
+    return {
+        "hnsw:space": space,
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef
+    }
+
+
+@dataclass
+class HNSWTrialResult:
+    """Resultado de evaluar una configuración HNSW"""
+    m: int
+    construction_ef: int
+    search_ef: int
+    recall: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    build_seconds: float
+
+
+def exact_neighbors(corpus, queries, k: int, space: str = "l2") -> List[List[int]]:
+    """Vecinos exactos por fuerza bruta (índices del corpus)"""
+    import numpy as np
+
+    if space == "cosine":
+        corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True).clip(min=1e-12)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+        distances = -queries @ corpus.T
+    elif space == "ip":
+        distances = -queries @ corpus.T
+    else:
+        distances = (
+            (queries ** 2).sum(axis=1, keepdims=True)
+            - 2 * queries @ corpus.T
+            + (corpus ** 2).sum(axis=1)
+        )
+
+    top = np.argsort(distances, axis=1)[:, :k]
+    return top.tolist()
+
+
+def evaluate_hnsw_config(
+    corpus,
+    queries,
+    ground_truth: List[List[int]],
+    k: int,
+    space: str,
+    m: int,
+    construction_ef: int,
+    search_ef: int
+) -> HNSWTrialResult:
+    """Construye una colección efímera con la configuración y mide recall@k y latencia"""
+    import chromadb
+    import numpy as np
+
+    client = chromadb.EphemeralClient()
+    name = f"hnsw_trial_{m}_{construction_ef}_{search_ef}"
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+
+    collection = client.create_collection(
+        name=name,
+        metadata=hnsw_collection_metadata(space, m, construction_ef, search_ef)
+    )
+
+    ids = [str(i) for i in range(len(corpus))]
+    build_start = time.perf_counter()
+    batch_size = 1000
+    for start in range(0, len(ids), batch_size):
+        collection.add(
+            ids=ids[start:start + batch_size],
+            embeddings=corpus[start:start + batch_size].tolist()
+        )
+    build_seconds = time.perf_counter() - build_start
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, ground_truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(int(i) for i in result["ids"][0]) & set(expected))
+
+    client.delete_collection(name)
+
+    return HNSWTrialResult(
+        m=m,
+        construction_ef=construction_ef,
+        search_ef=search_ef,
+        recall=hits / (len(queries) * k) if len(queries) else 0.0,
+        latency_p50_ms=float(np.percentile(latencies, 50)),
+        latency_p95_ms=float(np.percentile(latencies, 95)),
+        build_seconds=build_seconds
+    )
+
+
+def recommend_config(results: List[HNSWTrialResult], target_recall: float = 0.95) -> Optional[HNSWTrialResult]:
+    """
+    Configuración más rápida (p95) que alcanza el recall objetivo; si ninguna lo
+    alcanza, la de mayor recall
+    """
+    if not results:
+        return None
+    eligible = [r for r in results if r.recall >= target_recall]
+    if eligible:
+        return min(eligible, key=lambda r: (r.latency_p95_ms, r.build_seconds))
+    return max(results, key=lambda r: (r.recall, -r.latency_p95_ms))
+
+
+def latency_recall_chart(results: List[HNSWTrialResult], width: int = 60, height: int = 16) -> str:
+    """Gráfico de texto: latencia p50 (eje X) frente a recall (eje Y)"""
+    if not results:
+        return ""
+
+    max_latency = max(r.latency_p50_ms for r in results) or 1.0
+    min_recall = min(r.recall for r in results)
+    recall_span = (1.0 - min_recall) or 1.0
+
+    grid = [[" "] * width for _ in range(height)]
+    for index, r in enumerate(results):
+        x = min(width - 1, int(r.latency_p50_ms / max_latency * (width - 1)))
+        y = min(height - 1, int((1.0 - r.recall) / recall_span * (height - 1)))
+        grid[y][x] = str(index % 10)
+
+    lines = [f"recall 1.00 |{''.join(grid[0])}"]
+    lines += [f"            |{''.join(row)}" for row in grid[1:-1]]
+    lines.append(f"recall {min_recall:.2f} |{''.join(grid[-1])}")
+    lines.append(f"            +{'-' * width}")
+    lines.append(f"             0 ms{' ' * (width - 16)}{max_latency:.2f} ms")
+    return "\n".join(lines)
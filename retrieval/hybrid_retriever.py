@@ -0,0 +1,148 @@
+# retrieval/hybrid_retriever.py
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from retrieval.bm25_index import SpanishBM25Index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievedChunk:
+    """Chunk recuperado con sus scores denso, disperso y fusionado"""
+    chunk_id: str
+    content: str
+    score: float
+    dense_score: float = 0.0
+    sparse_score: float = 0.0
+    metadata: Dict = field(default_factory=dict)
+    rerank_score: Optional[float] = None
+
+
+def _max_normalize(scores: Dict[str, float]) -> Dict[str, float]:
+    """Normaliza scores no negativos al rango [0, 1] dividiendo por el máximo"""
+    if not scores:
+        return {}
+    high = max(scores.values())
+    if high <= 0:
+        return {key: 0.0 for key in scores}
+    return {key: value / high for key, value in scores.items()}
+
+
+class HybridRetriever:
+    """
+    Recuperación híbrida: fusiona la búsqueda vectorial de Chroma con BM25 local
+    """
+
+    def __init__(
+        self,
+        collection,
+        bm25_index: Optional[SpanishBM25Index] = None,
+        alpha: float = 0.5,
+        candidate_pool: int = 20
+    ):
+        self.collection = collection
+        self.bm25_index = bm25_index
+        # Peso de la parte densa; (1 - alpha) para BM25
+        self.alpha = alpha
+        self.candidate_pool = candidate_pool
+        self._check_sparse_coverage()
+
+    def _check_sparse_coverage(self):
+        """Avisa si el índice BM25 no cubre la colección (la búsqueda quedaría solo vectorial)"""
+        if self.collection is None:
+            return
+        try:
+            total = self.collection.count()
+        except Exception as e:
+            logger.debug(f"No se pudo contar la colección: {e}")
+            return
+        indexed = len(self.bm25_index) if self.bm25_index else 0
+        if total and indexed < total:
+            logger.warning(
+                f"⚠️  El índice BM25 cubre {indexed} de {total} chunks de la colección: "
+                f"la recuperación híbrida es {'solo vectorial' if not indexed else 'parcial'}. "
+                f"Ejecuta python scripts/build_bm25_index.py"
+            )
+
+    def retrieve(self, queries: List[str], n_results: int = 5) -> List[RetrievedChunk]:
+        """Recupera los n_results chunks con mayor score fusionado"""
+        if not queries:
+            return []
+
+        documents: Dict[str, str] = {}
+        metadatas: Dict[str, Dict] = {}
+
+        dense_scores = self._dense_search(queries, documents, metadatas)
+        sparse_scores = self._sparse_search(queries)
+
+        # Recuperar el texto de los chunks que solo encontró BM25
+        missing_ids = [chunk_id for chunk_id in sparse_scores if chunk_id not in documents]
+        if missing_ids and self.collection is not None:
+            try:
+                fetched = self.collection.get(ids=missing_ids, include=["documents", "metadatas"])
+                fetched_metas = fetched.get("metadatas") or [{}] * len(fetched["ids"])
+                for chunk_id, doc, meta in zip(fetched["ids"], fetched["documents"], fetched_metas):
+                    documents[chunk_id] = doc
+                    metadatas[chunk_id] = meta or {}
+            except Exception as e:
+                logger.error(f"Error recuperando chunks de BM25 desde Chroma: {e}")
+
+        dense_norm = _max_normalize(dense_scores)
+        sparse_norm = _max_normalize(sparse_scores)
+
+        results = []
+        for chunk_id in set(dense_norm) | set(sparse_norm):
+            if chunk_id not in documents:
+                continue
+            dense = dense_norm.get(chunk_id, 0.0)
+            sparse = sparse_norm.get(chunk_id, 0.0)
+            results.append(RetrievedChunk(
+                chunk_id=chunk_id,
+                content=documents[chunk_id],
+                score=self.alpha * dense + (1 - self.alpha) * sparse,
+                dense_score=dense,
+                sparse_score=sparse,
+                metadata=metadatas.get(chunk_id, {})
+            ))
+
+        results.sort(key=lambda chunk: (-chunk.score, chunk.chunk_id))
+        return results[:n_results]
+
+    def _dense_search(self, queries: List[str], documents: Dict[str, str], metadatas: Dict[str, Dict]) -> Dict[str, float]:
+        """Búsqueda vectorial; conserva la mejor similitud de cada chunk entre todas las consultas"""
+        if self.collection is None:
+            return {}
+
+        try:
+            results = self.collection.query(
+                query_texts=queries,
+                n_results=self.candidate_pool,
+                include=["documents", "metadatas", "distances"]
+            )
+        except Exception as e:
+            logger.error(f"Error en búsqueda vectorial: {e}")
+            return {}
+
+        scores: Dict[str, float] = {}
+        for q_index, ids in enumerate(results.get("ids") or []):
+            docs = results["documents"][q_index]
+            metas = (results.get("metadatas") or [[{}] * len(ids)])[q_index]
+            distances = results["distances"][q_index]
+            for chunk_id, doc, meta, distance in zip(ids, docs, metas, distances):
+                documents[chunk_id] = doc
+                metadatas[chunk_id] = meta or {}
+                # Menor distancia = mayor similitud
+                similarity = 1.0 / (1.0 + max(distance, 0.0))
+                if chunk_id not in scores or similarity > scores[chunk_id]:
+                    scores[chunk_id] = similarity
+
+        return scores
+
+    def _sparse_search(self, queries: List[str]) -> Dict[str, float]:
+        """Búsqueda BM25 con todas las consultas unidas"""
+        if not self.bm25_index or not len(self.bm25_index):
+            return {}
+        return dict(self.bm25_index.search(" ".join(queries), top_k=self.candidate_pool))
@@ -0,0 +1,100 @@
+# retrieval/materialized_context.py
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from retrieval.context_packer import PackedContext
+
+logger = logging.getLogger(__name__)
+
+
+def query_fingerprint(query_terms: List[str], token_budget: int, retrieval_settings: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Huella de la consulta y de los parámetros de recuperación (alpha híbrido, reranker,
+    MMR...); si cambia, el contexto materializado ya no es válido
+    """
+    payload = json.dumps(
+        {"query_terms": query_terms, "token_budget": token_budget, "retrieval": retrieval_settings or {}},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MaterializedContextTable:
+    """
+    Tabla local (SQLite) con el contexto ya recuperado y empaquetado para cada
+    par (segment_id, content_type)
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS materialized_context (
+                segment_id TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                query_fingerprint TEXT NOT NULL,
+                query_terms TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                context TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (segment_id, content_type)
+            )
+        """)
+        return conn
+
+    def exists(self) -> bool:
+        return self.db_path.exists()
+
+    def get(self, segment_id: str, content_type: str, fingerprint: Optional[str] = None) -> Optional[PackedContext]:
+        """Busca el contexto por clave; None si no existe o la huella no coincide"""
+        if not self.exists():
+            return None
+
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT query_fingerprint, chunk_ids, context, tokens FROM materialized_context "
+                "WHERE segment_id = ? AND content_type = ?",
+                (segment_id, content_type)
+            ).fetchone()
+
+        if not row or (fingerprint and row[0] != fingerprint):
+            return None
+
+        return PackedContext(text=row[2], chunk_ids=json.loads(row[1]), tokens=row[3])
+
+    def put(self, segment_id: str, content_type: str, fingerprint: str, query_terms: List[str], packed: PackedContext):
+        """Inserta o reemplaza el contexto de un par"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO materialized_context "
+                "(segment_id, content_type, query_fingerprint, query_terms, chunk_ids, context, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    segment_id, content_type, fingerprint,
+                    json.dumps(query_terms, ensure_ascii=False),
+                    json.dumps(packed.chunk_ids),
+                    packed.text, packed.tokens,
+                    time.strftime("%Y-%m-%d %H:%M:%S")
+                )
+            )
+
+    def fingerprints(self) -> Dict[Tuple[str, str], str]:
+        """Huellas de todos los pares materializados"""
+        if not self.exists():
+            return {}
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT segment_id, content_type, query_fingerprint FROM materialized_context").fetchall()
+
+        return {(segment_id, content_type): fingerprint for segment_id, content_type, fingerprint in rows}
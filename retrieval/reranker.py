@@ -0,0 +1,100 @@
+# retrieval/reranker.py
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from retrieval.hybrid_retriever import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Reordena candidatos con un cross-encoder multilingüe en CPU,
+    respetando un presupuesto de latencia por consulta
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 8,
+        budget_ms: float = 250,
+        cache_size: int = 4096
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self._model = None
+        # (hash de consulta, chunk_id) -> score
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        # La caché y la carga del modelo se comparten entre hilos de generación
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        """Carga el modelo la primera vez que se usa"""
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                logger.info(f"Cargando cross-encoder {self.model_name}...")
+                self._model = CrossEncoder(self.model_name, device="cpu")
+                logger.info("✓ Cross-encoder cargado (usando CPU)")
+            return self._model
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put(self, key: Tuple[str, str], score: float):
+        with self._lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query: str, candidates: List[RetrievedChunk], top_n: int = 5) -> List[RetrievedChunk]:
+        """
+        Puntúa los candidatos por lotes en el orden de la primera etapa hasta agotar
+        el presupuesto. Los candidatos sin puntuar conservan su orden original
+        detrás de los puntuados.
+        """
+        if not candidates:
+            return []
+
+        model = self._load_model()
+        query_key = hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+        pending = []
+        for chunk in candidates:
+            cached = self._cache_get((query_key, chunk.chunk_id))
+            if cached is not None:
+                chunk.rerank_score = cached
+            else:
+                pending.append(chunk)
+
+        # El presupuesto cuenta solo la inferencia, no la carga del modelo
+        start = time.perf_counter()
+        for i in range(0, len(pending), self.batch_size):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.budget_ms:
+                logger.debug(f"Presupuesto de rerank agotado: {len(pending) - i} candidatos sin puntuar")
+                break
+
+            batch = pending[i:i + self.batch_size]
+            scores = model.predict([(query, chunk.content) for chunk in batch], batch_size=self.batch_size)
+            for chunk, score in zip(batch, scores):
+                chunk.rerank_score = float(score)
+                self._cache_put((query_key, chunk.chunk_id), chunk.rerank_score)
+
+        scored = [chunk for chunk in candidates if chunk.rerank_score is not None]
+        unscored = [chunk for chunk in candidates if chunk.rerank_score is None]
+        scored.sort(key=lambda chunk: chunk.rerank_score, reverse=True)
+
+        return (scored + unscored)[:top_n]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Script para medir el rendimiento del pipeline de generación contra un Ollama
+simulado: el tiempo del servidor es conocido, así que lo que sobra es overhead
+del cliente, del pool de backends y del motor concurrente
+"""
+
+import sys
+import csv
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from content_generator.ollama_client import OllamaClient, OllamaError
+from content_generator.mock_ollama import MockOllamaServer, add_mock_arguments, config_from_args
+from retrieval.context_packer import estimate_tokens
+
+BENCHMARK_PROMPT = "SEGMENTO: benchmark {index}\nGenera una lección breve sobre la fase folicular.\nGenera el contenido ahora:"
+
+
+def ideal_seconds(config, requests: int, in_flight: int, num_predict: int, prompt_tokens: int) -> float:
+    """Tiempo mínimo con latencia media: las solicitudes se atienden de num_parallel en num_parallel"""
+    per_request = (
+        config.latency_mean
+        + (prompt_tokens / config.prompt_tokens_per_second if config.prompt_tokens_per_second else 0.0)
+        + (num_predict / config.tokens_per_second if config.tokens_per_second else 0.0)
+    )
+    waves = -(-requests // max(1, min(in_flight, config.num_parallel)))
+    return config.load_seconds + waves * per_request
+
+
+def run_client_benchmark(url: str, requests: int, in_flight: int, num_predict: int, stream: bool) -> float:
+    """Solicitudes sintéticas directas a OllamaClient desde in_flight hilos"""
+    client = OllamaClient(url, backend_max_in_flight=in_flight)
+    options = {"num_predict": num_predict}
+
+    def call(index: int):
+        prompt = BENCHMARK_PROMPT.format(index=index)
+        if stream:
+            try:
+                return client.generate_streaming(prompt, options=options)[0]
+            except OllamaError:
+                return ""
+        return client.generate_content(prompt, options=options)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=in_flight) as executor:
+            results = list(executor.map(call, range(requests)))
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if not result)
+    if failed:
+        print(f"⚠️  {failed} solicitudes sin contenido")
+    return elapsed
+
+
+def run_pipeline_benchmark(url: str, in_flight: int, batched: bool) -> float:
+    """Ejecución masiva completa de ExpandedContentGenerator (sin caché de generaciones)"""
+    from segment_processor.expanded_content_generator import ExpandedContentGenerator
+
+    client = OllamaClient(url, backend_max_in_flight=in_flight)
+    generator = ExpandedContentGenerator(ollama_client=client, force_regenerate=True)
+    start = time.perf_counter()
+    try:
+        result = generator.generate_content_for_all_expanded_segments(max_in_flight=in_flight, batched=batched)
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - start
+
+    if not result.get("success"):
+        print(f"❌ Ejecución fallida: {result.get('error')}")
+    else:
+        print(f"   {result['total_content']} piezas, export: {result['export_path']}")
+    return elapsed
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de generación contra un Ollama simulado")
+    parser.add_argument("--mode", choices=["client", "pipeline"], default="client",
+                        help="client: solicitudes sintéticas; pipeline: generación masiva completa")
+    parser.add_argument("--url", help="Usar un servidor ya iniciado en lugar de levantar uno simulado")
+    parser.add_argument("--requests", type=int, default=64, help="Solicitudes en modo client")
+    parser.add_argument("--num-predict", type=int, default=100, help="Tokens por respuesta en modo client")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--stream", action="store_true", help="Usar streaming en modo client")
+    parser.add_argument("--batched", action="store_true", help="Generación por lotes en modo pipeline")
+    parser.add_argument("--csv", help="Ruta del CSV de resultados")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server = None if args.url else MockOllamaServer(config).start()
+    url = args.url or server.url
+    prompt_tokens = estimate_tokens(BENCHMARK_PROMPT.format(index=0))
+    print(f"🔍 Benchmark ({args.mode}) contra {url}")
+
+    results = []
+    try:
+        for in_flight in args.in_flight:
+            if args.mode == "client":
+                elapsed = run_client_benchmark(url, args.requests, in_flight, args.num_predict, args.stream)
+                requests = args.requests
+                ideal = ideal_seconds(config, requests, in_flight, args.num_predict, prompt_tokens) if server else None
+            else:
+                before = server.state.requests if server else 0
+                elapsed = run_pipeline_benchmark(url, in_flight, args.batched)
+                requests = server.state.requests - before if server else None
+                ideal = None
+
+            overhead = f"{(elapsed / ideal - 1) * 100:+.1f}%" if ideal else "-"
+            rate = f"{requests / elapsed * 60:.1f} solicitudes/min" if requests else "-"
+            print(f"[in_flight={in_flight}] {elapsed:.2f}s, {rate}, overhead vs ideal: {overhead}")
+            results.append((in_flight, requests, elapsed, ideal))
+    finally:
+        if server:
+            server.stop()
+            print(f"\n📈 Servidor simulado: {server.state.summary()}")
+
+    csv_path = Path(args.csv) if args.csv else Path("data/exports") / f"generation_benchmark_{int(time.time())}.csv"
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mode", "in_flight", "requests", "seconds", "ideal_seconds"])
+        for in_flight, requests, elapsed, ideal in results:
+            writer.writerow([args.mode, in_flight, requests, f"{elapsed:.3f}", f"{ideal:.3f}" if ideal else ""])
+    print(f"✅ Resultados guardados en: {csv_path}")
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script para construir (o completar) el índice BM25 local a partir de la colección
+de Chroma existente. Las colecciones creadas antes de la recuperación híbrida no
+tienen índice BM25 y la búsqueda queda solo vectorial hasta ejecutarlo
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import CHROMA_HOST, CHROMA_PORT, CHROMA_COLLECTION, BM25_INDEX_PATH
+from retrieval.bm25_index import SpanishBM25Index
+
+
+def main():
+    """Función principal del backfill"""
+    parser = argparse.ArgumentParser(description="Construye el índice BM25 desde la colección de Chroma")
+    parser.add_argument("--output", default=str(BM25_INDEX_PATH), help="Ruta del índice BM25")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Empieza de cero en lugar de completar el índice existente")
+    parser.add_argument("--page-size", type=int, default=1000, help="Chunks por página al leer Chroma")
+    args = parser.parse_args()
+
+    import chromadb
+
+    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    collection = client.get_collection(CHROMA_COLLECTION)
+    total = collection.count()
+    print(f"🔍 Colección {CHROMA_COLLECTION}: {total} chunks")
+
+    output = Path(args.output)
+    index = SpanishBM25Index() if args.rebuild else SpanishBM25Index.load_or_create(output)
+    print(f"   Índice BM25 actual: {len(index)} chunks")
+
+    # Los IDs ya indexados se ignoran, así que el backfill se puede repetir sin duplicar
+    added = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=args.page_size, offset=offset)
+        if not len(page["ids"]):
+            break
+        added += index.add_documents(page["ids"], (text or "" for text in page["documents"]))
+        offset += len(page["ids"])
+        print(f"   {offset}/{total} chunks leídos")
+
+    index.save(output)
+    print(f"✅ {added} chunks agregados; índice BM25 con {len(index)} chunks en: {output}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
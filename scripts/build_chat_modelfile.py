@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script para generar la variante del Modelfile con las pautas generales como
+SYSTEM, de modo que las solicitudes /api/chat no tengan que enviarlas (el
+modelo las sigue evaluando en cada solicitud: la plantilla inserta el SYSTEM)
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import BASE_DIR, OLLAMA_MODEL
+from content_generator.chat_prompts import CHAT_SYSTEM_PROMPT, build_system_modelfile
+from retrieval.context_packer import estimate_tokens
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Genera el Modelfile del modelo de chat con SYSTEM")
+    parser.add_argument("--base-model", default=OLLAMA_MODEL, help="Modelo de Ollama del que se deriva")
+    parser.add_argument("--name", default=f"{OLLAMA_MODEL}-chat", help="Nombre del modelo derivado")
+    parser.add_argument("--output", default=str(BASE_DIR / "maurallm-chat.modelfile"))
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output.write_text(build_system_modelfile(args.base_model), encoding="utf-8")
+    print(f"✅ Modelfile guardado en: {output} (~{estimate_tokens(CHAT_SYSTEM_PROMPT)} tokens de SYSTEM)")
+    print("\n🎯 Para usarlo:")
+    print(f"   ollama create {args.name} -f {output}")
+    print("   GENERATION_CHAT_API=true")
+    print(f"   OLLAMA_CHAT_MODEL={args.name}")
+    print("   OLLAMA_CHAT_SYSTEM_IN_MODELFILE=true")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
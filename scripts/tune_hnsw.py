@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Script para ajustar los parámetros HNSW de la colección de Chroma: mide recall@k
+contra búsqueda exacta y latencia para cada configuración, y recomienda una
+"""
+
+import sys
+import csv
+import time
+import argparse
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import CHROMA_HOST, CHROMA_PORT, CHROMA_COLLECTION, CHROMA_HNSW_SPACE
+from retrieval.hnsw import exact_neighbors, evaluate_hnsw_config, recommend_config, latency_recall_chart
+
+
+def load_embeddings(page_size: int = 1000):
+    """Descarga todos los embeddings de la colección de producción"""
+    import chromadb
+    import numpy as np
+
+    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    collection = client.get_collection(CHROMA_COLLECTION)
+
+    embeddings = []
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+        if not len(page["ids"]):
+            break
+        embeddings.extend(page["embeddings"])
+        offset += len(page["ids"])
+
+    return np.array(embeddings, dtype="float32")
+
+
+def main():
+    """Función principal de ajuste"""
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Ajuste de parámetros HNSW (recall vs latencia)")
+    parser.add_argument("--k", type=int, default=5, help="k para recall@k")
+    parser.add_argument("--queries", type=int, default=200, help="Tamaño del conjunto de consultas reservado")
+    parser.add_argument("--space", default=CHROMA_HNSW_SPACE, choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[64, 100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 32, 64, 128])
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", help="Ruta del CSV de resultados")
+    args = parser.parse_args()
+
+    print("🔍 Cargando embeddings de Chroma...")
+    embeddings = load_embeddings()
+    if len(embeddings) <= args.queries:
+        print(f"❌ Corpus insuficiente: {len(embeddings)} embeddings para {args.queries} consultas")
+        return False
+
+    # Las consultas se reservan fuera del índice
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(embeddings))
+    queries = embeddings[order[:args.queries]]
+    corpus = embeddings[order[args.queries:]]
+    print(f"✅ Corpus: {len(corpus)} vectores, consultas reservadas: {len(queries)}")
+
+    ground_truth = exact_neighbors(corpus, queries, args.k, args.space)
+
+    results = []
+    for m in args.m:
+        for construction_ef in args.construction_ef:
+            for search_ef in args.search_ef:
+                result = evaluate_hnsw_config(
+                    corpus, queries, ground_truth, args.k, args.space, m, construction_ef, search_ef
+                )
+                results.append(result)
+                print(
+                    f"[{len(results) - 1}] M={m} construction_ef={construction_ef} search_ef={search_ef}: "
+                    f"recall@{args.k}={result.recall:.3f} p50={result.latency_p50_ms:.2f}ms "
+                    f"p95={result.latency_p95_ms:.2f}ms build={result.build_seconds:.1f}s"
+                )
+
+    print(f"\n📈 LATENCIA vs RECALL@{args.k}:")
+    print(latency_recall_chart(results))
+
+    csv_path = Path(args.csv) if args.csv else Path("data/exports") / f"hnsw_tuning_{int(time.time())}.csv"
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["m", "construction_ef", "search_ef", "recall", "latency_p50_ms", "latency_p95_ms", "build_seconds"])
+        for r in results:
+            writer.writerow([r.m, r.construction_ef, r.search_ef, f"{r.recall:.4f}",
+                             f"{r.latency_p50_ms:.3f}", f"{r.latency_p95_ms:.3f}", f"{r.build_seconds:.2f}"])
+    print(f"\n✅ Resultados guardados en: {csv_path}")
+
+    best = recommend_config(results, args.target_recall)
+    print(f"\n🎯 RECOMENDACIÓN para {len(corpus)} vectores (recall objetivo {args.target_recall}):")
+    print(f"   CHROMA_HNSW_SPACE={args.space}")
+    print(f"   CHROMA_HNSW_M={best.m}")
+    print(f"   CHROMA_HNSW_CONSTRUCTION_EF={best.construction_ef}")
+    print(f"   CHROMA_HNSW_SEARCH_EF={best.search_ef}")
+    print(f"   recall@{args.k}={best.recall:.3f}, p95={best.latency_p95_ms:.2f}ms")
+    if best.recall < args.target_recall:
+        print("⚠️  Ninguna configuración alcanzó el recall objetivo; amplía --search-ef o --m")
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -4,16 +4,58 @@ import os
 import sys
 import json
 import time
+import shutil
+import sqlite3
+import threading
+from dataclasses import replace
 from pathlib import Path
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 
 # Agregar el directorio actual al path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from segment_processor.expanded_segments import ExpandedSegmentDatabase, ExpandedSegment
-from content_generator.ollama_client import OllamaClient
-from config.settings import CHROMA_HOST, CHROMA_PORT
+from segment_processor.expanded_segments import ExpandedSegmentDatabase, ExpandedSegment, CONTENT_TYPES
+from segment_processor.generation_engine import ConcurrentGenerationEngine, GenerationTask
+from segment_processor.generation_journal import GenerationJournal, write_export
+from segment_processor.generation_scheduler import PriorityScheduler
+from segment_processor.prompt_dedup import PromptDedupPlan, plan_prompt_dedup
+from segment_processor.work_queue import GenerationWorkQueue
+from segment_processor.fingerprints import (
+    PROMPT_TEMPLATE_VERSION, PairFingerprint, segment_digest, text_digest,
+    fingerprint_diff, latest_export, load_export
+)
+from content_generator.ollama_client import OllamaClient, OllamaError
+from content_generator.generation_cache import GenerationCache, generation_cache_key, file_digest
+from content_generator.generation_options import build_generation_options
+from content_generator.batched_generation import plan_batches, batch_schema, parse_batch_response
+from content_generator.generation_metrics import eval_stats, summarize_generation_metrics
+from content_generator.adaptive_timeout import AdaptiveTimeout
+from content_generator.adaptive_concurrency import AIMDConcurrencyLimit
+from content_generator.chat_prompts import CHAT_SYSTEM_PROMPT, build_chat_messages
+from retrieval.bm25_index import SpanishBM25Index
+from retrieval.hybrid_retriever import HybridRetriever
+from retrieval.reranker import CrossEncoderReranker
+from retrieval.context_packer import ContextPacker, PackedContext, estimate_tokens
+from retrieval.materialized_context import MaterializedContextTable, query_fingerprint
+from config.settings import (
+    CHROMA_HOST, CHROMA_PORT, CHROMA_COLLECTION,
+    BM25_INDEX_PATH, MATERIALIZED_CONTEXT_PATH, HYBRID_ALPHA, RETRIEVAL_CANDIDATES, RETRIEVAL_TOP_K,
+    RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_N,
+    RERANK_BUDGET_MS, RERANK_BATCH_SIZE,
+    MMR_LAMBDA, CONTEXT_OVERLAP_THRESHOLD, DEFAULT_CONTEXT_TOKEN_BUDGET,
+    GENERATION_MAX_IN_FLIGHT, GENERATION_SEGMENT_AFFINITY, GENERATION_RETRY_PASSES,
+    GENERATION_ADAPTIVE_CONCURRENCY, GENERATION_AIMD_MIN, GENERATION_AIMD_INITIAL,
+    GENERATION_AIMD_TOLERANCE, GENERATION_AIMD_SUSTAINED, GENERATION_AIMD_BACKOFF,
+    GENERATION_SKIP_PRIORITY, GENERATION_DEFER_PRIORITY, GENERATION_TIME_BUDGET,
+    GENERATION_BATCHED, GENERATION_BATCH_MAX_PREDICT, GENERATION_DEDUP, GENERATION_STREAMING, OLLAMA_STREAM_MAX_CHARS,
+    OLLAMA_MODEL, OLLAMA_NUM_CTX, OLLAMA_PRELOAD, OLLAMA_KEEP_ALIVE, OLLAMA_IDLE_KEEP_ALIVE,
+    GENERATION_CHAT_API, OLLAMA_CHAT_MODEL, OLLAMA_CHAT_SYSTEM_IN_MODELFILE,
+    OLLAMA_TIMEOUT, OLLAMA_TIMEOUT_ADAPTIVE, OLLAMA_TIMEOUT_MIN, OLLAMA_TIMEOUT_PERCENTILE,
+    OLLAMA_TIMEOUT_MULTIPLIER, OLLAMA_TIMEOUT_MIN_SAMPLES,
+    GENERATION_CACHE_ENABLED, GENERATION_CACHE_PATH, MODELFILE_PATH, JOURNAL_FSYNC_EVERY,
+    WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_MAX_ATTEMPTS, WORK_QUEUE_POLL_SECONDS
+)
 
 # Configurar logging
 logging.basicConfig(
@@ -26,27 +68,155 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def enqueue_queue_run(
+    queue: GenerationWorkQueue,
+    segment_db: ExpandedSegmentDatabase,
+    run_id: Optional[str] = None,
+    pairs: Optional[Set[Tuple[str, str]]] = None
+) -> Dict[str, Any]:
+    """
+    Encola una ejecución masiva (o solo pairs) en la cola de trabajo distribuida,
+    con la misma planificación por prioridad que la ejecución local. Solo necesita
+    las definiciones de segmentos: no arranca el cliente de Ollama ni la recuperación
+    """
+    all_segments = segment_db.get_all_segments()
+    order = {}
+    for segment_id in all_segments:
+        for content_type in CONTENT_TYPES:
+            order[(segment_id, content_type)] = len(order)
+    
+    plan = PriorityScheduler(
+        skip_below=GENERATION_SKIP_PRIORITY,
+        defer_below=GENERATION_DEFER_PRIORITY
+    ).plan(all_segments, CONTENT_TYPES, set(order) - pairs if pairs is not None else frozenset())
+    
+    run_id = run_id or str(int(time.time()))
+    total = queue.enqueue(run_id, plan.tasks, order)
+    logger.info(
+        f"Ejecución {run_id} encolada en {queue.db_path}: {total} tareas "
+        f"({len(plan.deferred)} diferidas, {len(plan.skipped)} omitidas por prioridad baja)"
+    )
+    return {"run_id": run_id, "total": total, "deferred": len(plan.deferred), "skipped_low_priority": len(plan.skipped)}
+
+
 class ExpandedContentGenerator:
     """
     Generador de contenido basado en segmentos expandidos con metadata detallada
     """
     
-    def __init__(self, chroma_host: str = CHROMA_HOST, chroma_port: int = CHROMA_PORT):
+    def __init__(
+        self,
+        chroma_host: str = CHROMA_HOST,
+        chroma_port: int = CHROMA_PORT,
+        ollama_client: Optional[OllamaClient] = None,
+        force_regenerate: bool = False,
+        chat_api: bool = GENERATION_CHAT_API
+    ):
         self.chroma_host = chroma_host
         self.chroma_port = chroma_port
         self.segment_db = ExpandedSegmentDatabase()
-        self.ollama_client = OllamaClient()
+        self.ollama_client = ollama_client or OllamaClient()
+        self._owns_client = ollama_client is None
+        
+        # Caché de generaciones; force_regenerate ignora los aciertos pero sigue guardando
+        self.generation_cache = GenerationCache(GENERATION_CACHE_PATH) if GENERATION_CACHE_ENABLED else None
+        self.force_regenerate = force_regenerate
+        self._modelfile_digest = None
+        self._digest_lock = threading.Lock()
+        
+        # Contadores de Ollama de la última llamada por (segmento, tipo de contenido)
+        self._generation_metrics: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._metrics_lock = threading.Lock()
+        
+        # Generación por lotes: varios tipos de contenido de un segmento en una sola llamada JSON
+        self._batch_plan: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self._batch_results: Dict[Tuple[str, str], Optional[str]] = {}
+        self._batch_locks: Dict[Tuple[str, Tuple[str, ...]], threading.Lock] = {}
+        self._batches_run: Set[Tuple[str, Tuple[str, ...]]] = set()
+        self._batch_lock = threading.Lock()
+        self.batch_stats = {"batches": 0, "pieces": 0, "fallbacks": 0}
+        
+        # Timeouts por tipo de contenido a partir de la latencia observada, acotados
+        # por el tiempo que le queda a la ejecución masiva en curso
+        self.call_timeouts = AdaptiveTimeout(
+            OLLAMA_TIMEOUT,
+            minimum=OLLAMA_TIMEOUT_MIN,
+            multiplier=OLLAMA_TIMEOUT_MULTIPLIER,
+            pct=OLLAMA_TIMEOUT_PERCENTILE,
+            min_samples=OLLAMA_TIMEOUT_MIN_SAMPLES
+        ) if OLLAMA_TIMEOUT_ADAPTIVE else None
+        self._run_deadline: Optional[float] = None
+        
+        # Modo chat: pautas generales en el mensaje de sistema (o en el SYSTEM del
+        # Modelfile) y solo el material del segmento en el turno de usuaria
+        self.chat_api = chat_api
+        self.model = OLLAMA_CHAT_MODEL if chat_api else OLLAMA_MODEL
+        self.chat_system = None if OLLAMA_CHAT_SYSTEM_IN_MODELFILE else CHAT_SYSTEM_PROMPT
+        if chat_api:
+            logger.info(
+                f"Generación vía /api/chat con {self.model}: pautas generales "
+                f"{'en el Modelfile' if self.chat_system is None else 'en el mensaje de sistema'} "
+                f"(~{estimate_tokens(CHAT_SYSTEM_PROMPT)} tokens)"
+            )
+            if GENERATION_STREAMING:
+                logger.warning("El modo chat no usa streaming: las piezas se generan con respuestas completas")
         
         # Inicializar cliente de Chroma
         try:
             import chromadb
             self.chroma_client = chromadb.HttpClient(host=chroma_host, port=chroma_port)
-            self.collection = self.chroma_client.get_collection("medical_documents")
+            self.collection = self.chroma_client.get_collection(CHROMA_COLLECTION)
             logger.info("✓ Conectado a Chroma DB")
         except Exception as e:
             logger.error(f"Error conectando a Chroma DB: {e}")
             self.chroma_client = None
             self.collection = None
+        
+        # Recuperación híbrida (vectorial + BM25)
+        self.retriever = HybridRetriever(
+            self.collection,
+            bm25_index=SpanishBM25Index.load_or_create(BM25_INDEX_PATH),
+            alpha=HYBRID_ALPHA,
+            candidate_pool=RETRIEVAL_CANDIDATES
+        )
+        
+        # Reranking opcional con cross-encoder
+        self.reranker = None
+        if RERANK_ENABLED:
+            self.reranker = CrossEncoderReranker(
+                RERANK_MODEL,
+                batch_size=RERANK_BATCH_SIZE,
+                budget_ms=RERANK_BUDGET_MS
+            )
+        
+        # Empaquetado de contexto con presupuesto de tokens por tipo de contenido
+        self.context_packer = ContextPacker(
+            mmr_lambda=MMR_LAMBDA,
+            overlap_threshold=CONTEXT_OVERLAP_THRESHOLD
+        )
+        
+        # Contexto precalculado por (segmento, tipo de contenido)
+        self.context_table = MaterializedContextTable(MATERIALIZED_CONTEXT_PATH)
+        # Parámetros que cambian el contexto recuperado: forman parte de la huella de la consulta
+        self._retrieval_settings = {
+            "hybrid_alpha": HYBRID_ALPHA,
+            "candidates": RETRIEVAL_CANDIDATES,
+            "top_k": RETRIEVAL_TOP_K,
+            "rerank": {
+                "model": RERANK_MODEL, "candidates": RERANK_CANDIDATES, "top_n": RERANK_TOP_N
+            } if RERANK_ENABLED else None,
+            "mmr_lambda": MMR_LAMBDA,
+            "overlap_threshold": CONTEXT_OVERLAP_THRESHOLD
+        }
+        
+        # Hash del contexto usado por par, para la huella de recuperación de cada pieza
+        self._context_digests: Dict[Tuple[str, str], str] = {}
+    
+    def close(self):
+        """Cierra el cliente de Ollama (su loop en segundo plano) si lo creó el generador"""
+        if self._owns_client:
+            self.ollama_client.close()
     
     def generate_content_for_expanded_segment(
         self, 
@@ -64,22 +234,23 @@ class ExpandedContentGenerator:
                 logger.error(f"Segmento {segment_id} no encontrado")
                 return None
             
-            # Verificar si el tipo de contenido es recomendado para este segmento
+            # Mismo criterio que PriorityScheduler: solo avisa si el planificador excluiría la pieza
             content_priority = self._get_content_priority(segment, content_type)
-            if content_priority < 0.5:
+            if content_priority < GENERATION_SKIP_PRIORITY:
                 logger.warning(f"Tipo de contenido {content_type} no recomendado para {segment_id} (prioridad: {content_priority})")
+            elif content_priority < GENERATION_DEFER_PRIORITY:
+                logger.debug(f"Tipo de contenido {content_type} de baja prioridad para {segment_id} (prioridad: {content_priority})")
             
-            # Obtener contexto relevante
-            context = self._get_relevant_context(segment, content_type)
-            
-            # Generar prompt personalizado
+            # Generar prompt personalizado (el contexto solo hace falta si se construye aquí)
             if custom_prompt:
                 prompt = custom_prompt
             else:
+                context = self._get_relevant_context(segment, content_type)
                 prompt = self._build_content_prompt(segment, content_type, context)
             
-            # Generar contenido
-            content = self.ollama_client.generate_content(prompt)
+            # Generar contenido con opciones acotadas por content_generation_rules
+            options = self._get_generation_options(segment, content_type, prompt)
+            content = self._generate(prompt, segment_id, content_type, options)
             
             if content:
                 logger.info(f"✓ Contenido generado para {segment_id} - {content_type}")
@@ -92,6 +263,137 @@ class ExpandedContentGenerator:
             logger.error(f"Error en generación de contenido: {e}")
             return None
     
+    def _generate(self, prompt: str, segment_id: str, content_type: str, options: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Genera el contenido salvo que la caché ya tenga la respuesta para este prompt y opciones"""
+        cache_key = None
+        if self.generation_cache:
+            cache_key = generation_cache_key(self.model, self._get_modelfile_digest(), self._cache_prompt(prompt), options)
+            if not self.force_regenerate:
+                cached = self.generation_cache.get(cache_key)
+                if cached:
+                    logger.info(f"✓ {segment_id} - {content_type}: recuperado de caché")
+                    self._store_generation_metrics(segment_id, content_type, {"cache_hit": True})
+                    return cached
+        
+        start = time.perf_counter()
+        content, stats = self._call_ollama(prompt, segment_id, content_type, options)
+        self._store_generation_metrics(segment_id, content_type, dict(stats or {}, cache_hit=False))
+        
+        if cache_key and content:
+            self.generation_cache.put(cache_key, self.model, content, time.perf_counter() - start)
+        return content
+    
+    def _cache_prompt(self, prompt: str) -> str:
+        """Lo que recibe el modelo: en modo chat, los mensajes con el de sistema incluido"""
+        if self.chat_api:
+            return json.dumps(build_chat_messages(prompt, self.chat_system), ensure_ascii=False)
+        return prompt
+    
+    def _get_modelfile_digest(self) -> Optional[str]:
+        """Digest del modelo en Ollama; si no está disponible, hash del Modelfile local"""
+        with self._digest_lock:
+            if self._modelfile_digest is None:
+                self._modelfile_digest = self.ollama_client.model_digest(self.model) or file_digest(MODELFILE_PATH)
+            return self._modelfile_digest
+    
+    def _call_ollama(
+        self,
+        prompt: str,
+        segment_id: str,
+        content_type: str,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Llama a Ollama y devuelve el contenido con sus contadores de evaluación;
+        en modo streaming registra además TTFT y latencia entre tokens
+        """
+        # Con afinidad, los tipos de contenido de un segmento van al mismo backend (prefijo en caché)
+        affinity = segment_id if GENERATION_SEGMENT_AFFINITY else None
+        timeout = self._call_timeout(content_type)
+        if self.chat_api:
+            try:
+                result = self.ollama_client.chat(
+                    build_chat_messages(prompt, self.chat_system),
+                    model=self.model, timeout=timeout, options=options, affinity=affinity
+                )
+            except OllamaError as e:
+                logger.error(str(e))
+                self._record_call_error(content_type, timeout, e)
+                return "", None
+            self._record_call_latency(content_type, result["request_seconds"])
+            return result.get("message", {}).get("content", "").strip(), eval_stats(result)
+        
+        if not GENERATION_STREAMING:
+            try:
+                result = self.ollama_client.generate(prompt, timeout=timeout, options=options, affinity=affinity)
+            except OllamaError as e:
+                logger.error(str(e))
+                self._record_call_error(content_type, timeout, e)
+                return "", None
+            self._record_call_latency(content_type, result["request_seconds"])
+            return result.get("response", "").strip(), eval_stats(result)
+        
+        try:
+            content, metrics = self.ollama_client.generate_streaming(
+                prompt,
+                max_output_chars=OLLAMA_STREAM_MAX_CHARS,
+                stop=options.get("stop") if options else None,
+                timeout=timeout,
+                options=options,
+                affinity=affinity
+            )
+        except OllamaError as e:
+            logger.error(str(e))
+            self._record_call_error(content_type, timeout, e)
+            return "", None
+        self._record_call_latency(content_type, metrics.total_seconds)
+        
+        summary = metrics.to_dict()
+        logger.info(
+            f"{segment_id} - {content_type}: TTFT {summary['ttft_ms']} ms, "
+            f"entre tokens {summary['inter_token_ms_mean']} ms (p95 {summary['inter_token_ms_p95']} ms), "
+            f"fin: {summary['stop_reason']}"
+        )
+        return content, metrics.eval_stats
+    
+    def _call_timeout(self, key: str) -> Optional[float]:
+        """Timeout de una llamada: adaptativo y sin pasar del límite de la ejecución"""
+        remaining = self._run_deadline - time.monotonic() if self._run_deadline is not None else None
+        if self.call_timeouts:
+            return self.call_timeouts.timeout(key, remaining)
+        return min(OLLAMA_TIMEOUT, max(remaining, 1.0)) if remaining is not None else None
+    
+    def _record_call_latency(self, key: str, seconds: float):
+        """Latencia del intento HTTP que tuvo éxito (sin cola del pool ni esperas de backoff)"""
+        if self.call_timeouts:
+            self.call_timeouts.record(key, seconds)
+    
+    def _record_call_error(self, key: str, timeout: Optional[float], error: OllamaError):
+        # Un timeout es una muestra censurada: sin ella el timeout solo podría estrecharse
+        if self.call_timeouts and timeout is not None and error.timed_out:
+            self.call_timeouts.record_timeout(key, timeout)
+    
+    def _estimate_task(self, task: GenerationTask, batched: bool) -> Optional[float]:
+        """Duración esperada de una tarea (None mientras no haya latencias suficientes)"""
+        if not self.call_timeouts:
+            return None
+        if batched:
+            key = (task.segment_id, task.content_type)
+            with self._batch_lock:
+                if key in self._batch_results:
+                    # El lote ya se generó: la pieza sale del resultado sin llamar a Ollama
+                    return 0.0
+            return self.call_timeouts.expected("batch")
+        return self.call_timeouts.expected(task.content_type)
+    
+    def _store_generation_metrics(self, segment_id: str, content_type: str, stats: Dict[str, Any]):
+        with self._metrics_lock:
+            self._generation_metrics[(segment_id, content_type)] = stats
+    
+    def _pop_generation_metrics(self, segment_id: str, content_type: str) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return self._generation_metrics.pop((segment_id, content_type), {})
+    
     def _get_content_priority(self, segment: ExpandedSegment, content_type: str) -> float:
         """Obtiene la prioridad de un tipo de contenido para un segmento"""
         content_types = segment.recommended_content_types
@@ -109,30 +411,86 @@ class ExpandedContentGenerator:
     
     def _get_relevant_context(self, segment: ExpandedSegment, content_type: str) -> str:
         """Obtiene contexto relevante de la base de datos para el segmento"""
+        # Primero la tabla materializada (búsqueda por clave, sin consulta vectorial)
+        fingerprint = self._get_query_fingerprint(segment, content_type)
+        materialized = self.context_table.get(segment.id, content_type, fingerprint)
+        text = materialized.text if materialized is not None else self._retrieve_context(segment, content_type).text
+        self._context_digests[(segment.id, content_type)] = text_digest(text)
+        return text
+    
+    def _pair_fingerprint(self, segment: ExpandedSegment, content_type: str) -> PairFingerprint:
+        """Huella de un par: definición del segmento, versión de plantilla, modelo y contexto recuperado"""
+        context_digest = self._context_digests.get((segment.id, content_type))
+        if context_digest is None:
+            self._get_relevant_context(segment, content_type)
+            context_digest = self._context_digests[(segment.id, content_type)]
+        return PairFingerprint(
+            segment=segment_digest(segment, self._get_generation_rules(segment)),
+            template=f"{PROMPT_TEMPLATE_VERSION}:{'chat' if self.chat_api else 'generate'}",
+            model=f"{self.model}@{self._get_modelfile_digest() or '-'}",
+            retrieval=context_digest
+        )
+    
+    def _get_query_fingerprint(self, segment: ExpandedSegment, content_type: str) -> str:
+        """Huella de la consulta de recuperación de un par (segmento, tipo de contenido)"""
+        return query_fingerprint(
+            self._build_query_terms(segment, content_type),
+            self._get_context_token_budget(segment, content_type),
+            self._retrieval_settings
+        )
+    
+    def _retrieve_context(self, segment: ExpandedSegment, content_type: str) -> PackedContext:
+        """Recupera, reordena y empaqueta el contexto dentro del presupuesto de tokens"""
         if not self.collection:
-            return ""
+            return PackedContext(text="")
         
         try:
             # Construir query basada en el segmento
             query_terms = self._build_query_terms(segment, content_type)
             
-            # Buscar en Chroma DB
-            results = self.collection.query(
-                query_texts=query_terms,
-                n_results=5
-            )
-            
-            # Combinar resultados
-            context_parts = []
-            if results['documents'] and results['documents'][0]:
-                for doc in results['documents'][0]:
-                    context_parts.append(doc)
+            # Búsqueda híbrida en Chroma DB + índice BM25
+            if self.reranker:
+                candidates = self.retriever.retrieve(query_terms, n_results=RERANK_CANDIDATES)
+                candidates = self.reranker.rerank(" ".join(query_terms), candidates, top_n=RERANK_TOP_N)
+                max_passages = RERANK_TOP_N
+            else:
+                candidates = self.retriever.retrieve(query_terms, n_results=RETRIEVAL_CANDIDATES)
+                max_passages = RETRIEVAL_TOP_K
             
-            return "\n\n".join(context_parts)
+            return self.context_packer.pack(
+                candidates,
+                token_budget=self._get_context_token_budget(segment, content_type),
+                max_passages=max_passages
+            )
             
         except Exception as e:
             logger.error(f"Error obteniendo contexto: {e}")
-            return ""
+            return PackedContext(text="")
+    
+    def _get_generation_rules(self, segment: ExpandedSegment) -> Dict[str, Any]:
+        """content_generation_rules del segmento"""
+        metadata = self.segment_db.get_segment_metadata(segment.id)
+        return metadata.get("segment_metadata", {}).get("content_generation_rules", {})
+    
+    def _get_context_token_budget(self, segment: ExpandedSegment, content_type: str) -> int:
+        """Presupuesto de tokens de contexto según content_generation_rules"""
+        rules = self._get_generation_rules(segment)
+        return rules.get("context_token_budget", {}).get(content_type, DEFAULT_CONTEXT_TOKEN_BUDGET)
+    
+    def _get_generation_options(self, segment: ExpandedSegment, content_type: str, prompt: str) -> Dict[str, Any]:
+        """Opciones de Ollama (num_predict, num_ctx, temperature, stop) para este par"""
+        options = build_generation_options(content_type, self._get_generation_rules(segment), num_ctx=OLLAMA_NUM_CTX)
+        
+        # Ollama recorta el prompt en silencio si no cabe junto con la respuesta
+        # (en modo chat el mensaje de sistema también ocupa contexto)
+        system_tokens = estimate_tokens(CHAT_SYSTEM_PROMPT) if self.chat_api else 0
+        required = estimate_tokens(prompt) + system_tokens + options["num_predict"]
+        if required > options["num_ctx"]:
+            logger.warning(
+                f"{segment.id} - {content_type}: prompt + respuesta (~{required} tokens) "
+                f"excede num_ctx={options['num_ctx']}"
+            )
+        return options
     
     def _build_query_terms(self, segment: ExpandedSegment, content_type: str) -> List[str]:
         """Construye términos de búsqueda basados en el segmento"""
@@ -171,7 +529,17 @@ class ExpandedContentGenerator:
         content_type: str, 
         context: str
     ) -> str:
-        """Construye el prompt para generar contenido específico"""
+        """
+        Construye el prompt para generar contenido específico.
+
+        El prefijo con el material estático del segmento es idéntico byte a byte
+        para los seis tipos de contenido, de modo que Ollama reutiliza su caché
+        de procesamiento del prompt; lo que varía (contexto e instrucciones) va al final
+        """
+        return self._build_segment_prefix(segment) + self._build_content_suffix(segment, content_type, context)
+    
+    def _build_segment_prefix(self, segment: ExpandedSegment) -> str:
+        """Parte del prompt que solo depende del segmento"""
         
         # Información del segmento
         segment_info = f"""
@@ -229,46 +597,56 @@ PRIORIDADES DE INTERVENCIÓN:
 {', '.join(segment.intervention_priorities)}
 """
         
-        # Contexto de la base de datos
-        context_info = f"""
-CONTEXTO MÉDICO RELEVANTE:
-{context}
-"""
-        
-        # Instrucciones específicas por tipo de contenido
-        content_instructions = self._get_content_type_instructions(content_type, segment)
-        
-        # Construir prompt completo
-        prompt = f"""
-Eres una experta en salud femenina y bienestar menstrual. Tu tarea es generar contenido personalizado y empático para mujeres en diferentes fases de su ciclo menstrual.
-
-{segment_info}
+        profile = f"""{segment_info}
 {emotional_info}
 {hormonal_info}
 {physical_info}
 {demographics_info}
 {intervention_info}
-{context_info}
-
-INSTRUCCIONES ESPECÍFICAS PARA {content_type.upper()}:
-{content_instructions}
-
-REQUISITOS OBLIGATORIOS:
-1. Usa un tono {segment.content_preferences.tone}
+"""
+        
+        segment_requirements = f"""1. Usa un tono {segment.content_preferences.tone}
 2. Mantén un nivel de profundidad {segment.content_preferences.depth}
 3. Enfócate en: {', '.join(segment.content_preferences.focus_areas)}
-4. EVITA: {', '.join(segment.content_preferences.avoid_topics)}
+4. EVITA: {', '.join(segment.content_preferences.avoid_topics)}"""
+        
+        if self.chat_api:
+            # Las pautas generales viajan en el mensaje de sistema (CHAT_SYSTEM_PROMPT)
+            return f"""
+{profile}
+REQUISITOS DEL SEGMENTO:
+{segment_requirements}
+"""
+        
+        return f"""
+Eres una experta en salud femenina y bienestar menstrual. Tu tarea es generar contenido personalizado y empático para mujeres en diferentes fases de su ciclo menstrual.
+
+{profile}
+REQUISITOS OBLIGATORIOS:
+{segment_requirements}
 5. RESPETA ESTRICTAMENTE los límites de longitud especificados para cada tipo de contenido
 6. Incluye consejos prácticos y validación emocional
 7. NO hagas diagnósticos médicos
 8. Usa lenguaje empático y comprensivo
 9. Basa el contenido en la información médica proporcionada
 10. Dirige el contenido directamente a la usuaria usando "tú" y "tu"
+"""
+    
+    def _build_content_suffix(self, segment: ExpandedSegment, content_type: str, context: str) -> str:
+        """Parte del prompt que varía por tipo de contenido: contexto recuperado e instrucciones"""
+        
+        # Instrucciones específicas por tipo de contenido
+        content_instructions = self._get_content_type_instructions(content_type, segment)
+        
+        return f"""
+CONTEXTO MÉDICO RELEVANTE:
+{context}
+
+INSTRUCCIONES ESPECÍFICAS PARA {content_type.upper()}:
+{content_instructions}
 
 Genera el contenido ahora:
 """
-        
-        return prompt
     
     def _get_content_type_instructions(self, content_type: str, segment: ExpandedSegment) -> str:
         """Obtiene instrucciones específicas para cada tipo de contenido"""
@@ -365,20 +743,37 @@ FORMATO: Información práctica sobre la relación entre estrés, cortisol y tu
         
         return instructions.get(content_type, "Genera contenido relevante y útil para este segmento.")
     
-    def generate_content_for_all_expanded_segments(self) -> Dict[str, Any]:
-        """Genera contenido para todos los segmentos expandidos"""
+    def generate_content_for_all_expanded_segments(
+        self,
+        max_in_flight: int = GENERATION_MAX_IN_FLIGHT,
+        resume_journal: Optional[str] = None,
+        time_budget: float = GENERATION_TIME_BUDGET,
+        batched: bool = GENERATION_BATCHED,
+        dedup: bool = GENERATION_DEDUP,
+        pairs: Optional[Set[Tuple[str, str]]] = None,
+        exports_dir: Path = Path("data/exports")
+    ) -> Dict[str, Any]:
+        """
+        Genera contenido para todos los segmentos expandidos.
+        Cada pieza se escribe en un diario JSONL al terminar; con resume_journal
+        se reanuda una ejecución interrumpida saltando los pares ya generados.
+
+        Las piezas se generan de mayor a menor valor (prioridad del tipo de
+        contenido × urgencia del segmento); con time_budget (segundos) no se
+        inicia ninguna pieza que no terminaría antes del límite según la latencia
+        observada, y el timeout de cada llamada no pasa de él. En modo batched, los
+        tipos de contenido de un segmento se piden en lotes con salida JSON.
+        Con dedup, las tareas con prompts equivalentes se generan una sola vez
+        y el resultado se replica a los demás segmentos del grupo. Con pairs solo
+        se generan esos pares (segmento, tipo de contenido). El diario, la cola de
+        reintentos, la exportación y las métricas se escriben en exports_dir
+        """
         try:
+            deadline = time.monotonic() + time_budget if time_budget else None
+            self._run_deadline = deadline
             all_segments = self.segment_db.get_all_segments()
-            content_types = [
-                "lesson_3min",
-                "whats_happening", 
-                "nutrition_guide",
-                "cycle_day_info",
-                "hormone_levels",
-                "stress_levels"
-            ]
-            
-            generated_content = []
+            content_types = CONTENT_TYPES
+            
             total_segments = len(all_segments)
             total_content_types = len(content_types)
             total_combinations = total_segments * total_content_types
@@ -386,65 +781,210 @@ FORMATO: Información práctica sobre la relación entre estrés, cortisol y tu
             logger.info(f"Generando contenido para {total_segments} segmentos expandidos...")
             logger.info(f"Total de combinaciones: {total_combinations}")
             
-            current_combination = 0
+            run_id = int(time.time())
+            if not resume_journal:
+                # Dos ejecuciones en el mismo segundo no deben compartir diario (la segunda lo reanudaría)
+                while (exports_dir / f"expanded_content_journal_{run_id}.jsonl").exists():
+                    run_id += 1
+            journal_path = Path(resume_journal) if resume_journal else exports_dir / f"expanded_content_journal_{run_id}.jsonl"
+            journal = GenerationJournal(journal_path, fsync_every=JOURNAL_FSYNC_EVERY)
+            completed_keys = journal.completed_keys()
+            logger.info(f"Diario de generación: {journal_path}")
+            if completed_keys:
+                logger.info(f"Reanudando: {len(completed_keys)} piezas ya generadas se omiten")
             
-            for segment_id, segment in all_segments.items():
-                logger.info(f"Procesando segmento: {segment.name} ({segment_id})")
-                
+            # Orden canónico de la exportación (segmento × tipo de contenido)
+            order = {}
+            for segment_id in all_segments:
                 for content_type in content_types:
-                    current_combination += 1
-                    logger.info(f"Progreso: {current_combination}/{total_combinations} - {segment_id} - {content_type}")
-                    
-                    try:
-                        # Generar contenido
-                        content = self.generate_content_for_expanded_segment(
-                            segment_id=segment_id,
-                            content_type=content_type
+                    order[(segment_id, content_type)] = len(order)
+            
+            # Orden de ejecución por valor; lo de prioridad baja se omite o se difiere
+            excluded = completed_keys | (set(order) - pairs) if pairs is not None else completed_keys
+            plan = PriorityScheduler(
+                skip_below=GENERATION_SKIP_PRIORITY,
+                defer_below=GENERATION_DEFER_PRIORITY
+            ).plan(all_segments, content_types, excluded)
+            tasks = plan.tasks
+            
+            # Tareas equivalentes (mismos campos de contenido y opciones): una llamada por grupo
+            dedup_plan = plan_prompt_dedup(tasks, self._dedup_signature, self._render_group_prompt) if dedup and tasks else None
+            if dedup_plan:
+                tasks = dedup_plan.leaders
+            
+            def record_outcome(outcome):
+                metrics = self._pop_generation_metrics(outcome.task.segment_id, outcome.task.content_type)
+                if outcome.content:
+                    segment = all_segments[outcome.task.segment_id]
+                    metrics["latency_seconds"] = round(outcome.elapsed, 3)
+                    journal.append(self._build_content_record(
+                        segment, outcome.task.content_type, outcome.content, generation_metrics=metrics
+                    ))
+                    # Replicar a los segmentos con un prompt equivalente
+                    members = dedup_plan.members((outcome.task.segment_id, outcome.task.content_type)) if dedup_plan else []
+                    for member_id, content_type in members:
+                        journal.append(self._build_content_record(
+                            all_segments[member_id], content_type, outcome.content,
+                            generation_metrics={"cache_hit": True, "deduplicated_from": outcome.task.segment_id}
+                        ))
+                else:
+                    logger.warning(f"✗ {outcome.task.segment_id} - {outcome.task.content_type}: No generado")
+            
+            # Arranque en frío medido aparte: el rendimiento del motor solo cuenta generación
+            warmup = self._warm_up() if OLLAMA_PRELOAD and tasks else None
+            
+            # Los líderes de un grupo usan el prompt común del grupo, fuera de los lotes
+            group_prompts = dedup_plan.prompts if dedup_plan else {}
+            if batched:
+                self._plan_batches([task for task in tasks if (task.segment_id, task.content_type) not in group_prompts])
+            
+            def generate(task):
+                key = (task.segment_id, task.content_type)
+                if batched and key not in group_prompts:
+                    return self._generate_from_batch(task.segment_id, task.content_type)
+                return self.generate_content_for_expanded_segment(
+                    segment_id=task.segment_id,
+                    content_type=task.content_type,
+                    custom_prompt=group_prompts.get(key)
+                )
+            
+            concurrency = self._concurrency_limit(max_in_flight)
+            engine = ConcurrentGenerationEngine(
+                generate,
+                max_in_flight=max_in_flight,
+                on_outcome=record_outcome,
+                estimate=lambda task: self._estimate_task(task, batched),
+                concurrency=concurrency
+            )
+            # Afinidad por segmento: sus tipos de contenido se generan seguidos y comparten prefijo
+            # (las piezas diferidas de un segmento forman un grupo aparte, al final)
+            group_key = (lambda task: (task.segment_id, task.deferred)) if GENERATION_SEGMENT_AFFINITY else None
+            try:
+                outcomes = engine.run(tasks, group_key=group_key, deadline=deadline)
+                throughput = engine.throughput()
+                
+                # Cola de reintentos: los pares fallidos se reintentan al final, cuando Ollama ya se recuperó
+                failed = [outcome.task for outcome in outcomes if not outcome.content and not outcome.skipped]
+                not_started = [(outcome.task, outcome.skip_reason) for outcome in outcomes if outcome.skipped]
+                for retry_pass in range(1, GENERATION_RETRY_PASSES + 1):
+                    if not failed:
+                        break
+                    logger.info(f"Cola de reintentos (pasada {retry_pass}): {len(failed)} piezas")
+                    retry_tasks = [
+                        GenerationTask(
+                            index=i, segment_id=task.segment_id, content_type=task.content_type,
+                            priority=task.priority, deferred=task.deferred
                         )
-                        
-                        if content:
-                            content_data = {
-                                "segment_id": segment_id,
-                                "segment_name": segment.name,
-                                "segment_category": segment.category,
-                                "segment_phase": segment.phase,
-                                "content_type": content_type,
-                                "content_priority": self._get_content_priority(segment, content_type),
-                                "content": content,
-                                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-                                "segment_metadata": self.segment_db.get_segment_metadata(segment_id)
+                        for i, task in enumerate(failed)
+                    ]
+                    retry_outcomes = engine.run(retry_tasks, group_key=group_key, deadline=deadline)
+                    failed = [outcome.task for outcome in retry_outcomes if not outcome.content and not outcome.skipped]
+                    not_started += [(outcome.task, outcome.skip_reason) for outcome in retry_outcomes if outcome.skipped]
+            finally:
+                journal.close()
+                self._release_model()
+                self._run_deadline = None
+            
+            pending = [(task, "failed") for task in failed] + not_started
+            if dedup_plan:
+                # Los miembros de un grupo corren la suerte de la tarea que lo representa
+                pending = self._with_dedup_members(pending, dedup_plan)
+            failed = [task for task, reason in pending if reason == "failed"]
+            not_started = [task for task, reason in pending if reason != "failed"]
+            
+            if not_started:
+                logger.warning(f"{len(not_started)} piezas sin iniciar por el límite de tiempo de la ejecución")
+            
+            retry_queue_path = None
+            if pending:
+                retry_queue_path = exports_dir / f"expanded_content_retry_{run_id}.json"
+                with open(retry_queue_path, 'w', encoding='utf-8') as f:
+                    json.dump(
+                        [
+                            {
+                                "segment_id": task.segment_id,
+                                "content_type": task.content_type,
+                                "priority": task.priority,
+                                "reason": reason
                             }
-                            generated_content.append(content_data)
-                            
-                            logger.info(f"✓ {segment_id} - {content_type}: Generado (prioridad: {content_data['content_priority']:.2f})")
-                        else:
-                            logger.warning(f"✗ {segment_id} - {content_type}: No generado")
-                    
-                    except Exception as e:
-                        logger.error(f"Error generando {content_type} para {segment_id}: {e}")
-                        continue
-            
-            # Guardar resultados
+                            for task, reason in pending
+                        ],
+                        f, ensure_ascii=False, indent=2
+                    )
+                logger.warning(
+                    f"{len(pending)} piezas sin generar guardadas en la cola de reintentos: {retry_queue_path} "
+                    f"(se completan con --resume {journal_path})"
+                )
+            
+            # Compactar el diario en la exportación final, en el orden determinista de las tareas
+            export_path = exports_dir / f"expanded_content_{run_id}.json"
+            generated_content = journal.compact(
+                export_path,
+                order_key=lambda record: order.get((record["segment_id"], record["content_type"]), len(order))
+            )
+            
             if generated_content:
-                export_path = Path("data/exports") / f"expanded_content_{int(time.time())}.json"
-                export_path.parent.mkdir(exist_ok=True)
-                
-                with open(export_path, 'w', encoding='utf-8') as f:
-                    json.dump(generated_content, f, ensure_ascii=False, indent=2)
-                
                 logger.info(f"✓ {len(generated_content)} piezas de contenido expandido exportadas a: {export_path}")
                 
                 # Estadísticas
                 stats = self._generate_statistics(generated_content)
                 logger.info(f"Estadísticas: {stats}")
+                logger.info(
+                    f"Rendimiento: {throughput['requests_per_minute']:.1f} solicitudes/min, "
+                    f"{throughput['tokens_per_second']:.1f} tokens/s en {throughput['elapsed_seconds']}s"
+                )
+                
+                cache_summary = self.generation_cache.summary() if self.generation_cache else None
+                if cache_summary:
+                    logger.info(
+                        f"Caché: {cache_summary['hits']} aciertos ({cache_summary['hit_rate']:.0%}), "
+                        f"~{cache_summary['seconds_saved']}s de cómputo ahorrados"
+                    )
+                
+                # Métricas de la ejecución junto a la exportación (incluida la evolución de la concurrencia)
+                metrics_path = exports_dir / f"expanded_content_metrics_{run_id}.json"
+                with open(metrics_path, 'w', encoding='utf-8') as f:
+                    json.dump(
+                        {
+                            "run_id": run_id,
+                            "throughput": throughput,
+                            "concurrency": concurrency.summary() if concurrency else None,
+                            "timeouts": self.call_timeouts.summary() if self.call_timeouts else None,
+                            "dedup": dedup_plan.summary() if dedup_plan else None,
+                            "batching": dict(self.batch_stats) if batched else None,
+                            "generation": stats["generation"]["run"]
+                        },
+                        f, ensure_ascii=False, indent=2
+                    )
                 
                 return {
                     "success": True,
                     "total_content": len(generated_content),
                     "export_path": str(export_path),
-                    "statistics": stats
+                    "metrics_path": str(metrics_path),
+                    "journal_path": str(journal_path),
+                    "resumed": len(completed_keys),
+                    "warmup": warmup,
+                    "failed": len(failed),
+                    "not_started": len(not_started),
+                    "deferred": len(plan.deferred),
+                    "skipped_low_priority": len(plan.skipped),
+                    "retry_queue_path": str(retry_queue_path) if retry_queue_path else None,
+                    "resilience": {
+                        "retries": self.ollama_client.retries,
+                        "circuit_breaker": self.ollama_client.circuit_breaker.summary()
+                    },
+                    "backends": self.ollama_client.pool_summary(),
+                    "batching": dict(self.batch_stats) if batched else None,
+                    "dedup": dedup_plan.summary() if dedup_plan else None,
+                    "timeouts": self.call_timeouts.summary() if self.call_timeouts else None,
+                    "concurrency": concurrency.summary() if concurrency else None,
+                    "statistics": stats,
+                    "throughput": throughput,
+                    "cache": cache_summary
                 }
             else:
+                export_path.unlink(missing_ok=True)
                 logger.error("No se generó contenido")
                 return {"success": False, "error": "No se generó contenido"}
                 
@@ -452,6 +992,523 @@ FORMATO: Información práctica sobre la relación entre estrés, cortisol y tu
             logger.error(f"Error en generación de contenido expandido: {e}")
             return {"success": False, "error": str(e)}
     
+    def regenerate_changed(
+        self,
+        previous_export: Optional[str] = None,
+        max_in_flight: int = GENERATION_MAX_IN_FLIGHT,
+        time_budget: float = GENERATION_TIME_BUDGET,
+        batched: bool = GENERATION_BATCHED,
+        dedup: bool = GENERATION_DEDUP,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Regenera solo los pares cuya huella cambió respecto a la última exportación
+        (o previous_export) y fusiona el resultado en esa misma exportación.
+        Los pares de segmentos o tipos de contenido eliminados se quitan; los que
+        no se pudieron regenerar conservan su pieza y su huella anteriores, así
+        que la siguiente regeneración los vuelve a intentar
+        """
+        try:
+            export_path = Path(previous_export) if previous_export else latest_export()
+            if export_path is None or not export_path.exists():
+                logger.error("No hay exportación previa: ejecuta primero una generación completa")
+                return {"success": False, "error": "No hay exportación previa"}
+            previous_records = load_export(export_path)
+            logger.info(f"Comparando huellas con: {export_path} ({len(previous_records)} piezas)")
+
+            all_segments = self.segment_db.get_all_segments()
+            current = {
+                (segment_id, content_type): self._pair_fingerprint(segment, content_type)
+                for segment_id, segment in all_segments.items()
+                for content_type in CONTENT_TYPES
+            }
+            changed, removed = fingerprint_diff(current, previous_records)
+
+            reasons: Dict[str, int] = {}
+            for parts in changed.values():
+                for part in parts:
+                    reasons[part] = reasons.get(part, 0) + 1
+            summary = {
+                "export_path": str(export_path),
+                "changed": len(changed),
+                "removed": len(removed),
+                "unchanged": len(current) - len(changed),
+                "reasons": reasons
+            }
+            if dry_run or not (changed or removed):
+                return {"success": True, "dry_run": dry_run, "pairs": sorted(changed), **summary}
+
+            regenerated_records: List[Dict[str, Any]] = []
+            result = None
+            # Diario, cola de reintentos y métricas propios: un --resume posterior
+            # no debe tomarlos por los de una ejecución completa
+            run_dir = export_path.parent / f"regenerate_{int(time.time())}"
+            if changed:
+                result = self.generate_content_for_all_expanded_segments(
+                    max_in_flight=max_in_flight,
+                    time_budget=time_budget,
+                    batched=batched,
+                    dedup=dedup,
+                    pairs=set(changed),
+                    exports_dir=run_dir
+                )
+                if result.get("success"):
+                    regenerated_records = load_export(Path(result["export_path"]))
+
+            # Fusión en el orden canónico de la exportación (segmento × tipo de contenido)
+            order = {key: i for i, key in enumerate(current)}
+            merged = {
+                (record["segment_id"], record["content_type"]): record
+                for record in previous_records
+            }
+            for key in removed:
+                merged.pop(key, None)
+            for record in regenerated_records:
+                merged[(record["segment_id"], record["content_type"])] = record
+            records = sorted(merged.values(), key=lambda record: order.get(
+                (record["segment_id"], record["content_type"]), len(order)
+            ))
+
+            write_export(export_path, records)
+            # La exportación parcial ya está fusionada y lo no regenerado se reintenta
+            # en la siguiente regeneración: no queda nada que reanudar
+            shutil.rmtree(run_dir, ignore_errors=True)
+            logger.info(
+                f"✓ Exportación actualizada en su lugar: {export_path} "
+                f"({len(regenerated_records)} piezas regeneradas, {len(removed)} eliminadas, {len(records)} en total)"
+            )
+
+            return {
+                "success": True,
+                "dry_run": False,
+                "regenerated": len(regenerated_records),
+                "not_regenerated": len(changed) - len(regenerated_records),
+                "total_content": len(records),
+                "generation": result,
+                **summary
+            }
+
+        except Exception as e:
+            logger.error(f"Error en regeneración por huellas: {e}")
+            return {"success": False, "error": str(e)}
+
+    def run_queue_worker(
+        self,
+        queue: GenerationWorkQueue,
+        run_id: str,
+        worker_id: str,
+        max_in_flight: int = GENERATION_MAX_IN_FLIGHT,
+        batched: bool = GENERATION_BATCHED,
+        lease_seconds: float = WORK_QUEUE_LEASE_SECONDS,
+        max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS,
+        poll_seconds: float = WORK_QUEUE_POLL_SECONDS
+    ) -> Dict[str, Any]:
+        """
+        Worker de la cola distribuida: reclama segmentos completos (hasta max_in_flight
+        tareas), los genera contra el Ollama local y guarda cada pieza en la cola.
+        Un hilo renueva los leases cada lease_seconds / 3. Cuando no hay pendientes
+        pero otros workers tienen leases activos, espera por si alguno vence; al
+        terminar la ejecución, el worker que lo detecta escribe la exportación
+        (la escritura es atómica e idempotente, así que da igual cuál sea)
+        """
+        all_segments = self.segment_db.get_all_segments()
+        generated = 0
+        failed = 0
+        
+        def record_outcome(outcome):
+            nonlocal generated, failed
+            key = (outcome.task.segment_id, outcome.task.content_type)
+            metrics = self._pop_generation_metrics(*key)
+            if outcome.content:
+                metrics["latency_seconds"] = round(outcome.elapsed, 3)
+                metrics["worker"] = worker_id
+                queue.complete(run_id, key, worker_id, self._build_content_record(
+                    all_segments[outcome.task.segment_id], outcome.task.content_type, outcome.content,
+                    generation_metrics=metrics
+                ))
+                generated += 1
+            else:
+                queue.fail(run_id, key, worker_id, outcome.error or "sin contenido", max_attempts)
+                failed += 1
+                logger.warning(f"✗ {key[0]} - {key[1]}: No generado (vuelve a la cola)")
+        
+        if batched:
+            generate = lambda task: self._generate_from_batch(task.segment_id, task.content_type)
+        else:
+            generate = lambda task: self.generate_content_for_expanded_segment(task.segment_id, task.content_type)
+        concurrency = self._concurrency_limit(max_in_flight)
+        engine = ConcurrentGenerationEngine(
+            generate, max_in_flight=max_in_flight, on_outcome=record_outcome, concurrency=concurrency
+        )
+        group_key = (lambda task: (task.segment_id, task.deferred)) if GENERATION_SEGMENT_AFFINITY else None
+        
+        stop = threading.Event()
+        
+        def heartbeat():
+            while not stop.wait(lease_seconds / 3):
+                try:
+                    queue.heartbeat(run_id, worker_id, lease_seconds)
+                except sqlite3.Error as e:
+                    logger.error(f"Heartbeat fallido: {e}")
+        
+        heartbeat_thread = threading.Thread(target=heartbeat, name="queue-heartbeat", daemon=True)
+        heartbeat_thread.start()
+        logger.info(f"Worker {worker_id} atendiendo la ejecución {run_id} ({queue.db_path})")
+        
+        warmup = None
+        try:
+            while True:
+                tasks = queue.claim(run_id, worker_id, max_in_flight, lease_seconds, max_attempts)
+                if not tasks:
+                    progress = queue.progress(run_id)
+                    if not progress or progress["finished"]:
+                        break
+                    logger.info(
+                        f"Sin tareas pendientes; {progress['leased']} en curso en otros workers, "
+                        f"nueva comprobación en {poll_seconds:.0f}s"
+                    )
+                    time.sleep(poll_seconds)
+                    continue
+                
+                if warmup is None and OLLAMA_PRELOAD:
+                    warmup = self._warm_up() or {}
+                if batched:
+                    self._plan_batches(tasks)
+                engine.run(tasks, group_key=group_key)
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+            released = queue.release(run_id, worker_id)
+            if released:
+                logger.warning(f"{released} tareas sin empezar devueltas a la cola")
+            self._release_model()
+        
+        export_path = Path("data/exports") / f"expanded_content_{run_id}.json"
+        records = queue.compact(run_id, export_path)
+        return {
+            "run_id": run_id,
+            "worker": worker_id,
+            "generated": generated,
+            "failed_attempts": failed,
+            "export_path": str(export_path) if records else None,
+            "throughput": engine.throughput(),
+            "concurrency": concurrency.summary() if concurrency else None,
+            "progress": queue.progress(run_id)
+        }
+    
+    def _concurrency_limit(self, max_in_flight: int) -> Optional[AIMDConcurrencyLimit]:
+        """Límite en vuelo AIMD de una ejecución (max_in_flight pasa a ser el techo)"""
+        if not GENERATION_ADAPTIVE_CONCURRENCY:
+            return None
+        return AIMDConcurrencyLimit(
+            max_in_flight,
+            minimum=GENERATION_AIMD_MIN,
+            initial=GENERATION_AIMD_INITIAL,
+            tolerance=GENERATION_AIMD_TOLERANCE,
+            sustained=GENERATION_AIMD_SUSTAINED,
+            backoff=GENERATION_AIMD_BACKOFF
+        )
+    
+    def _dedup_signature(self, task: GenerationTask) -> Dict[str, Any]:
+        """
+        Campos del segmento de los que depende el contenido de este tipo (los que usan
+        sus instrucciones, más tono y profundidad) y opciones de Ollama. Quedan fuera
+        la identidad del segmento y el resto del perfil, que solo matizan el prompt, y
+        la temperatura (depende de la urgencia): el líder, el de más prioridad del grupo,
+        suele ser el más urgente y por tanto el de temperatura más baja
+        """
+        segment = self.segment_db.get_segment(task.segment_id)
+        hormones = segment.hormonal_profile
+        fields_by_type = {
+            "lesson_3min": {"emotional_primary": segment.emotional_primary, "age_groups": segment.demographics.age_groups},
+            "whats_happening": {"emotional_primary": segment.emotional_primary},
+            "nutrition_guide": {"emotional_primary": segment.emotional_primary},
+            "cycle_day_info": {},
+            "hormone_levels": {
+                "emotional_primary": segment.emotional_primary,
+                "estrogen_level": hormones.estrogen_level,
+                "progesterone_level": hormones.progesterone_level
+            },
+            "stress_levels": {"emotional_primary": segment.emotional_primary, "cortisol_level": hormones.cortisol_level}
+        }
+        options = build_generation_options(task.content_type, self._get_generation_rules(segment), num_ctx=OLLAMA_NUM_CTX)
+        options.pop("temperature")
+        return {
+            "content_type": task.content_type,
+            "phase": segment.phase,
+            "tone": segment.content_preferences.tone,
+            "depth": segment.content_preferences.depth,
+            "fields": fields_by_type.get(task.content_type, {"segment_id": segment.id}),
+            "options": options
+        }
+
+    def _render_group_prompt(self, task: GenerationTask, members: List[Tuple[str, str]]) -> str:
+        """Prompt del líder de un grupo: evita los temas de todos los miembros, no solo los suyos"""
+        segment = self.segment_db.get_segment(task.segment_id)
+        avoid_topics = list(segment.content_preferences.avoid_topics)
+        for member_id, _ in members:
+            for topic in self.segment_db.get_segment(member_id).content_preferences.avoid_topics:
+                if topic not in avoid_topics:
+                    avoid_topics.append(topic)
+        group_segment = replace(
+            segment, content_preferences=replace(segment.content_preferences, avoid_topics=avoid_topics)
+        )
+        context = self._get_relevant_context(segment, task.content_type)
+        return self._build_content_prompt(group_segment, task.content_type, context)
+    
+    def _with_dedup_members(
+        self,
+        pending: List[Tuple[GenerationTask, str]],
+        dedup_plan: PromptDedupPlan
+    ) -> List[Tuple[GenerationTask, str]]:
+        """Añade a cada tarea pendiente (con su motivo) los miembros de su grupo de deduplicación"""
+        expanded = list(pending)
+        for task, reason in pending:
+            for member_id, content_type in dedup_plan.members((task.segment_id, task.content_type)):
+                expanded.append((GenerationTask(
+                    index=task.index, segment_id=member_id, content_type=content_type,
+                    priority=task.priority, deferred=task.deferred
+                ), reason))
+        return expanded
+    
+    def _plan_batches(self, tasks: List[GenerationTask]):
+        """Agrupa los tipos de contenido pendientes de cada segmento en lotes según su num_predict"""
+        groups: Dict[Tuple[str, bool], List[str]] = {}
+        for task in tasks:
+            groups.setdefault((task.segment_id, task.deferred), []).append(task.content_type)
+        
+        self._batch_plan = {}
+        with self._batch_lock:
+            # Piezas de lotes anteriores que ninguna tarea recogió (omitidas por el límite de tiempo)
+            self._batch_results.clear()
+            self._batches_run.clear()
+        for (segment_id, _), content_types in groups.items():
+            rules = self._get_generation_rules(self.segment_db.get_segment(segment_id))
+            num_predict = {
+                content_type: build_generation_options(content_type, rules, num_ctx=OLLAMA_NUM_CTX)["num_predict"]
+                for content_type in content_types
+            }
+            for batch in plan_batches(content_types, num_predict, GENERATION_BATCH_MAX_PREDICT):
+                for content_type in batch:
+                    self._batch_plan[(segment_id, content_type)] = tuple(batch)
+    
+    def _generate_from_batch(self, segment_id: str, content_type: str) -> Optional[str]:
+        """
+        Devuelve la pieza de su lote (la primera tarea del lote hace la llamada);
+        si la pieza no pasó la validación, o el lote ya se ejecutó y es un reintento, se genera por separado
+        """
+        batch = self._batch_plan.get((segment_id, content_type))
+        if not batch or len(batch) == 1:
+            return self.generate_content_for_expanded_segment(segment_id, content_type)
+        
+        with self._batch_lock:
+            batch_lock = self._batch_locks.setdefault((segment_id, batch), threading.Lock())
+        with batch_lock:
+            with self._batch_lock:
+                attempted = (segment_id, batch) in self._batches_run
+                self._batches_run.add((segment_id, batch))
+            if not attempted:
+                self._run_batch(segment_id, batch)
+        
+        with self._batch_lock:
+            content = self._batch_results.pop((segment_id, content_type), None)
+            if not content:
+                self.batch_stats["fallbacks"] += 1
+        if content:
+            return content
+        
+        logger.info(f"{segment_id} - {content_type}: generación individual (respaldo del lote)")
+        return self.generate_content_for_expanded_segment(segment_id, content_type)
+    
+    def _run_batch(self, segment_id: str, batch: Tuple[str, ...]):
+        """Una llamada con format=esquema que produce varios tipos de contenido de un segmento"""
+        segment = self.segment_db.get_segment(segment_id)
+        content_types = list(batch)
+        valid: Dict[str, str] = {}
+        stats = None
+        cache_hit = False
+        
+        try:
+            budget = max(self._get_context_token_budget(segment, content_type) for content_type in content_types)
+            context = self._merge_contexts(
+                [self._get_relevant_context(segment, content_type) for content_type in content_types],
+                budget
+            )
+            prompt = self._build_batch_prompt(segment, content_types, context)
+            
+            rules = self._get_generation_rules(segment)
+            per_type = [build_generation_options(content_type, rules, num_ctx=OLLAMA_NUM_CTX) for content_type in content_types]
+            # Sin secuencias de parada: podrían cortar el JSON
+            options = {
+                "num_predict": sum(option["num_predict"] for option in per_type),
+                "num_ctx": OLLAMA_NUM_CTX,
+                "temperature": min(option["temperature"] for option in per_type)
+            }
+            schema = batch_schema(content_types)
+            
+            cache_key = None
+            text = None
+            if self.generation_cache:
+                cache_key = generation_cache_key(
+                    self.model, self._get_modelfile_digest(), self._cache_prompt(prompt), {"options": options, "format": schema}
+                )
+                if not self.force_regenerate:
+                    text = self.generation_cache.get(cache_key)
+                    cache_hit = text is not None
+            
+            if text is None:
+                start = time.perf_counter()
+                timeout = self._call_timeout("batch")
+                try:
+                    affinity = segment_id if GENERATION_SEGMENT_AFFINITY else None
+                    if self.chat_api:
+                        result = self.ollama_client.chat(
+                            build_chat_messages(prompt, self.chat_system),
+                            model=self.model,
+                            timeout=timeout,
+                            options=options,
+                            affinity=affinity,
+                            response_format=schema
+                        )
+                        text = result.get("message", {}).get("content", "")
+                    else:
+                        result = self.ollama_client.generate(
+                            prompt,
+                            timeout=timeout,
+                            options=options,
+                            affinity=affinity,
+                            response_format=schema
+                        )
+                        text = result.get("response", "")
+                    stats = eval_stats(result)
+                    self._record_call_latency("batch", result["request_seconds"])
+                except OllamaError as e:
+                    logger.error(f"Error en la llamada por lotes de {segment_id}: {e}")
+                    self._record_call_error("batch", timeout, e)
+                    text = ""
+            
+            valid, invalid = parse_batch_response(text, content_types)
+            if cache_key and not cache_hit and valid and not invalid:
+                self.generation_cache.put(cache_key, self.model, text, time.perf_counter() - start)
+            logger.info(f"✓ {segment_id}: lote {'+'.join(content_types)} - {len(valid)}/{len(content_types)} piezas válidas")
+        except Exception as e:
+            logger.error(f"Error en generación por lotes de {segment_id}: {e}")
+        
+        # Los contadores del lote se reparten entre sus piezas para que las sumas sigan cuadrando
+        for content_type in valid:
+            piece_stats = {"cache_hit": cache_hit, "batched": True, "batch_size": len(content_types)}
+            if stats:
+                piece_stats.update({
+                    key: (round(value / len(content_types), 4) if key.endswith(("_count", "_seconds")) else value)
+                    for key, value in stats.items()
+                })
+            self._store_generation_metrics(segment_id, content_type, piece_stats)
+        
+        with self._batch_lock:
+            self.batch_stats["batches"] += 1
+            self.batch_stats["pieces"] += len(valid)
+            for content_type in content_types:
+                self._batch_results[(segment_id, content_type)] = valid.get(content_type)
+    
+    def _merge_contexts(self, contexts: List[str], token_budget: int) -> str:
+        """Une los contextos de varios tipos de contenido sin pasajes repetidos, dentro del presupuesto"""
+        passages = []
+        seen = set()
+        tokens = 0
+        for context in contexts:
+            for passage in context.split("\n\n"):
+                passage = passage.strip()
+                if not passage or passage in seen:
+                    continue
+                passage_tokens = estimate_tokens(passage)
+                if tokens + passage_tokens > token_budget:
+                    continue
+                seen.add(passage)
+                passages.append(passage)
+                tokens += passage_tokens
+        return "\n\n".join(passages)
+    
+    def _build_batch_prompt(self, segment: ExpandedSegment, content_types: List[str], context: str) -> str:
+        """Prompt por lotes: mismo prefijo del segmento, instrucciones de cada tipo y formato JSON"""
+        instructions = "".join(
+            f"""
+INSTRUCCIONES ESPECÍFICAS PARA {content_type.upper()} (clave "{content_type}"):
+{self._get_content_type_instructions(content_type, segment)}"""
+            for content_type in content_types
+        )
+        keys = ", ".join(f'"{content_type}"' for content_type in content_types)
+        
+        return self._build_segment_prefix(segment) + f"""
+CONTEXTO MÉDICO RELEVANTE:
+{context}
+
+Genera en una sola respuesta los siguientes contenidos:
+{instructions}
+
+FORMATO DE RESPUESTA: un objeto JSON con exactamente las claves {keys}. El valor de cada clave es el texto completo de ese contenido, respetando su formato y longitud. No incluyas nada fuera del JSON.
+
+Genera el contenido ahora:
+"""
+    
+    def _warm_up(self) -> Optional[Dict[str, Any]]:
+        """Precarga el modelo con el num_ctx de la ejecución y fija keep_alive"""
+        try:
+            warmup = self.ollama_client.warm_up(
+                self.model,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                options={"num_ctx": OLLAMA_NUM_CTX}
+            )
+        except OllamaError as e:
+            logger.error(f"No se pudo precargar {self.model}: {e}")
+            return None
+        
+        if warmup["already_loaded"]:
+            logger.info(f"✓ {self.model} ya estaba cargado ({warmup['cold_start_seconds']}s)")
+        else:
+            logger.info(
+                f"✓ {self.model} precargado: arranque en frío {warmup['cold_start_seconds']}s "
+                f"(carga {warmup['load_seconds']}s), keep_alive {warmup['keep_alive']}"
+            )
+        if not warmup["ready"]:
+            logger.warning(f"{self.model} no aparece en /api/ps tras la precarga")
+        return warmup
+    
+    def _release_model(self):
+        """Devuelve el modelo al keep_alive normal al terminar una ejecución con precarga"""
+        if self.ollama_client.keep_alive is None:
+            return
+        # Mismo num_ctx que la precarga: con otro, Ollama recargaría el modelo solo para liberarlo
+        if self.ollama_client.release_model(
+            self.model, keep_alive=OLLAMA_IDLE_KEEP_ALIVE, options={"num_ctx": OLLAMA_NUM_CTX}
+        ):
+            logger.info(f"{self.model} devuelto a keep_alive {OLLAMA_IDLE_KEEP_ALIVE}")
+    
+    def _build_content_record(
+        self,
+        segment: ExpandedSegment,
+        content_type: str,
+        content: str,
+        generation_metrics: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Registro exportado para una pieza de contenido"""
+        record = {
+            "segment_id": segment.id,
+            "segment_name": segment.name,
+            "segment_category": segment.category,
+            "segment_phase": segment.phase,
+            "content_type": content_type,
+            "content_priority": self._get_content_priority(segment, content_type),
+            "content": content,
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "segment_metadata": self.segment_db.get_segment_metadata(segment.id)
+        }
+        fingerprint = self._pair_fingerprint(segment, content_type)
+        record["fingerprint"] = fingerprint.digest
+        record["fingerprint_parts"] = fingerprint.to_dict()
+        if generation_metrics is not None:
+            record["generation_metrics"] = generation_metrics
+        return record
+    
     def _generate_statistics(self, generated_content: List[Dict]) -> Dict[str, Any]:
         """Genera estadísticas del contenido generado"""
         stats = {
@@ -489,4 +1546,22 @@ FORMATO: Información práctica sobre la relación entre estrés, cortisol y tu
             else:
                 stats["priority_distribution"]["low"] += 1
         
+        # Métricas de Ollama: por ejecución, por segmento y por tipo de contenido
+        by_segment_metrics: Dict[str, List[Dict]] = {}
+        by_content_type_metrics: Dict[str, List[Dict]] = {}
+        all_metrics = []
+        for content in generated_content:
+            metrics = content.get("generation_metrics")
+            if metrics is None:
+                continue
+            all_metrics.append(metrics)
+            by_segment_metrics.setdefault(content["segment_id"], []).append(metrics)
+            by_content_type_metrics.setdefault(content["content_type"], []).append(metrics)
+        
+        stats["generation"] = {
+            "run": summarize_generation_metrics(all_metrics),
+            "by_segment": {key: summarize_generation_metrics(values) for key, values in by_segment_metrics.items()},
+            "by_content_type": {key: summarize_generation_metrics(values) for key, values in by_content_type_metrics.items()}
+        }
+        
         return stats
\ No newline at end of file
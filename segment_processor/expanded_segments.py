@@ -5,6 +5,26 @@ from dataclasses import dataclass
 import json
 from pathlib import Path
 
+# Tipos de contenido generados para cada segmento
+CONTENT_TYPES = [
+    "lesson_3min",
+    "whats_happening",
+    "nutrition_guide",
+    "cycle_day_info",
+    "hormone_levels",
+    "stress_levels"
+]
+
+# Presupuesto de tokens de contexto RAG por tipo de contenido
+CONTEXT_TOKEN_BUDGETS = {
+    "lesson_3min": 1200,
+    "whats_happening": 400,
+    "nutrition_guide": 900,
+    "cycle_day_info": 600,
+    "hormone_levels": 900,
+    "stress_levels": 800
+}
+
 @dataclass
 class Demographics:
     age_groups: List[str]
@@ -733,7 +753,8 @@ class ExpandedSegmentDatabase:
                     "include_practical_tips": True,
                     "avoid_medical_diagnosis": True,
                     "tone": segment.content_preferences.tone,
-                    "urgency": segment.content_preferences.urgency
+                    "urgency": segment.content_preferences.urgency,
+                    "context_token_budget": dict(CONTEXT_TOKEN_BUDGETS)
                 }
             }
         }
@@ -0,0 +1,95 @@
+# segment_processor/fingerprints.py
+
+import json
+import hashlib
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from segment_processor.expanded_segments import ExpandedSegment
+
+logger = logging.getLogger(__name__)
+
+# Versión de las plantillas de prompt (prefijo, instrucciones por tipo, mensaje de sistema):
+# súbela al cambiarlas para que --action regenerate rehaga todas las piezas
+PROMPT_TEMPLATE_VERSION = "3"
+
+FINGERPRINT_PARTS = ("segment", "template", "model", "retrieval")
+
+PairKey = Tuple[str, str]
+
+
+def _digest(payload: Any) -> str:
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def segment_digest(segment: ExpandedSegment, generation_rules: Optional[Dict[str, Any]] = None) -> str:
+    """Huella estable de la definición del segmento (dataclass completa y reglas de generación)"""
+    return _digest({"segment": asdict(segment), "rules": generation_rules or {}})
+
+
+def text_digest(text: str) -> str:
+    return _digest(text or "")
+
+
+@dataclass(frozen=True)
+class PairFingerprint:
+    """Huella de un par (segmento, tipo de contenido): si no cambia, la pieza exportada sigue siendo válida"""
+    segment: str
+    template: str
+    model: str
+    retrieval: str
+
+    @property
+    def digest(self) -> str:
+        return _digest(self.to_dict())
+
+    def to_dict(self) -> Dict[str, str]:
+        return {part: getattr(self, part) for part in FINGERPRINT_PARTS}
+
+    def changed_parts(self, previous: Optional[Dict[str, str]]) -> List[str]:
+        """Partes que difieren de una huella exportada; ["new"] si no había huella"""
+        if not previous:
+            return ["new"]
+        return [part for part in FINGERPRINT_PARTS if previous.get(part) != getattr(self, part)]
+
+
+def load_export(export_path: Path) -> List[Dict[str, Any]]:
+    with open(export_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest_export(exports_dir: Path = Path("data/exports")) -> Optional[Path]:
+    """Exportación final más reciente (expanded_content_<run_id>.json)"""
+    # Solo expanded_content_<dígitos>.json: no la cola de reintentos ni las métricas de la ejecución
+    exports = [path for path in exports_dir.glob("expanded_content_*.json") if path.stem[len("expanded_content_"):].isdigit()]
+    return max(exports, key=lambda path: int(path.stem[len("expanded_content_"):]), default=None)
+
+
+def fingerprint_diff(
+    current: Dict[PairKey, PairFingerprint],
+    records: List[Dict[str, Any]]
+) -> Tuple[Dict[PairKey, List[str]], List[PairKey]]:
+    """
+    Compara las huellas actuales con las de una exportación.
+    Devuelve los pares a regenerar con las partes que cambiaron y los pares
+    exportados que ya no existen (segmento o tipo de contenido eliminado)
+    """
+    previous = {
+        (record["segment_id"], record["content_type"]): record.get("fingerprint_parts")
+        for record in records
+    }
+    changed = {}
+    for key, fingerprint in current.items():
+        parts = fingerprint.changed_parts(previous.get(key))
+        if parts:
+            changed[key] = parts
+    removed = [key for key in previous if key not in current]
+
+    logger.info(
+        f"Huellas: {len(changed)} de {len(current)} pares cambiaron, "
+        f"{len(removed)} pares exportados ya no existen"
+    )
+    return changed, removed
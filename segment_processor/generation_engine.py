@@ -0,0 +1,199 @@
+# segment_processor/generation_engine.py
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional
+
+from retrieval.context_packer import estimate_tokens
+from content_generator.adaptive_concurrency import AIMDConcurrencyLimit
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GenerationTask:
+    """Una combinación (segmento, tipo de contenido) a generar"""
+    index: int
+    segment_id: str
+    content_type: str
+    priority: float = 0.0
+    deferred: bool = False
+
+
+@dataclass
+class GenerationOutcome:
+    """Resultado de una tarea de generación"""
+    task: GenerationTask
+    content: Optional[str]
+    elapsed: float
+    output_tokens: int = 0
+    error: Optional[str] = None
+    # No se llegó a ejecutar: "time_budget" (presupuesto agotado) o
+    # "insufficient_time" (no habría terminado antes del límite)
+    skipped: bool = False
+    skip_reason: Optional[str] = None
+
+
+class ConcurrentGenerationEngine:
+    """
+    Ejecuta tareas de generación en paralelo con un límite de solicitudes en vuelo
+    y devuelve los resultados en el orden original de las tareas
+    """
+
+    def __init__(
+        self,
+        generate_fn: Callable[[GenerationTask], Optional[str]],
+        max_in_flight: int = 4,
+        progress_every: int = 10,
+        on_outcome: Optional[Callable[[GenerationOutcome], None]] = None,
+        estimate: Optional[Callable[[GenerationTask], Optional[float]]] = None,
+        concurrency: Optional[AIMDConcurrencyLimit] = None
+    ):
+        self.generate_fn = generate_fn
+        # Se invoca desde el hilo de trabajo en cuanto termina cada tarea (p. ej. para escribir el diario)
+        self.on_outcome = on_outcome
+        # Duración esperada de una tarea (None si aún no se sabe); con deadline, no se
+        # inicia una tarea que no terminaría a tiempo
+        self.estimate = estimate
+        # Con concurrency, max_in_flight es el techo y el límite efectivo lo ajusta AIMD
+        self.concurrency = concurrency
+        self.max_in_flight = max(1, max_in_flight)
+        self.progress_every = max(1, progress_every)
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._output_tokens = 0
+        self._start = 0.0
+        self._deadline: Optional[float] = None
+        self._deadline_logged = False
+        self._insufficient_logged = False
+
+    def run(
+        self,
+        tasks: List[GenerationTask],
+        group_key: Optional[Callable[[GenerationTask], Hashable]] = None,
+        deadline: Optional[float] = None
+    ) -> List[GenerationOutcome]:
+        """
+        Ejecuta todas las tareas y devuelve los resultados ordenados por task.index.
+
+        Con group_key, las tareas de un mismo grupo (p. ej. los tipos de contenido
+        de un segmento) se ejecutan seguidas en el mismo hilo, para que Ollama
+        reutilice el prefijo común del prompt. Las tareas se despachan en el orden
+        recibido; a partir de deadline (time.monotonic) ya no se inicia ninguna,
+        ni tampoco antes las que según estimate no terminarían a tiempo
+        """
+        self._deadline = deadline
+        self._deadline_logged = False
+        self._insufficient_logged = False
+        self._completed = 0
+        self._output_tokens = 0
+        self._start = time.perf_counter()
+        outcomes: List[GenerationOutcome] = []
+
+        if group_key:
+            groups: Dict[Hashable, List[GenerationTask]] = {}
+            for task in tasks:
+                groups.setdefault(group_key(task), []).append(task)
+            units = list(groups.values())
+        else:
+            units = [[task] for task in tasks]
+
+        logger.info(
+            f"Generación concurrente: {len(tasks)} tareas en {len(units)} grupos, "
+            f"máximo {self.max_in_flight} en vuelo"
+            + (f" (adaptativo, ahora {self.concurrency.limit})" if self.concurrency else "")
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="generation") as executor:
+            futures = [executor.submit(self._run_unit, unit, len(tasks)) for unit in units]
+            for future in as_completed(futures):
+                outcomes.extend(future.result())
+
+        outcomes.sort(key=lambda outcome: outcome.task.index)
+        return outcomes
+
+    def _run_unit(self, unit: List[GenerationTask], total: int) -> List[GenerationOutcome]:
+        """Ejecuta las tareas de un grupo una tras otra"""
+        outcomes = []
+        for task in unit:
+            skip_reason = "time_budget" if self._deadline_reached() else self._insufficient_time(task)
+            if skip_reason:
+                outcomes.append(GenerationOutcome(
+                    task=task, content=None, elapsed=0.0, skipped=True, skip_reason=skip_reason
+                ))
+                continue
+            outcome = self._run_task(task)
+            if self.on_outcome:
+                self.on_outcome(outcome)
+            self._report_progress(outcome, total)
+            outcomes.append(outcome)
+        return outcomes
+
+    def _deadline_reached(self) -> bool:
+        if self._deadline is None or time.monotonic() < self._deadline:
+            return False
+        with self._lock:
+            if not self._deadline_logged:
+                self._deadline_logged = True
+                logger.warning("Presupuesto de tiempo agotado: no se inician más tareas")
+        return True
+
+    def _insufficient_time(self, task: GenerationTask) -> Optional[str]:
+        if self._deadline is None or self.estimate is None:
+            return None
+        expected = self.estimate(task)
+        if expected is None or time.monotonic() + expected <= self._deadline:
+            return None
+        with self._lock:
+            if not self._insufficient_logged:
+                self._insufficient_logged = True
+                logger.warning("Tiempo insuficiente antes del límite: se dejan para la próxima ejecución las tareas que no terminarían")
+        return "insufficient_time"
+
+    def _run_task(self, task: GenerationTask) -> GenerationOutcome:
+        if self.concurrency:
+            self.concurrency.acquire()
+        start = time.perf_counter()
+        try:
+            content = self.generate_fn(task)
+            outcome = GenerationOutcome(
+                task=task,
+                content=content,
+                elapsed=time.perf_counter() - start,
+                output_tokens=estimate_tokens(content) if content else 0
+            )
+        except Exception as e:
+            logger.error(f"Error generando {task.content_type} para {task.segment_id}: {e}")
+            outcome = GenerationOutcome(task=task, content=None, elapsed=time.perf_counter() - start, error=str(e))
+        if self.concurrency:
+            self.concurrency.release(task.content_type, outcome.elapsed, ok=bool(outcome.content))
+        return outcome
+
+    def _report_progress(self, outcome: GenerationOutcome, total: int):
+        with self._lock:
+            self._completed += 1
+            self._output_tokens += outcome.output_tokens
+            completed = self._completed
+
+        status = "✓" if outcome.content else "✗"
+        logger.info(f"{status} {completed}/{total} - {outcome.task.segment_id} - {outcome.task.content_type} ({outcome.elapsed:.1f}s)")
+
+        if completed % self.progress_every == 0 or completed == total:
+            throughput = self.throughput()
+            logger.info(
+                f"Progreso: {completed}/{total} - {throughput['requests_per_minute']:.1f} solicitudes/min, "
+                f"{throughput['tokens_per_second']:.1f} tokens/s"
+            )
+
+    def throughput(self) -> Dict[str, float]:
+        """Rendimiento acumulado de la ejecución actual"""
+        elapsed = max(time.perf_counter() - self._start, 1e-9)
+        return {
+            "completed": self._completed,
+            "elapsed_seconds": round(elapsed, 2),
+            "requests_per_minute": self._completed / elapsed * 60,
+            "tokens_per_second": self._output_tokens / elapsed
+        }
@@ -0,0 +1,99 @@
+# segment_processor/generation_journal.py
+
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def write_export(export_path: Path, records: List[Dict[str, Any]]):
+    """Escribe una exportación JSON de forma atómica (tmp + fsync + replace)"""
+    export_path = Path(export_path)
+    export_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = export_path.with_suffix(export_path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(export_path)
+
+
+class GenerationJournal:
+    """
+    Diario JSONL de solo-anexar: cada pieza generada se escribe al terminar,
+    con fsync periódico, para poder reanudar una ejecución interrumpida
+    """
+
+    def __init__(self, path: Path, fsync_every: int = 10):
+        self.path = Path(path)
+        self.fsync_every = max(1, fsync_every)
+        self._lock = threading.Lock()
+        self._pending_sync = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        # Si la ejecución anterior se cortó a mitad de línea, cerrarla antes de anexar
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            self._file.write("\n")
+            self._file.flush()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def append(self, record: Dict[str, Any]):
+        """Agrega un registro; hace fsync cada fsync_every registros"""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._pending_sync += 1
+            if self._pending_sync >= self.fsync_every:
+                os.fsync(self._file.fileno())
+                self._pending_sync = 0
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Lee el diario; si un par aparece varias veces gana el último registro.
+        Ignora una última línea truncada por una caída
+        """
+        if not self.path.exists():
+            return []
+
+        by_key: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Línea {line_number} del diario ilegible; se ignora")
+                    continue
+                by_key[(record["segment_id"], record["content_type"])] = record
+
+        return list(by_key.values())
+
+    def completed_keys(self) -> Set[Tuple[str, str]]:
+        """Pares (segment_id, content_type) ya generados"""
+        return {(record["segment_id"], record["content_type"]) for record in self.records()}
+
+    def compact(self, export_path: Path, order_key: Optional[Callable[[Dict[str, Any]], Any]] = None) -> List[Dict[str, Any]]:
+        """Escribe la exportación consolidada (JSON) de forma atómica y devuelve los registros"""
+        records = self.records()
+        if order_key:
+            records.sort(key=order_key)
+        write_export(export_path, records)
+        return records
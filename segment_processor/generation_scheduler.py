@@ -0,0 +1,94 @@
+# segment_processor/generation_scheduler.py
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Tuple
+
+from segment_processor.expanded_segments import ExpandedSegment
+from segment_processor.generation_engine import GenerationTask
+
+logger = logging.getLogger(__name__)
+
+# Peso de la urgencia del segmento en la prioridad de sus piezas
+URGENCY_WEIGHTS = {
+    "muy_alta": 1.0,
+    "alta": 0.9,
+    "moderada": 0.75,
+    "baja": 0.6
+}
+DEFAULT_URGENCY_WEIGHT = 0.75
+
+
+def content_priority(segment: ExpandedSegment, content_type: str) -> float:
+    """Prioridad del tipo de contenido según RecommendedContentTypes (0 si no está)"""
+    return getattr(segment.recommended_content_types, content_type, 0.0)
+
+
+def task_score(segment: ExpandedSegment, content_type: str) -> float:
+    """Valor de una pieza: prioridad del tipo de contenido × urgencia del segmento"""
+    urgency = URGENCY_WEIGHTS.get(segment.content_preferences.urgency, DEFAULT_URGENCY_WEIGHT)
+    return round(content_priority(segment, content_type) * urgency, 4)
+
+
+@dataclass
+class GenerationPlan:
+    """Tareas ordenadas por valor y combinaciones excluidas"""
+    tasks: List[GenerationTask] = field(default_factory=list)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def deferred(self) -> List[GenerationTask]:
+        return [task for task in self.tasks if task.deferred]
+
+
+class PriorityScheduler:
+    """
+    Ordena las combinaciones (segmento, tipo de contenido) de mayor a menor valor.
+
+    Las de prioridad menor que skip_below no se generan; las menores que
+    defer_below se dejan para el final, después de todo lo importante
+    """
+
+    def __init__(self, skip_below: float = 0.0, defer_below: float = 0.5):
+        self.skip_below = skip_below
+        self.defer_below = defer_below
+
+    def plan(
+        self,
+        segments: Dict[str, ExpandedSegment],
+        content_types: Iterable[str],
+        completed_keys: Set[Tuple[str, str]] = frozenset()
+    ) -> GenerationPlan:
+        plan = GenerationPlan()
+        scored = []
+        for segment_id, segment in segments.items():
+            for content_type in content_types:
+                if (segment_id, content_type) in completed_keys:
+                    continue
+                if content_priority(segment, content_type) < self.skip_below:
+                    plan.skipped.append((segment_id, content_type))
+                    continue
+                scored.append((segment_id, content_type, task_score(segment, content_type),
+                               content_priority(segment, content_type) < self.defer_below))
+
+        # Un segmento se ordena por su pieza más valiosa y sus piezas van juntas (afinidad de prefijo);
+        # las diferidas se agrupan aparte al final
+        best: Dict[Tuple[str, bool], float] = {}
+        for segment_id, _, score, deferred in scored:
+            best[(segment_id, deferred)] = max(best.get((segment_id, deferred), 0.0), score)
+        scored.sort(key=lambda item: (item[3], -best[(item[0], item[3])], item[0], -item[2]))
+
+        for segment_id, content_type, score, deferred in scored:
+            plan.tasks.append(GenerationTask(
+                index=len(plan.tasks),
+                segment_id=segment_id,
+                content_type=content_type,
+                priority=score,
+                deferred=deferred
+            ))
+
+        logger.info(
+            f"Plan de generación: {len(plan.tasks)} piezas "
+            f"({len(plan.deferred)} diferidas, {len(plan.skipped)} omitidas por prioridad baja)"
+        )
+        return plan
@@ -0,0 +1,90 @@
+# segment_processor/prompt_dedup.py
+
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from segment_processor.generation_engine import GenerationTask
+
+logger = logging.getLogger(__name__)
+
+TaskKey = Tuple[str, str]
+
+
+def equivalence_key(signature: Dict[str, Any]) -> str:
+    """
+    Dos tareas son equivalentes si coinciden en los campos de los que depende su
+    contenido (sin id ni nombre del segmento) y en las opciones de Ollama
+    """
+    payload = json.dumps(signature, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PromptDedupPlan:
+    """Tareas que se generan (una por grupo) y a qué otras tareas se replica cada resultado"""
+    leaders: List[GenerationTask] = field(default_factory=list)
+    followers: Dict[TaskKey, List[TaskKey]] = field(default_factory=dict)
+    # Prompt común de los grupos con más de un miembro
+    prompts: Dict[TaskKey, str] = field(default_factory=dict)
+    total_tasks: int = 0
+
+    @property
+    def calls_saved(self) -> int:
+        return sum(len(members) for members in self.followers.values())
+
+    def members(self, key: TaskKey) -> List[TaskKey]:
+        return self.followers.get(key, [])
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "tasks": self.total_tasks,
+            "groups": len(self.leaders),
+            "calls_saved": self.calls_saved
+        }
+
+
+def plan_prompt_dedup(
+    tasks: List[GenerationTask],
+    signature: Callable[[GenerationTask], Dict[str, Any]],
+    render: Optional[Callable[[GenerationTask, List[TaskKey]], str]] = None
+) -> PromptDedupPlan:
+    """
+    Agrupa las tareas equivalentes según signature y conserva solo la primera de
+    cada grupo (el orden de prioridad se mantiene). Con render, el prompt de un
+    grupo se construye una vez conocidos todos sus miembros
+    """
+    plan = PromptDedupPlan(total_tasks=len(tasks))
+    leader_by_group: Dict[str, TaskKey] = {}
+
+    for task in tasks:
+        key = (task.segment_id, task.content_type)
+        group = equivalence_key(signature(task))
+
+        leader = leader_by_group.get(group)
+        if leader is not None:
+            plan.followers.setdefault(leader, []).append(key)
+            continue
+
+        leader_by_group[group] = key
+        plan.leaders.append(GenerationTask(
+            index=len(plan.leaders),
+            segment_id=task.segment_id,
+            content_type=task.content_type,
+            priority=task.priority,
+            deferred=task.deferred
+        ))
+
+    if render:
+        for leader in plan.leaders:
+            key = (leader.segment_id, leader.content_type)
+            if plan.members(key):
+                plan.prompts[key] = render(leader, plan.members(key))
+
+    logger.info(
+        f"Deduplicación de prompts: {len(tasks)} tareas en {len(plan.leaders)} grupos, "
+        f"{plan.calls_saved} llamadas ahorradas"
+    )
+    return plan
@@ -0,0 +1,295 @@
+# segment_processor/work_queue.py
+
+import json
+import time
+import sqlite3
+import logging
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from segment_processor.generation_engine import GenerationTask
+from segment_processor.generation_journal import write_export
+
+logger = logging.getLogger(__name__)
+
+PairKey = Tuple[str, str]
+
+
+class GenerationWorkQueue:
+    """
+    Cola de trabajo persistente (SQLite) de pares (segmento, tipo de contenido)
+    para repartir una ejecución masiva entre varios procesos o nodos.
+
+    Un worker reclama tareas con un lease (segundos de reloj de pared) y lo
+    renueva con heartbeats mientras las genera; si el worker muere, el lease
+    vence y las tareas vuelven a pending para que las reclame otro. Una tarea
+    que falla max_attempts veces queda en failed. Los nodos deben tener el
+    reloj sincronizado (NTP), y en sistemas de archivos de red conviene
+    desactivar WAL (wal=False)
+    """
+
+    def __init__(self, db_path: Path, wal: bool = True):
+        self.db_path = Path(db_path)
+        self.wal = wal
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.execute(f"PRAGMA journal_mode={'WAL' if self.wal else 'DELETE'}")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                exported_at REAL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                run_id TEXT NOT NULL,
+                segment_id TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                priority REAL NOT NULL,
+                deferred INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                record TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, segment_id, content_type)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (run_id, status)")
+        return conn
+
+    def enqueue(self, run_id: str, tasks: List[GenerationTask], order: Dict[PairKey, int]) -> int:
+        """Registra una ejecución con sus tareas (idempotente); order es la posición canónica en la exportación"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, total, created_at) VALUES (?, 0, ?)",
+                (run_id, now)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (run_id, segment_id, content_type, position, priority, deferred, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, task.segment_id, task.content_type,
+                     order.get((task.segment_id, task.content_type), len(order)),
+                     task.priority, int(task.deferred), now)
+                    for task in tasks
+                ]
+            )
+            total = conn.execute("SELECT COUNT(*) FROM tasks WHERE run_id = ?", (run_id,)).fetchone()[0]
+            conn.execute("UPDATE runs SET total = ? WHERE run_id = ?", (total, run_id))
+            conn.execute("COMMIT")
+        return total
+
+    def latest_run(self) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT run_id FROM runs ORDER BY created_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def _requeue_expired(self, conn: sqlite3.Connection, run_id: str, now: float, max_attempts: int) -> int:
+        # Como en fail(): una tarea que ya agotó sus intentos (p. ej. tumba a su worker) queda en failed
+        cursor = conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires = NULL, "
+            "error = CASE WHEN attempts >= ? THEN 'lease vencido' ELSE error END, updated_at = ? "
+            "WHERE run_id = ? AND status = 'leased' AND lease_expires < ?",
+            (max_attempts, max_attempts, now, run_id, now)
+        )
+        if cursor.rowcount:
+            logger.warning(f"{cursor.rowcount} tareas con lease vencido vuelven a la cola o quedan fallidas")
+        return cursor.rowcount
+
+    def claim(
+        self,
+        run_id: str,
+        worker: str,
+        limit: int,
+        lease_seconds: float,
+        max_attempts: int
+    ) -> List[GenerationTask]:
+        """
+        Reclama hasta limit tareas pendientes, de mayor a menor prioridad. Se toman
+        segmentos completos (afinidad de prefijo y lotes), así que pueden salir
+        algunas más de limit
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._requeue_expired(conn, run_id, now, max_attempts)
+            # Primero los segmentos (por su pieza más valiosa) hasta cubrir limit; después
+            # todas sus piezas pendientes, para no dejar a medias un segmento ya elegido
+            groups = conn.execute(
+                "SELECT segment_id, deferred, COUNT(*) FROM tasks "
+                "WHERE run_id = ? AND status = 'pending' GROUP BY segment_id, deferred "
+                "ORDER BY deferred, MAX(priority) DESC, MIN(position)",
+                (run_id,)
+            ).fetchall()
+
+            segments: List[Tuple[str, int]] = []
+            count = 0
+            for segment_id, deferred, pending in groups:
+                if count >= limit:
+                    break
+                segments.append((segment_id, deferred))
+                count += pending
+
+            claimed = []
+            for segment_id, deferred in segments:
+                claimed.extend(conn.execute(
+                    "SELECT segment_id, content_type, priority, deferred FROM tasks "
+                    "WHERE run_id = ? AND status = 'pending' AND segment_id = ? AND deferred = ? "
+                    "ORDER BY priority DESC, position",
+                    (run_id, segment_id, deferred)
+                ).fetchall())
+
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE run_id = ? AND segment_id = ? AND content_type = ?",
+                [(worker, now + lease_seconds, now, run_id, row[0], row[1]) for row in claimed]
+            )
+            conn.execute("COMMIT")
+
+        return [
+            GenerationTask(index=i, segment_id=row[0], content_type=row[1], priority=row[2], deferred=bool(row[3]))
+            for i, row in enumerate(claimed)
+        ]
+
+    def heartbeat(self, run_id: str, worker: str, lease_seconds: float) -> int:
+        """Renueva los leases de todas las tareas que tiene el worker"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE run_id = ? AND worker = ? AND status = 'leased'",
+                (now + lease_seconds, now, run_id, worker)
+            )
+            return cursor.rowcount
+
+    def complete(self, run_id: str, key: PairKey, worker: str, record: Dict[str, Any]):
+        """Marca la tarea como hecha con su registro exportable (aunque su lease ya hubiera vencido)"""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'done', worker = ?, lease_expires = NULL, record = ?, error = NULL, updated_at = ? "
+                "WHERE run_id = ? AND segment_id = ? AND content_type = ? AND status != 'done'",
+                (worker, json.dumps(record, ensure_ascii=False), time.time(), run_id, key[0], key[1])
+            )
+
+    def fail(self, run_id: str, key: PairKey, worker: str, error: str, max_attempts: int):
+        """Devuelve la tarea a la cola, o la da por fallida tras max_attempts intentos"""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+                "WHERE run_id = ? AND segment_id = ? AND content_type = ? AND worker = ? AND status = 'leased'",
+                (max_attempts, error, time.time(), run_id, key[0], key[1], worker)
+            )
+
+    def release(self, run_id: str, worker: str) -> int:
+        """Devuelve a la cola, sin contar el intento, las tareas que el worker no llegó a empezar"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ? "
+                "WHERE run_id = ? AND worker = ? AND status = 'leased'",
+                (time.time(), run_id, worker)
+            )
+            return cursor.rowcount
+
+    def progress(self, run_id: str) -> Dict[str, Any]:
+        """Tareas por estado y, por worker, piezas hechas y leases activos"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            run = conn.execute("SELECT total, created_at, exported_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None:
+                return {}
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall())
+            workers: Dict[str, Dict[str, int]] = {}
+            for worker, status, count in conn.execute(
+                "SELECT worker, status, COUNT(*) FROM tasks WHERE run_id = ? AND worker IS NOT NULL "
+                "GROUP BY worker, status", (run_id,)
+            ):
+                workers.setdefault(worker, {})[status] = count
+            expired = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE run_id = ? AND status = 'leased' AND lease_expires < ?",
+                (run_id, now)
+            ).fetchone()[0]
+
+        done = counts.get("done", 0)
+        elapsed = now - run[1]
+        return {
+            "run_id": run_id,
+            "total": run[0],
+            "pending": counts.get("pending", 0),
+            "leased": counts.get("leased", 0),
+            "expired_leases": expired,
+            "done": done,
+            "failed": counts.get("failed", 0),
+            "finished": counts.get("pending", 0) + counts.get("leased", 0) == 0,
+            "exported": run[2] is not None,
+            "elapsed_seconds": round(elapsed, 1),
+            "pieces_per_minute": round(done / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "workers": workers
+        }
+
+    def records(self, run_id: str) -> List[Dict[str, Any]]:
+        """Registros generados, en el orden canónico de la exportación"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT record FROM tasks WHERE run_id = ? AND status = 'done' ORDER BY position",
+                (run_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def failed_tasks(self, run_id: str) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT segment_id, content_type, priority, attempts, error FROM tasks "
+                "WHERE run_id = ? AND status = 'failed' ORDER BY position",
+                (run_id,)
+            ).fetchall()
+        return [
+            {"segment_id": row[0], "content_type": row[1], "priority": row[2], "attempts": row[3], "error": row[4]}
+            for row in rows
+        ]
+
+    def compact(self, run_id: str, export_path: Path, force: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Escribe la exportación final (JSON, atómica) cuando no quedan tareas pendientes
+        ni en curso, o con force lo generado hasta ahora. Las fallidas van a la cola de
+        reintentos junto a la exportación. Devuelve los registros (None si aún no toca)
+        """
+        progress = self.progress(run_id)
+        if not progress or not (progress["finished"] or force):
+            return None
+        records = self.records(run_id)
+        if not records:
+            logger.error(f"La ejecución {run_id} no tiene piezas generadas")
+            return None
+
+        export_path = Path(export_path)
+        write_export(export_path, records)
+
+        failed = self.failed_tasks(run_id)
+        if failed:
+            retry_queue_path = export_path.parent / f"expanded_content_retry_{run_id}.json"
+            with open(retry_queue_path, "w", encoding="utf-8") as f:
+                json.dump([{**task, "reason": "failed"} for task in failed], f, ensure_ascii=False, indent=2)
+            logger.warning(f"{len(failed)} piezas fallidas tras agotar sus intentos: {retry_queue_path}")
+
+        if progress["finished"]:
+            with closing(self._connect()) as conn:
+                conn.execute("UPDATE runs SET exported_at = ? WHERE run_id = ?", (time.time(), run_id))
+        logger.info(f"✓ {len(records)} piezas de la ejecución {run_id} exportadas a: {export_path}")
+        return records
@@ -0,0 +1,15 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Los módulos de generación escriben su log en logs/ relativo al directorio de trabajo:
+# las pruebas se ejecutan en uno temporal para no dejar archivos en el repositorio
+_workdir = Path(tempfile.mkdtemp(prefix="maura-tests-"))
+(_workdir / "logs").mkdir()
+os.chdir(_workdir)
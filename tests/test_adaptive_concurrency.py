@@ -0,0 +1,36 @@
+# tests/test_adaptive_concurrency.py
+
+import random
+
+from content_generator.adaptive_concurrency import AIMDConcurrencyLimit
+
+
+def _drive(limit: AIMDConcurrencyLimit, latency, calls: int = 1000):
+    for _ in range(calls):
+        limit.acquire()
+        limit.release("lesson_3min", latency(limit.limit), ok=True)
+
+
+def test_stable_noisy_latency_keeps_the_limit():
+    for seed in range(10):
+        rng = random.Random(seed)
+        limit = AIMDConcurrencyLimit(maximum=8, initial=2)
+
+        # Latencia estable con ruido lognormal (σ=0.2): ninguna sobrecarga
+        _drive(limit, lambda _: 10.0 * rng.lognormvariate(0, 0.2))
+
+        summary = limit.summary()
+        assert summary["decreases"] <= 1
+        assert summary["final"] == 8
+
+
+def test_sustained_slowdown_backs_off():
+    rng = random.Random(7)
+    limit = AIMDConcurrencyLimit(maximum=16, initial=2)
+
+    # Ollama atiende 4 solicitudes a la vez: por encima, la latencia crece con la cola
+    _drive(limit, lambda current: 10.0 * max(1.0, current / 4) * rng.lognormvariate(0, 0.2))
+
+    summary = limit.summary()
+    assert summary["decreases"] > 0
+    assert summary["final"] <= 8
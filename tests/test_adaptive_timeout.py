@@ -0,0 +1,29 @@
+# tests/test_adaptive_timeout.py
+
+from content_generator.adaptive_timeout import AdaptiveTimeout
+
+
+def _warm(timeouts: AdaptiveTimeout, key: str, seconds: float, count: int):
+    for _ in range(count):
+        timeouts.record(key, seconds)
+
+
+def test_timed_out_call_widens_the_timeout():
+    timeouts = AdaptiveTimeout(default=300, minimum=1, multiplier=2, min_samples=4)
+    _warm(timeouts, "lesson", 5.0, 20)
+    assert timeouts.timeout("lesson") == 10.0
+
+    timeouts.record_timeout("lesson", 10.0)
+
+    assert timeouts.timeout("lesson") == 20.0
+
+
+def test_widened_timeout_is_withdrawn_after_successful_calls():
+    timeouts = AdaptiveTimeout(default=300, minimum=1, multiplier=2, min_samples=4)
+    _warm(timeouts, "lesson", 5.0, 20)
+    timeouts.record_timeout("lesson", 10.0)
+
+    _warm(timeouts, "lesson", 5.0, 4)
+
+    # Solo queda la muestra censurada en la ventana: p99 × multiplier
+    assert timeouts.timeout("lesson") < 20.0
@@ -0,0 +1,94 @@
+# tests/test_backend_pool.py
+
+import asyncio
+
+import pytest
+
+from content_generator.backend_pool import BackendPool
+
+
+class FakeClient:
+    def __init__(self, base_url, healthy=True):
+        self.base_url = base_url
+        self.healthy = healthy
+
+    async def test_connection(self):
+        return self.healthy
+
+    async def aclose(self):
+        pass
+
+
+def _pool(**kwargs) -> BackendPool:
+    return BackendPool([FakeClient("http://a"), FakeClient("http://b")], health_interval=0, **kwargs)
+
+
+def test_least_in_flight_spreads_and_respects_per_backend_limit():
+    async def scenario():
+        pool = _pool(max_in_flight=2)
+        acquired = [await pool.acquire() for _ in range(4)]
+        assert sorted(backend.url for backend in acquired) == ["http://a", "http://a", "http://b", "http://b"]
+
+        # Todos llenos: la quinta espera hasta que se libere un hueco
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await pool.release(acquired[1], elapsed=0.1)
+        assert (await asyncio.wait_for(waiter, 1)) is acquired[1]
+
+    asyncio.run(scenario())
+
+
+def test_affinity_pins_a_key_to_one_backend():
+    async def scenario():
+        pool = _pool(max_in_flight=4)
+        first = await pool.acquire(affinity="seg_1")
+        other = await pool.acquire()
+        assert other is not first
+        # Con hueco en ambos, seg_1 vuelve a su backend aunque tenga más carga
+        assert (await pool.acquire(affinity="seg_1")) is first
+
+    asyncio.run(scenario())
+
+
+def test_failures_eject_and_health_check_readmits():
+    async def scenario():
+        pool = _pool(eject_after=2)
+        broken = pool.backends[0]
+
+        async def fail(client):
+            raise ConnectionError("caído")
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await pool.call(fail, affinity="seg_1")
+        # La afinidad mantiene seg_1 en el mismo backend hasta expulsarlo
+        assert not broken.healthy and broken.ejections == 1
+        assert [await pool.acquire() for _ in range(3)] == [pool.backends[1]] * 3
+
+        # Cuando ninguno está sano, acquire falla en vez de esperar
+        broken.client.healthy = False
+        pool.backends[1].client.healthy = False
+        assert await pool.check_health() is False
+        with pytest.raises(RuntimeError):
+            await pool.acquire()
+
+        broken.client.healthy = True
+        assert await pool.check_health() is True
+        assert broken.healthy and broken.consecutive_failures == 0
+        assert (await pool.acquire()) is broken
+
+    asyncio.run(scenario())
+
+
+def test_lowest_latency_prefers_the_faster_backend():
+    async def scenario():
+        pool = _pool(routing="lowest_latency")
+        slow, fast = pool.backends
+        slow.record_latency(2.0)
+        fast.record_latency(0.5)
+        assert [await pool.acquire() for _ in range(3)] == [fast, fast, fast]
+        # Con tres en vuelo, el rápido ya espera 4 × 0.5 s, lo mismo que el lento vacío
+        assert (await pool.acquire()) is slow
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+# tests/test_batched_generation.py
+
+import json
+import threading
+
+from content_generator.batched_generation import parse_batch_response
+from segment_processor.expanded_content_generator import ExpandedContentGenerator
+from segment_processor.expanded_segments import ExpandedSegmentDatabase
+from segment_processor.generation_engine import GenerationTask
+
+SEGMENT_ID = "SEG001_FOL_STRESS_CHRONIC"
+BATCH = ("lesson_3min", "whats_happening", "nutrition_guide")
+PIECE = "Contenido suficientemente largo para pasar la validación del esquema."
+
+
+def test_parse_keeps_valid_pieces_and_reports_the_rest():
+    text = json.dumps({"lesson_3min": PIECE, "whats_happening": "corto", "nutrition_guide": 3})
+    assert parse_batch_response(text, list(BATCH)) == ({"lesson_3min": PIECE}, ["whats_happening", "nutrition_guide"])
+
+    # JSON cortado: todas las piezas se regeneran por separado
+    assert parse_batch_response(text[:30], list(BATCH)) == ({}, list(BATCH))
+
+
+class FakeOllamaClient:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return {"response": self.response, "request_seconds": 0.1}
+
+
+def _generator(response) -> ExpandedContentGenerator:
+    generator = object.__new__(ExpandedContentGenerator)
+    generator.segment_db = ExpandedSegmentDatabase()
+    generator.ollama_client = FakeOllamaClient(response)
+    generator.model = "maurallm"
+    generator.chat_api = False
+    generator.generation_cache = None
+    generator.call_timeouts = None
+    generator._run_deadline = None
+    generator._generation_metrics = {}
+    generator._metrics_lock = threading.Lock()
+    generator._batch_plan = {}
+    generator._batch_results = {}
+    generator._batch_locks = {}
+    generator._batches_run = set()
+    generator._batch_lock = threading.Lock()
+    generator.batch_stats = {"batches": 0, "pieces": 0, "fallbacks": 0}
+    generator._get_relevant_context = lambda segment, content_type: f"Pasaje sobre {content_type}."
+
+    generator.individual = []
+
+    def generate_individually(segment_id, content_type, custom_prompt=None):
+        generator.individual.append(content_type)
+        return f"individual {content_type}"
+
+    generator.generate_content_for_expanded_segment = generate_individually
+    return generator
+
+
+def test_only_invalid_batch_pieces_are_generated_individually(monkeypatch):
+    monkeypatch.setattr(
+        "segment_processor.expanded_content_generator.GENERATION_BATCH_MAX_PREDICT", 100000
+    )
+    # La respuesta trae lesson_3min válida, whats_happening demasiado corta y le falta nutrition_guide
+    generator = _generator(json.dumps({"lesson_3min": PIECE, "whats_happening": "corto"}))
+    generator._plan_batches([
+        GenerationTask(index=i, segment_id=SEGMENT_ID, content_type=content_type)
+        for i, content_type in enumerate(BATCH)
+    ])
+    assert generator._batch_plan[(SEGMENT_ID, "lesson_3min")] == BATCH
+
+    results = {content_type: generator._generate_from_batch(SEGMENT_ID, content_type) for content_type in BATCH}
+
+    assert generator.ollama_client.calls == 1
+    assert results == {
+        "lesson_3min": PIECE,
+        "whats_happening": "individual whats_happening",
+        "nutrition_guide": "individual nutrition_guide"
+    }
+    assert generator.individual == ["whats_happening", "nutrition_guide"]
+    assert generator.batch_stats == {"batches": 1, "pieces": 1, "fallbacks": 2}
+    assert generator._generation_metrics[(SEGMENT_ID, "lesson_3min")]["batched"] is True
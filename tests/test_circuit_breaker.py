@@ -0,0 +1,52 @@
+# tests/test_circuit_breaker.py
+
+import threading
+import time
+
+import pytest
+
+from content_generator.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _open_breaker(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=1, **kwargs)
+    breaker.record_failure()
+    return breaker
+
+
+def test_pause_is_shared_by_queued_calls():
+    breaker = _open_breaker(reset_seconds=0.05, max_pause_seconds=0.3, probe=lambda: False)
+    errors = []
+
+    def call():
+        try:
+            breaker.before_call()
+        except CircuitOpenError as exc:
+            errors.append(exc)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 6
+    assert time.monotonic() - start < 0.3 * 2
+
+
+def test_calls_fail_fast_after_pause_until_probe_succeeds():
+    healthy = {"value": False}
+    breaker = _open_breaker(reset_seconds=0.05, max_pause_seconds=0.1, probe=lambda: healthy["value"])
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert time.monotonic() - start < 0.05
+
+    healthy["value"] = True
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,47 @@
+# tests/test_context_packer.py
+
+from retrieval.context_packer import ContextPacker, estimate_tokens
+from retrieval.hybrid_retriever import RetrievedChunk
+
+
+def _chunk(chunk_id: str, content: str, score: float) -> RetrievedChunk:
+    return RetrievedChunk(chunk_id=chunk_id, content=content, score=score)
+
+
+PROGESTERONE = "La progesterona sube después de la ovulación y prepara el endometrio para la implantación."
+ESTROGEN = "El estrógeno domina la fase folicular y favorece la energía y el estado de ánimo."
+
+
+def test_near_duplicates_are_dropped_and_mmr_prefers_diversity():
+    chunks = [
+        _chunk("a", PROGESTERONE, 1.0),
+        _chunk("a_copy", PROGESTERONE + " Fuente: guía clínica.", 0.95),
+        _chunk("a_similar", "La progesterona sube tras la ovulación y prepara el endometrio.", 0.9),
+        _chunk("b", ESTROGEN, 0.85),
+        _chunk("c", "La FSH estimula el crecimiento de los folículos.", 0.1),
+    ]
+
+    packed = ContextPacker(mmr_lambda=0.5).pack(chunks, token_budget=1000, max_passages=2)
+
+    assert packed.chunk_ids == ["a", "b"]
+
+
+def test_packing_respects_the_token_budget_and_cuts_at_sentences():
+    long_passage = " ".join(f"Frase número {i} sobre el ciclo menstrual." for i in range(40))
+    chunks = [_chunk("short", ESTROGEN, 1.0), _chunk("long", long_passage, 0.5)]
+    budget = estimate_tokens(ESTROGEN) + 60
+
+    packed = ContextPacker(min_passage_tokens=10).pack(chunks, token_budget=budget)
+
+    assert packed.chunk_ids == ["short", "long"]
+    assert packed.tokens <= budget
+    assert packed.text.endswith("ciclo menstrual.")
+
+
+def test_remaining_budget_below_minimum_passage_is_left_unused():
+    chunks = [_chunk("short", ESTROGEN, 1.0), _chunk("other", PROGESTERONE, 0.5)]
+    budget = estimate_tokens(ESTROGEN) + 5
+
+    packed = ContextPacker(min_passage_tokens=40).pack(chunks, token_budget=budget)
+
+    assert packed.chunk_ids == ["short"]
@@ -0,0 +1,60 @@
+# tests/test_fingerprints.py
+
+import json
+
+from segment_processor.expanded_content_generator import ExpandedContentGenerator
+from segment_processor.fingerprints import PairFingerprint, latest_export
+
+
+def test_latest_export_ignores_retry_queue(tmp_path):
+    (tmp_path / "expanded_content_1792410914.json").write_text("[]", encoding="utf-8")
+    (tmp_path / "expanded_content_retry_1792410999.json").write_text("[]", encoding="utf-8")
+    (tmp_path / "expanded_content_journal_1792410999.jsonl").write_text("", encoding="utf-8")
+
+    assert latest_export(tmp_path) == tmp_path / "expanded_content_1792410914.json"
+
+
+def test_latest_export_picks_newest_run(tmp_path):
+    for run_id in (1792410914, 1792410920, 179241091):
+        (tmp_path / f"expanded_content_{run_id}.json").write_text("[]", encoding="utf-8")
+
+    assert latest_export(tmp_path) == tmp_path / "expanded_content_1792410920.json"
+
+
+def test_latest_export_without_exports(tmp_path):
+    (tmp_path / "expanded_content_retry_1792410999.json").write_text("[]", encoding="utf-8")
+
+    assert latest_export(tmp_path) is None
+
+
+def test_regenerate_leaves_no_run_files_next_to_the_export(tmp_path, monkeypatch):
+    export_path = tmp_path / "expanded_content_1792410914.json"
+    old = PairFingerprint(segment="s1", template="t", model="m", retrieval="r")
+    export_path.write_text(json.dumps([
+        {"segment_id": "seg", "content_type": "quiz", "content": "antes", "fingerprint_parts": old.to_dict()},
+        {"segment_id": "seg", "content_type": "lesson", "content": "igual", "fingerprint_parts": old.to_dict()}
+    ]), encoding="utf-8")
+
+    generator = object.__new__(ExpandedContentGenerator)
+    generator.segment_db = type("FakeSegmentDatabase", (), {"get_all_segments": lambda self: {"seg": None}})()
+    fingerprints = {"quiz": PairFingerprint(segment="s2", template="t", model="m", retrieval="r"), "lesson": old}
+    generator._pair_fingerprint = lambda segment, content_type: fingerprints[content_type]
+
+    def generate_all(pairs, exports_dir, **kwargs):
+        assert pairs == {("seg", "quiz")}
+        # Una ejecución que además deja diario, cola de reintentos y métricas
+        exports_dir.mkdir(parents=True)
+        for name in ("expanded_content_journal_1.jsonl", "expanded_content_retry_1.json", "expanded_content_metrics_1.json"):
+            (exports_dir / name).write_text("[]", encoding="utf-8")
+        partial = exports_dir / "expanded_content_1.json"
+        partial.write_text(json.dumps([{"segment_id": "seg", "content_type": "quiz", "content": "después"}]), encoding="utf-8")
+        return {"success": True, "export_path": str(partial)}
+
+    generator.generate_content_for_all_expanded_segments = generate_all
+    monkeypatch.setattr("segment_processor.expanded_content_generator.CONTENT_TYPES", ["quiz", "lesson"])
+
+    result = generator.regenerate_changed(previous_export=str(export_path))
+
+    assert result["success"] and result["regenerated"] == 1
+    assert list(tmp_path.iterdir()) == [export_path]
+    assert [r["content"] for r in json.loads(export_path.read_text(encoding="utf-8"))] == ["después", "igual"]
@@ -0,0 +1,76 @@
+# tests/test_generation_cache.py
+
+import threading
+
+from content_generator.generation_cache import GenerationCache, generation_cache_key
+from segment_processor.expanded_content_generator import ExpandedContentGenerator
+
+
+def test_key_changes_with_every_input():
+    base = generation_cache_key("maurallm", "sha256:a", "prompt", {"temperature": 0.7})
+
+    assert base == generation_cache_key("maurallm", "sha256:a", "prompt", {"temperature": 0.7})
+    assert base != generation_cache_key("otro", "sha256:a", "prompt", {"temperature": 0.7})
+    assert base != generation_cache_key("maurallm", "sha256:b", "prompt", {"temperature": 0.7})
+    assert base != generation_cache_key("maurallm", "sha256:a", "prompt 2", {"temperature": 0.7})
+    assert base != generation_cache_key("maurallm", "sha256:a", "prompt", {"temperature": 0.2})
+
+
+def test_hits_survive_a_new_instance_and_are_summarized(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    GenerationCache(path).put("k", "maurallm", "contenido", 12.5)
+    # Un contenido vacío no se guarda
+    GenerationCache(path).put("vacio", "maurallm", "", 3.0)
+
+    cache = GenerationCache(path)
+    assert cache.get("k") == "contenido"
+    assert cache.get("vacio") is None
+
+    assert cache.summary() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "seconds_saved": 12.5}
+
+
+class FakeOllamaClient:
+    def __init__(self):
+        self.calls = 0
+
+    def model_digest(self, model):
+        return "sha256:modelo"
+
+
+def _generator(tmp_path, force_regenerate=False) -> ExpandedContentGenerator:
+    generator = object.__new__(ExpandedContentGenerator)
+    generator.model = "maurallm"
+    generator.chat_api = False
+    generator.ollama_client = FakeOllamaClient()
+    generator.generation_cache = GenerationCache(tmp_path / "cache.sqlite")
+    generator.force_regenerate = force_regenerate
+    generator._modelfile_digest = None
+    generator._digest_lock = threading.Lock()
+    generator._generation_metrics = {}
+    generator._metrics_lock = threading.Lock()
+
+    def call_ollama(prompt, segment_id, content_type, options):
+        generator.ollama_client.calls += 1
+        return f"respuesta {generator.ollama_client.calls}", {"eval_count": 10}
+
+    generator._call_ollama = call_ollama
+    return generator
+
+
+def test_cache_hit_skips_ollama_unless_forced(tmp_path):
+    generator = _generator(tmp_path)
+    options = {"num_predict": 200}
+
+    assert generator._generate("prompt", "seg", "lesson_3min", options) == "respuesta 1"
+    assert generator._generate("prompt", "seg", "lesson_3min", options) == "respuesta 1"
+    assert generator.ollama_client.calls == 1
+    assert generator._generation_metrics[("seg", "lesson_3min")]["cache_hit"] is True
+
+    # Otras opciones son otra clave
+    assert generator._generate("prompt", "seg", "lesson_3min", {"num_predict": 300}) == "respuesta 2"
+
+    # force_regenerate ignora el acierto pero guarda la nueva respuesta
+    forced = _generator(tmp_path, force_regenerate=True)
+    forced.ollama_client.calls = 2
+    assert forced._generate("prompt", "seg", "lesson_3min", options) == "respuesta 3"
+    assert _generator(tmp_path)._generate("prompt", "seg", "lesson_3min", options) == "respuesta 3"
@@ -0,0 +1,61 @@
+# tests/test_generation_engine.py
+
+import threading
+import time
+
+from segment_processor.generation_engine import ConcurrentGenerationEngine, GenerationTask
+
+
+def _tasks(segments=3, content_types=("lesson_3min", "nutrition_guide")):
+    pairs = [(f"SEG{s}", content_type) for s in range(segments) for content_type in content_types]
+    return [GenerationTask(index=i, segment_id=segment_id, content_type=content_type) for i, (segment_id, content_type) in enumerate(pairs)]
+
+
+def test_in_flight_is_bounded_and_outcomes_keep_task_order():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def generate(task):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return f"{task.segment_id}:{task.content_type}"
+
+    tasks = _tasks(segments=6)
+    outcomes = ConcurrentGenerationEngine(generate, max_in_flight=3).run(tasks)
+
+    assert peak == 3
+    assert [outcome.task.index for outcome in outcomes] == list(range(len(tasks)))
+    assert all(outcome.content == f"{outcome.task.segment_id}:{outcome.task.content_type}" for outcome in outcomes)
+
+
+def test_group_key_runs_a_segment_on_one_thread_in_order():
+    seen = {}
+
+    def generate(task):
+        seen.setdefault(task.segment_id, []).append((threading.get_ident(), task.content_type))
+        return "ok"
+
+    ConcurrentGenerationEngine(generate, max_in_flight=3).run(_tasks(), group_key=lambda task: task.segment_id)
+
+    for calls in seen.values():
+        assert len({thread for thread, _ in calls}) == 1
+        assert [content_type for _, content_type in calls] == ["lesson_3min", "nutrition_guide"]
+
+
+def test_a_failing_task_does_not_stop_the_others():
+    def generate(task):
+        if task.segment_id == "SEG1":
+            raise RuntimeError("Ollama caído")
+        return "ok"
+
+    outcomes = ConcurrentGenerationEngine(generate, max_in_flight=2).run(_tasks())
+
+    failed = [outcome for outcome in outcomes if outcome.error]
+    assert {outcome.task.segment_id for outcome in failed} == {"SEG1"}
+    assert all(outcome.content == "ok" for outcome in outcomes if not outcome.error)
@@ -0,0 +1,44 @@
+# tests/test_generation_journal.py
+
+import json
+
+from segment_processor.generation_journal import GenerationJournal
+
+
+def _record(segment_id, content_type, content="texto"):
+    return {"segment_id": segment_id, "content_type": content_type, "content": content}
+
+
+def test_resume_after_a_crash_mid_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = GenerationJournal(path)
+    journal.append(_record("seg_1", "lesson_3min"))
+    journal.append(_record("seg_1", "quiz"))
+    journal.close()
+    # La caída dejó la última línea a medias
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"segment_id": "seg_2", "content_ty')
+
+    resumed = GenerationJournal(path)
+    assert resumed.completed_keys() == {("seg_1", "lesson_3min"), ("seg_1", "quiz")}
+
+    # Lo que se anexa al reanudar empieza en una línea nueva y es legible
+    resumed.append(_record("seg_2", "lesson_3min"))
+    resumed.close()
+    assert ("seg_2", "lesson_3min") in GenerationJournal(path).completed_keys()
+
+
+def test_last_record_wins_and_compact_sorts_the_export(tmp_path):
+    journal = GenerationJournal(tmp_path / "journal.jsonl", fsync_every=1)
+    journal.append(_record("seg_2", "quiz"))
+    journal.append(_record("seg_1", "quiz", "primera versión"))
+    journal.append(_record("seg_1", "quiz", "segunda versión"))
+    journal.close()
+
+    order = {"seg_1": 0, "seg_2": 1}
+    export_path = tmp_path / "export" / "content.json"
+    records = journal.compact(export_path, order_key=lambda record: order[record["segment_id"]])
+
+    assert [(r["segment_id"], r["content"]) for r in records] == [("seg_1", "segunda versión"), ("seg_2", "texto")]
+    assert json.loads(export_path.read_text(encoding="utf-8")) == records
+    assert not export_path.with_suffix(".json.tmp").exists()
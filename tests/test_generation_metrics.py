@@ -0,0 +1,22 @@
+# tests/test_generation_metrics.py
+
+from content_generator.generation_metrics import summarize_generation_metrics
+
+
+def test_calls_without_counters_only_count_in_latency():
+    metrics = [
+        {"cache_hit": False, "latency_seconds": 2.0, "eval_count": 100, "eval_seconds": 1.0,
+         "prompt_eval_count": 50, "prompt_eval_seconds": 0.5, "load_seconds": 0.0},
+        # Stream cortado por el cliente: sin contadores de Ollama
+        {"cache_hit": False, "latency_seconds": 4.0},
+        {"cache_hit": True, "latency_seconds": 0.01},
+    ]
+
+    summary = summarize_generation_metrics(metrics)
+
+    assert summary["pieces"] == 3
+    assert summary["cache_hits"] == 1
+    assert summary["without_counters"] == 1
+    assert summary["output_tokens"] == 100
+    assert summary["tokens_per_second"] == 100.0
+    assert summary["latency_p50_s"] == 3.0
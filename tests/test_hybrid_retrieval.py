@@ -0,0 +1,86 @@
+# tests/test_hybrid_retrieval.py
+
+import logging
+
+from retrieval.bm25_index import SpanishBM25Index, normalize_spanish
+from retrieval.hybrid_retriever import HybridRetriever
+
+
+class FakeCollection:
+    """Colección de Chroma mínima: distancias fijas por chunk en lugar de embeddings"""
+
+    def __init__(self, documents, distances):
+        self.documents = documents
+        self.distances = distances
+
+    def count(self):
+        return len(self.documents)
+
+    def query(self, query_texts, n_results, include):
+        ranked = sorted(self.distances, key=self.distances.get)[:n_results]
+        return {
+            "ids": [ranked] * len(query_texts),
+            "documents": [[self.documents[chunk_id] for chunk_id in ranked]] * len(query_texts),
+            "metadatas": [[{} for _ in ranked]] * len(query_texts),
+            "distances": [[self.distances[chunk_id] for chunk_id in ranked]] * len(query_texts)
+        }
+
+    def get(self, ids, include):
+        return {"ids": ids, "documents": [self.documents[chunk_id] for chunk_id in ids], "metadatas": [{} for _ in ids]}
+
+
+DOCUMENTS = {
+    "c1": "El cuerpo lúteo produce progesterona tras la ovulación.",
+    "c2": "Los niveles de estrógeno suben en la fase folicular.",
+    "c3": "La FSH estimula el crecimiento de los folículos."
+}
+
+
+def _index(doc_ids=DOCUMENTS):
+    index = SpanishBM25Index()
+    index.add_documents(list(doc_ids), [DOCUMENTS[doc_id] for doc_id in doc_ids])
+    return index
+
+
+def test_normalization_strips_accents_plurals_and_adds_bigrams():
+    terms = normalize_spanish("Cuerpos lúteos y hormonas")
+
+    assert "cuerpo" in terms and "luteo" in terms and "hormona" in terms
+    assert "cuerpo_luteo" in terms
+    assert "y" not in terms
+
+
+def test_search_ranks_exact_phrase_first_and_survives_save_load(tmp_path):
+    index = _index()
+    path = tmp_path / "bm25.json.gz"
+    index.save(path)
+    loaded = SpanishBM25Index.load(path)
+
+    assert loaded.search("cuerpo lúteo")[0][0] == "c1"
+    assert loaded.search("FSH folículos") == index.search("FSH folículos")
+    assert index.add_documents(["c1"], ["repetido"]) == 0
+
+
+def test_hybrid_fuses_sparse_only_hits():
+    # Lo denso prefiere c2; BM25 encuentra c3, que Chroma no devolvió entre sus candidatos
+    collection = FakeCollection(DOCUMENTS, {"c2": 0.1})
+    retriever = HybridRetriever(collection, _index(), alpha=0.5)
+
+    results = retriever.retrieve(["FSH folículos"], n_results=2)
+
+    assert {chunk.chunk_id for chunk in results} == {"c2", "c3"}
+    sparse_hit = next(chunk for chunk in results if chunk.chunk_id == "c3")
+    assert sparse_hit.dense_score == 0.0 and sparse_hit.sparse_score == 1.0
+    assert sparse_hit.content == DOCUMENTS["c3"]
+
+
+def test_warns_when_bm25_does_not_cover_the_collection(caplog):
+    collection = FakeCollection(DOCUMENTS, {"c1": 0.1})
+    with caplog.at_level(logging.WARNING):
+        HybridRetriever(collection, _index(["c1"]))
+    assert "cubre 1 de 3 chunks" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        HybridRetriever(collection, _index())
+    assert not caplog.text
@@ -0,0 +1,34 @@
+# tests/test_materialized_context.py
+
+import precompute_context
+from retrieval.context_packer import PackedContext
+from retrieval.materialized_context import MaterializedContextTable, query_fingerprint
+
+TERMS = ["fase lútea", "progesterona"]
+SETTINGS = {"hybrid_alpha": 0.5, "rerank": None, "mmr_lambda": 0.7}
+
+
+def test_changed_retrieval_settings_make_the_row_stale(tmp_path):
+    table = MaterializedContextTable(tmp_path / "context.sqlite")
+    fingerprint = query_fingerprint(TERMS, 800, SETTINGS)
+    table.put("SEG1", "lesson_3min", fingerprint, TERMS, PackedContext(text="contexto", chunk_ids=["c1"], tokens=3))
+
+    assert table.get("SEG1", "lesson_3min", fingerprint).chunk_ids == ["c1"]
+    for changed in ({"hybrid_alpha": 0.7}, {"rerank": {"model": "cross-encoder"}}, {"mmr_lambda": 0.5}):
+        stale = query_fingerprint(TERMS, 800, {**SETTINGS, **changed})
+        assert table.get("SEG1", "lesson_3min", stale) is None
+
+
+def test_refresh_closes_the_generator(monkeypatch):
+    closed = []
+
+    class FakeGenerator:
+        collection = None
+
+        def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(precompute_context, "ExpandedContentGenerator", FakeGenerator)
+
+    assert precompute_context.refresh_materialized_context()["success"] is False
+    assert closed == [True]
@@ -0,0 +1,28 @@
+# tests/test_mock_ollama.py
+
+from content_generator.chat_prompts import CHAT_SYSTEM_PROMPT, build_chat_messages, build_system_modelfile
+from content_generator.mock_ollama import MockOllamaConfig, MockOllamaServer, modelfile_system
+from content_generator.ollama_client import OllamaClient
+
+
+def test_modelfile_system_is_parsed():
+    assert modelfile_system(build_system_modelfile("base")) == CHAT_SYSTEM_PROMPT
+    assert modelfile_system('FROM base\nSYSTEM Responde en español\n') == "Responde en español"
+    assert modelfile_system("FROM base\n") is None
+
+
+def test_modelfile_system_counts_as_prompt_tokens():
+    user_turn = "Perfil del segmento y contexto médico"
+    options = {"num_predict": 5}
+
+    with MockOllamaServer(MockOllamaConfig(system=CHAT_SYSTEM_PROMPT)) as server:
+        client = OllamaClient(base_url=server.url)
+        try:
+            explicit = client.chat(build_chat_messages(user_turn), options=options)
+            from_modelfile = client.chat(build_chat_messages(user_turn, system=None), options=options)
+        finally:
+            client.close()
+
+    # El SYSTEM del Modelfile se evalúa igual que un mensaje de sistema explícito
+    assert from_modelfile["prompt_eval_count"] == explicit["prompt_eval_count"]
+    assert explicit["prompt_eval_count"] > 100
@@ -0,0 +1,69 @@
+# tests/test_ollama_client.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from content_generator.ollama_client import AsyncOllamaClient, OllamaClient, OllamaError
+
+
+def _client_with_body(body: bytes) -> AsyncOllamaClient:
+    client = AsyncOllamaClient("http://ollama.test")
+    client._http = httpx.AsyncClient(
+        base_url=client.base_url,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    )
+    return client
+
+
+def test_malformed_stream_line_is_retryable():
+    client = _client_with_body(b'{"response": "Hola", "done": false}\n{"response": "mun\n')
+
+    async def consume():
+        return [chunk async for chunk in client.stream_generate("p")]
+
+    with pytest.raises(OllamaError) as error:
+        asyncio.run(consume())
+    assert error.value.retryable
+
+
+def test_read_timeout_is_flagged_as_timed_out():
+    def timeout(request):
+        raise httpx.ReadTimeout("lectura agotada", request=request)
+
+    client = AsyncOllamaClient("http://ollama.test")
+    client._http = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(timeout))
+
+    with pytest.raises(OllamaError) as error:
+        asyncio.run(client.generate("p"))
+    assert error.value.timed_out and error.value.retryable
+
+
+def test_abandoned_stream_is_cancelled_and_its_response_closed():
+    closed = asyncio.Event()
+
+    async def body():
+        try:
+            for i in range(1000):
+                yield f'{{"response": "t{i} ", "done": false}}\n'.encode()
+                await asyncio.sleep(0.01)
+        finally:
+            closed.set()
+
+    client = OllamaClient(base_url="http://ollama.test")
+    backend_client = client.pool.backends[0].client
+    client._run(backend_client._http.aclose())
+    backend_client._http = httpx.AsyncClient(
+        base_url=backend_client.base_url,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    )
+    try:
+        stream = client.stream_content("p")
+        assert next(stream).startswith("t0")
+        stream.close()
+
+        client._run(asyncio.wait_for(closed.wait(), timeout=2))
+        assert client.pool.backends[0].in_flight == 0
+    finally:
+        client.close()
@@ -0,0 +1,55 @@
+# tests/test_prompt_dedup.py
+
+from segment_processor.expanded_content_generator import ExpandedContentGenerator
+from segment_processor.expanded_segments import ExpandedSegmentDatabase, CONTENT_TYPES
+from segment_processor.generation_engine import GenerationTask
+from segment_processor.prompt_dedup import plan_prompt_dedup
+
+
+def _generator() -> ExpandedContentGenerator:
+    generator = object.__new__(ExpandedContentGenerator)
+    generator.segment_db = ExpandedSegmentDatabase()
+    generator.chat_api = False
+    generator._get_relevant_context = lambda segment, content_type: f"Contexto de {segment.id}."
+    return generator
+
+
+def _all_tasks(generator):
+    return [
+        GenerationTask(index=i, segment_id=segment_id, content_type=content_type)
+        for i, (segment_id, content_type) in enumerate(
+            (segment_id, content_type) for segment_id in generator.segment_db.segments for content_type in CONTENT_TYPES
+        )
+    ]
+
+
+def test_real_segments_share_generations():
+    generator = _generator()
+    tasks = _all_tasks(generator)
+
+    plan = plan_prompt_dedup(tasks, generator._dedup_signature, generator._render_group_prompt)
+
+    assert plan.summary()["tasks"] == len(tasks)
+    assert plan.calls_saved > 0
+    assert len(plan.leaders) + plan.calls_saved == len(tasks)
+    # Misma fase, tono y profundidad: la información del ciclo se genera una vez
+    assert ("SEG_INT_001", "cycle_day_info") in plan.members(("SEG011_LUT_ANXIOUS", "cycle_day_info"))
+
+
+def test_fields_used_by_the_instructions_keep_segments_apart():
+    generator = _generator()
+    plan = plan_prompt_dedup(_all_tasks(generator), generator._dedup_signature)
+
+    # SEG011 (ansiosa) y SEG_INT_001 (sin emoción principal) difieren en lo que piden sus instrucciones
+    for content_type in ("lesson_3min", "whats_happening", "hormone_levels", "stress_levels"):
+        assert ("SEG_INT_001", content_type) not in plan.members(("SEG011_LUT_ANXIOUS", content_type))
+
+
+def test_group_prompt_avoids_the_topics_of_every_member():
+    generator = _generator()
+    plan = plan_prompt_dedup(_all_tasks(generator), generator._dedup_signature, generator._render_group_prompt)
+
+    prompt = plan.prompts[("SEG011_LUT_ANXIOUS", "cycle_day_info")]
+    assert "EVITA: presión_adicional, optimización, complicaciones" in prompt
+    # Los líderes sin miembros usan su propio prompt en la generación
+    assert ("SEG_PREMEN_001", "cycle_day_info") not in plan.prompts
@@ -0,0 +1,79 @@
+# tests/test_work_queue.py
+
+import json
+
+from segment_processor.expanded_content_generator import enqueue_queue_run
+from segment_processor.expanded_segments import ExpandedSegmentDatabase
+from segment_processor.generation_engine import GenerationTask
+from segment_processor.work_queue import GenerationWorkQueue
+
+
+def _queue_with_one_task(tmp_path) -> GenerationWorkQueue:
+    queue = GenerationWorkQueue(tmp_path / "queue.sqlite")
+    task = GenerationTask(index=0, segment_id="seg", content_type="lesson_3min", priority=1.0)
+    queue.enqueue("run", [task], {("seg", "lesson_3min"): 0})
+    return queue
+
+
+def test_expired_leases_stop_after_max_attempts(tmp_path):
+    queue = _queue_with_one_task(tmp_path)
+
+    # Leases que vencen al instante: el worker "muere" con la tarea en cada intento
+    assert len(queue.claim("run", "w1", limit=1, lease_seconds=-1, max_attempts=2)) == 1
+    assert len(queue.claim("run", "w2", limit=1, lease_seconds=-1, max_attempts=2)) == 1
+    assert queue.claim("run", "w3", limit=1, lease_seconds=-1, max_attempts=2) == []
+
+    progress = queue.progress("run")
+    assert progress["finished"] and progress["failed"] == 1
+    assert queue.failed_tasks("run")[0]["error"] == "lease vencido"
+
+
+def test_compact_writes_the_export(tmp_path):
+    queue = _queue_with_one_task(tmp_path)
+    queue.claim("run", "w1", limit=1, lease_seconds=60, max_attempts=2)
+    record = {"segment_id": "seg", "content_type": "lesson_3min", "content": "texto"}
+    queue.complete("run", ("seg", "lesson_3min"), "w1", record)
+
+    export_path = tmp_path / "exports" / "expanded_content_run.json"
+    assert queue.compact("run", export_path) == [record]
+    assert json.loads(export_path.read_text(encoding="utf-8")) == [record]
+    assert queue.progress("run")["exported"]
+
+
+def test_claim_takes_every_pending_piece_of_the_chosen_segments(tmp_path):
+    queue = GenerationWorkQueue(tmp_path / "queue.sqlite")
+    # Prioridades intercaladas: a y b se alternan de mayor a menor valor
+    tasks = [
+        GenerationTask(index=0, segment_id="a", content_type="lesson_3min", priority=0.9),
+        GenerationTask(index=1, segment_id="b", content_type="lesson_3min", priority=0.8),
+        GenerationTask(index=2, segment_id="a", content_type="quiz", priority=0.7),
+        GenerationTask(index=3, segment_id="b", content_type="quiz", priority=0.6),
+        GenerationTask(index=4, segment_id="c", content_type="lesson_3min", priority=0.5),
+        GenerationTask(index=5, segment_id="a", content_type="nutrition_guide", priority=0.4),
+        GenerationTask(index=6, segment_id="b", content_type="nutrition_guide", priority=0.2, deferred=True)
+    ]
+    queue.enqueue("run", tasks, {(task.segment_id, task.content_type): task.index for task in tasks})
+
+    first = queue.claim("run", "w1", limit=2, lease_seconds=60, max_attempts=2)
+    assert [(task.segment_id, task.content_type) for task in first] == [
+        ("a", "lesson_3min"), ("a", "quiz"), ("a", "nutrition_guide")
+    ]
+
+    # b sin su pieza diferida, que va después de todo lo no diferido (c incluido)
+    second = queue.claim("run", "w2", limit=3, lease_seconds=60, max_attempts=2)
+    assert [(task.segment_id, task.content_type) for task in second] == [
+        ("b", "lesson_3min"), ("b", "quiz"), ("c", "lesson_3min")
+    ]
+    assert [(task.segment_id, task.deferred) for task in queue.claim("run", "w3", limit=5, lease_seconds=60, max_attempts=2)] == [("b", True)]
+
+
+def test_enqueue_does_not_start_an_ollama_client(tmp_path, monkeypatch):
+    def no_client(*args, **kwargs):
+        raise AssertionError("encolar no debe crear el cliente de Ollama")
+
+    monkeypatch.setattr("segment_processor.expanded_content_generator.OllamaClient", no_client)
+    queue = GenerationWorkQueue(tmp_path / "queue.sqlite")
+
+    result = enqueue_queue_run(queue, ExpandedSegmentDatabase(), run_id="run")
+
+    assert result["total"] == queue.progress("run")["total"] > 0